@@ -0,0 +1,54 @@
+"""Time backtest_configs on synthetic candles for a grid of liquidity ranges.
+
+    python benchmarks/backtest.py --configs 2000 --days 30 --workers 8
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30, help="Days of 1m candles")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from src.aizen.backtest import backtest_configs
+    from src.aizen.schemas.agent import DEFAULT_CONFIG
+
+    rng = np.random.default_rng(0)
+    n = args.days * 1440
+    price = 2500 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    candles = pd.DataFrame(
+        {"price": price, "volume": rng.uniform(1e5, 1e6, n)},
+        index=pd.date_range("2025-01-01", periods=n, freq="1min")
+    )
+
+    configs = []
+    for i in range(args.configs):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        width = 0.01 + 0.3 * rng.random()
+        config["liquidity_range"] = {"lower": width, "higher": width * rng.uniform(0.5, 1.5)}
+        config["rebalance_timeframe"] = int(rng.choice([5, 15, 60, 240]))
+        configs.append(config)
+
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        results = backtest_configs(candles, configs, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{len(configs)} configs x {n} candles, {workers} worker(s): {elapsed:.2f}s")
+
+    best = results.sort_values("performance", ascending=False).head(3)
+    print(best.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
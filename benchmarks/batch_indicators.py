@@ -0,0 +1,138 @@
+"""Measure BatchIndicators on a panel of many series, and the backfill built on it.
+
+Splits --rows synthetic 1m candles over --series tickers and computes every
+indicator three ways, in float64 and precise (long double) mode:
+- BatchIndicators over the whole panel in one pass;
+- TechnicalIndicators once per series;
+- TechnicalIndicators over a single series of the same length, for scale.
+It reports the largest deviation of the panel from the per-series results,
+relative to max(|value|, 1).
+
+The backfill section compares CandleIngestor's rows for --backfill-rows
+candles: one StreamingIndicators.update per candle (the previous backfill)
+against indicator_frame, frame_rows and StreamingIndicators.from_history.
+
+    python benchmarks/batch_indicators.py --rows 1000000 --series 400
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src.aizen.data.market.ingest import CandleIngestor
+from src.aizen.signals.batch_indicators import BatchIndicators
+from src.aizen.signals.streaming_indicators import StreamingIndicators
+from src.aizen.signals.technical_indicators import TechnicalIndicators
+
+INDICATORS = ["RSI", "BB_upper", "BB_middle", "BB_lower", "Volatility", "MACD", "MACD_signal", "MACD_histogram", "ATR", "VWAP"]
+
+
+def synthetic_candles(rows, series, seed=0):
+    """(ticker, date) 1m candles, rows // series per ticker."""
+    rng = np.random.default_rng(seed)
+    per_series = rows // series
+    rows = per_series * series
+    steps = rng.normal(0, 30, (series, per_series))
+    close = (rng.uniform(100, 60000, (series, 1)) + np.cumsum(steps, axis=1)).ravel()
+    index = pd.MultiIndex.from_product(
+        [[f"T{i:04d}-USD" for i in range(series)], pd.date_range("2025-01-01", periods=per_series, freq="1min")],
+        names=["ticker", "date"]
+    )
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 5, rows),
+        "High": close + rng.uniform(0, 40, rows),
+        "Low": close - rng.uniform(0, 40, rows),
+        "Close": close,
+        "Volume": rng.integers(0, 1000, rows)
+    }, index=index)
+
+
+def panel(candles):
+    frame = candles.rename(columns={"Close": "price"})
+    return pd.concat({"1m": frame}, names=["interval"]).reorder_levels(["ticker", "interval", "date"])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def report(label, rows, elapsed):
+    print(f"{label:<34} {rows:>9} rows  {elapsed * 1000:9.1f}ms  {rows / elapsed / 1e6:6.2f}M rows/s")
+
+
+def max_relative_error(reference, values):
+    reference, values = reference.to_numpy(dtype=np.float64), values.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(reference)
+    return float(np.max(np.abs(values[mask] - reference[mask]) / np.maximum(np.abs(reference[mask]), 1), initial=0.0))
+
+
+def streaming_backfill(candles):
+    rows = []
+    for ticker, frame in candles.groupby(level="ticker"):
+        indicators = StreamingIndicators()
+        rows += CandleIngestor.candle_rows(ticker, frame.droplevel("ticker"), indicators)
+    return rows
+
+
+def batch_backfill(candles):
+    rows = CandleIngestor.frame_rows(CandleIngestor.indicator_frame(candles))
+    for ticker, history in candles.groupby(level="ticker"):
+        StreamingIndicators.from_history(history["High"], history["Low"], history["Close"], history["Volume"].tolist())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--series", type=int, default=400)
+    parser.add_argument("--backfill-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    candles = synthetic_candles(args.rows, args.series)
+    rows = len(candles)
+    data = panel(candles)
+
+    single = data.droplevel(["ticker", "interval"]).reset_index(drop=True)
+    for precise in (False, True):
+        label = "precise" if precise else "float64"
+        batch, elapsed = timed(lambda: BatchIndicators(data, precise=precise).calculate_technical_indicators())
+        report(f"{label:<8} batch {args.series} series", rows, elapsed)
+
+        def per_series():
+            return pd.concat([
+                TechnicalIndicators(frame.droplevel(["ticker", "interval"]).copy(), precise=precise).calculate_technical_indicators()
+                for _, frame in data.groupby(level="ticker", sort=True)
+            ])
+        reference, elapsed = timed(per_series)
+        report(f"{label:<8} loop {args.series} series", rows, elapsed)
+
+        _, elapsed = timed(lambda: TechnicalIndicators(single.copy(), precise=precise).calculate_technical_indicators())
+        report(f"{label:<8} single series", rows, elapsed)
+
+        error = max(max_relative_error(reference[column], batch[column]) for column in INDICATORS)
+        print(f"{label:<8} batch max relative error vs per-series TechnicalIndicators: {error:.2e}")
+
+    sample = synthetic_candles(args.backfill_rows, max(args.series * args.backfill_rows // rows, 1), seed=1)
+    streamed, elapsed = timed(lambda: streaming_backfill(sample))
+    report("backfill streaming updates", len(sample), elapsed)
+    batched, elapsed = timed(lambda: batch_backfill(sample))
+    report("backfill batch + from_history", len(sample), elapsed)
+
+    error = max(
+        abs(a[column] - b[column]) / max(abs(b[column]), 1)
+        for a, b in zip(batched, streamed) for column in ("rsi", "bb_upper", "macd", "atr", "vwap")
+        if b[column] == b[column]
+    )
+    print(f"backfill max relative error vs streaming updates: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
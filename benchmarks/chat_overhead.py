@@ -0,0 +1,83 @@
+"""Measure the per-request overhead of /chat, excluding model time.
+
+The model is replaced by a fake chat model that answers instantly, so the
+numbers only cover client/pipeline/chain setup, prompt rendering and parsing.
+
+    python benchmarks/chat_overhead.py --iterations 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# handle_chat queues every turn for user_chats; give the writer a table to land in
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'chat_overhead.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from langchain.chains.llm import LLMChain
+from langchain.memory import ConversationBufferMemory
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_openai import ChatOpenAI
+from src.aizen.database import engine
+from src.aizen.models import UserChat
+from src.aizen.pipelines.semantic_cache import SemanticResponseCache
+from src.aizen.pipelines.user_chat_pipeline import UserChatPipeline
+
+CANNED_RESPONSE = json.dumps({"answer": "RSI is a momentum oscillator.", "config": None})
+QUERY = "what does RSI mean?"
+
+
+def fake_llm():
+    return FakeListChatModel(responses=[CANNED_RESPONSE])
+
+
+def per_request_pipeline(memory):
+    """Previous behaviour: new client, pipeline and LLMChain on every request."""
+    ChatOpenAI(model="gpt-4o-mini", base_url="https://openrouter.ai/api/v1", api_key="benchmark")
+    pipeline = UserChatPipeline(llm=fake_llm(), response_cache=SemanticResponseCache(enabled=False))
+    chain = LLMChain(llm=pipeline.llm, prompt=pipeline.prompt, memory=memory, verbose=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = chain.run(input=QUERY, chat_history="")
+    return pipeline.parser.parse(result)
+
+
+def shared_pipeline(pipeline, memory):
+    """Current behaviour: one pipeline per process, memory passed per call."""
+    return pipeline.handle_chat(1, QUERY, 1, memory=memory)
+
+
+def run(label, fn, iterations):
+    fn()  # warm up imports and lazy clients
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(
+        f"{label:<24} mean={statistics.mean(samples):.3f}ms "
+        f"p50={samples[len(samples) // 2]:.3f}ms "
+        f"p99={samples[int(len(samples) * 0.99) - 1]:.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    UserChat.__table__.create(engine, checkfirst=True)
+    # The semantic cache is off so every call reaches the (fake) model
+    pipeline = UserChatPipeline(llm=fake_llm(), response_cache=SemanticResponseCache(enabled=False))
+    run("per-request pipeline", lambda: per_request_pipeline(ConversationBufferMemory(memory_key="chat_history")), args.iterations)
+    run("shared pipeline", lambda: shared_pipeline(pipeline, ConversationBufferMemory(memory_key="chat_history")), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
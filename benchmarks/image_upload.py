@@ -0,0 +1,115 @@
+"""Throughput of agent image processing for a batch of large uploads.
+
+Generates `--count` camera-sized JPEGs and processes all of them three ways:
+- the previous resize_image, which decodes at full size, runs LANCZOS down
+  to 512px and encodes one JPEG, serially;
+- process_image (draft decode, full and thumbnail WebP), serially;
+- process_image on the process pool used by /build_agent.
+
+    python benchmarks/image_upload.py --count 32 --size 4032x3024 --workers 4
+
+With --url it also uploads the batch to a running API's /build_agent from
+--concurrency clients (each upload creates an agent for --user-id).
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.aizen.image_processing import process_image
+
+
+def make_jpegs(count: int, size, quality: int = 90):
+    """Smooth noise over gradients, which compresses and decodes roughly like a photo (flat colour would not)."""
+    images = []
+    for i in range(count):
+        noise = Image.effect_noise((size[0] // 8, size[1] // 8), 40 + i % 20).resize(size, Image.Resampling.BICUBIC)
+        gradient = Image.linear_gradient("L").resize(size)
+        image = Image.merge("RGB", (noise, gradient, gradient.rotate(90 * (i % 4))))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality)
+        images.append(output.getvalue())
+    return images
+
+
+def resize_image(image_bytes: bytes, max_size=(512, 512), quality=70):
+    """resize_image as /build_agent ran it before the image pool."""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def timed(label: str, images, run):
+    started = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - started
+    megabytes = sum(len(image) for image in images) / 1e6
+    print(f"{label:34} {len(images) / elapsed:8.1f} img/s {megabytes / elapsed:8.1f} MB/s {elapsed:8.2f}s")
+    return results
+
+
+async def upload(url: str, images, concurrency: int, user_id: int):
+    import httpx
+
+    queue = asyncio.Queue()
+    for image in images:
+        queue.put_nowait(image)
+    errors = 0
+
+    async def client(http):
+        nonlocal errors
+        while not queue.empty():
+            image = queue.get_nowait()
+            name = f"bench-{uuid.uuid4().hex[:12]}"
+            response = await http.post("/build_agent", data={
+                "id": 0, "name": name, "category": "bench", "description": "Image upload benchmark", "user_id": user_id,
+                "config": "{}", "clone_fee": "0", "subscription_fee": 0
+            }, files={"image": (f"{name}.jpg", image, "image/jpeg")})
+            errors += response.status_code >= 400
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    print(f"{'POST /build_agent':34} {len(images) / elapsed:8.1f} img/s {'':16} {elapsed:8.2f}s  errors: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--size", default="4032x3024", help="WIDTHxHEIGHT of the generated JPEGs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--url", help="Also upload the batch to this API")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    size = tuple(int(n) for n in args.size.split("x"))
+    images = make_jpegs(args.count, size)
+    print(f"{args.count} JPEGs of {args.size}, {sum(map(len, images)) / len(images) / 1e6:.1f} MB each on average")
+
+    old = timed("resize_image (serial)", images, lambda: [resize_image(image) for image in images])
+    new = timed("process_image (serial)", images, lambda: [process_image(image) for image in images])
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pool.submit(process_image, images[0]).result()     # Start the workers outside the timing
+        timed(f"process_image ({args.workers} processes)", images, lambda: list(pool.map(process_image, images)))
+
+    print(f"output bytes per image: resize_image {sum(map(len, old)) // len(old)}, "
+          f"full {sum(len(o['full']) for o in new) // len(new)}, thumbnail {sum(len(o['thumbnail']) for o in new) // len(new)}")
+
+    if args.url:
+        asyncio.run(upload(args.url, images, args.concurrency, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure TechnicalIndicators throughput on large frames.
+
+Runs all seven indicators in float64 and precise (long double) mode on an
+N-row synthetic frame. It also runs the previous Decimal row-wise VWAP on the
+first --reference-rows rows to report its speed and the deviation of both
+modes from it.
+
+    python benchmarks/indicators.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.aizen.signals.technical_indicators import TechnicalIndicators
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 30, rows))
+    return pd.DataFrame({
+        "price": close,
+        "High": close + rng.uniform(0, 40, rows),
+        "Low": close - rng.uniform(0, 40, rows),
+        "Volume": rng.integers(0, 1000, rows).astype(float)
+    })
+
+
+def decimal_vwap(df):
+    """The previous implementation: object-dtype Decimal columns and a row-wise apply."""
+    df = df.copy()
+    for col in ("High", "Low", "price", "Volume"):
+        df[col] = df[col].apply(Decimal)
+    df["Typical_Price"] = (df["High"] + df["Low"] + df["price"]) / Decimal(3)
+    df["Cumulative_VP"] = (df["Typical_Price"] * df["Volume"]).cumsum()
+    df["Cumulative_Volume"] = df["Volume"].cumsum()
+    return df.apply(lambda row: row["Cumulative_VP"] / row["Cumulative_Volume"] if row["Cumulative_Volume"] > 0 else Decimal("NaN"), axis=1)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def max_relative_error(reference, values):
+    reference = reference.astype(float).to_numpy()
+    mask = ~np.isnan(reference)
+    return float(np.max(np.abs(values[mask] - reference[mask]) / np.abs(reference[mask]), initial=0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--reference-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    for precise in (False, True):
+        label = "precise" if precise else "float64"
+        out, elapsed = timed(lambda: TechnicalIndicators(df.copy(), precise=precise).calculate_technical_indicators())
+        print(f"{label:<8} all indicators  {args.rows:>9} rows  {elapsed * 1000:9.1f}ms  {args.rows / elapsed / 1e6:6.2f}M rows/s")
+
+    sample = df.iloc[:args.reference_rows]
+    reference, elapsed = timed(lambda: decimal_vwap(sample))
+    print(f"decimal  VWAP only       {len(sample):>9} rows  {elapsed * 1000:9.1f}ms  {len(sample) / elapsed / 1e6:6.2f}M rows/s")
+
+    for precise in (False, True):
+        label = "precise" if precise else "float64"
+        vwap = TechnicalIndicators(sample.copy(), precise=precise).calculate_vwap()["VWAP"].to_numpy()
+        print(f"{label:<8} VWAP max relative error vs Decimal: {max_relative_error(reference, vwap):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Concurrent request throughput of the API's read endpoints against local Postgres.
+
+Seed a local database once, then start the API against it and fire requests
+at it from many concurrent clients:
+
+    DATABASE_URL=postgresql://localhost/aizen_bench python benchmarks/load_test.py --seed --agents 200
+    DATABASE_URL=postgresql://localhost/aizen_bench uvicorn main:app --workers 1 --port 8000
+    python benchmarks/load_test.py --url http://localhost:8000 --concurrency 64 --requests 2000
+
+For a before/after comparison, run the same command against a server started
+from the commit before the async engine and from this one. Before it, every
+`async def` handler ran its queries on the event loop, so requests were served
+one at a time however many clients were waiting.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PATHS = [
+    ("GET", "/agent_marketplace", None),
+    ("GET", "/agent_history/{user_id}", None),
+    ("GET", "/user_commission/{user_id}", None),
+    ("POST", "/get_agent", {"agent_id": "{agent_id}", "user_id": "{user_id}"}),
+    ("GET", "/search_agent_name/agent-{agent_id}", None),
+]
+
+
+def seed(agents: int, history: int):
+    """One user owning and commissioning `agents` deployed agents with `history` history rows each."""
+    from src.aizen.database import Base, SessionLocal, engine
+    from src.aizen.models import Agent, AgentHistory, User, UserCommission
+    Base.metadata.create_all(engine)
+
+    with SessionLocal() as db:
+        user = User(wallet_address="0xbench", auth_wallet_address="0xbench", public_key="bench", private_key="bench")
+        db.add(user)
+        db.flush()
+        start = datetime.utcnow() - timedelta(minutes=history * 5)
+        for i in range(agents):
+            agent = Agent(name=f"agent-{user.id}-{i}", user_id=user.id, description="Load test agent", category="bench",
+                          is_deployed=True, is_active=True, config={}, performance=f"{i % 20 - 5}.0%", tags=["bench"])
+            db.add(agent)
+            db.flush()
+            db.add(UserCommission(user_id=user.id, agent_id=agent.id, amount_eth=Decimal("0.5"), is_commissioned=True, is_active=True))
+            db.add_all(
+                AgentHistory(agent_id=agent.id, created_at=start + timedelta(minutes=5 * j), reason="No action; position in range",
+                             last_rebalanced_at=start if j % 12 == 0 else None)
+                for j in range(history)
+            )
+        db.commit()
+        print(f"Seeded user {user.id} with {agents} agents x {history} history rows")
+
+
+async def run(url: str, concurrency: int, requests: int, user_id: int, agent_id: int):
+    import httpx
+
+    latencies = {path: [] for _, path, _ in PATHS}
+    errors = {path: 0 for _, path, _ in PATHS}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(PATHS[i % len(PATHS)])
+
+    def fill(value):
+        if isinstance(value, str):
+            value = value.format(user_id=user_id, agent_id=agent_id)
+            return int(value) if value.isdigit() else value
+        return value
+
+    async def client(http):
+        while not queue.empty():
+            method, path, body = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, fill(path), json={k: fill(v) for k, v in body.items()} if body else None)
+                if response.status_code >= 400:
+                    errors[path] += 1
+            except httpx.HTTPError:
+                errors[path] += 1
+            latencies[path].append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{requests} requests, {concurrency} concurrent clients: {requests / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print(f"{'path':40} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for path, times in latencies.items():
+        times = sorted(times)
+        if not times:
+            continue
+        p = lambda q: times[min(int(q * len(times)), len(times) - 1)] * 1000
+        print(f"{path:40} {len(times):6} {statistics.median(times) * 1000:8.1f} {p(0.95):8.1f} {p(0.99):8.1f} {errors[path]:7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", action="store_true", help="Fill DATABASE_URL with load test data and exit")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--history", type=int, default=500, help="History rows per agent")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--agent-id", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.agents, args.history)
+    else:
+        asyncio.run(run(args.url, args.concurrency, args.requests, args.user_id, args.agent_id))
+
+
+if __name__ == "__main__":
+    main()
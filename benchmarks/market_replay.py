@@ -0,0 +1,77 @@
+"""Replay recorded candles through the price job offline and time each run.
+
+Steps fetch_and_store_crypto_data through a CSV/Parquet recording in 5 minute
+increments against a throwaway SQLite database, so no network is touched.
+Without --fixture a synthetic recording is generated first.
+
+    python benchmarks/market_replay.py --fixture candles.parquet --steps 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+workdir = tempfile.mkdtemp(prefix="market_replay_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'replay.db')}"
+os.environ["MARKET_DATA_OFFLINE"] = "1"
+os.environ["MARKET_HOT_CACHE_DIR"] = os.path.join(workdir, "hot")
+
+
+def synthetic_recording(path, tickers, days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days * 24 * 60, freq="1min")
+    frames = []
+    for ticker in tickers:
+        close = 1000 + np.cumsum(rng.normal(0, 1, len(dates)))
+        frames.append(pd.DataFrame({
+            "ticker": ticker, "date": dates, "Open": close, "High": close + 1, "Low": close - 1,
+            "Close": close, "Volume": rng.integers(0, 100, len(dates))
+        }))
+    pd.concat(frames).to_parquet(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture", help="Recorded candles (ticker, date, Open, High, Low, Close, Volume)")
+    parser.add_argument("--steps", type=int, default=288, help="Job runs to replay, 5 minutes apart")
+    args = parser.parse_args()
+
+    fixture = args.fixture or os.path.join(workdir, "candles.parquet")
+    os.environ["MARKET_DATA_FIXTURE"] = fixture
+
+    from src.aizen.jobs.fetch_crypto_price import TICKER, fetch_and_store_crypto_data
+    if not args.fixture:
+        synthetic_recording(fixture, TICKER, days=2)
+
+    from src.aizen.database import Base, engine
+    from src.aizen.models import CryptoPrice, IndicatorState
+    from src.aizen.data.market import get_market_data_source
+    Base.metadata.create_all(engine, tables=[CryptoPrice.__table__, IndicatorState.__table__])
+
+    source = get_market_data_source()
+    first = source.fetch_candles(TICKER, datetime(1970, 1, 1)).index.get_level_values("date").min()
+    now = first.to_pydatetime() + timedelta(minutes=5)
+
+    samples = []
+    for _ in range(args.steps):
+        start = time.perf_counter()
+        fetch_and_store_crypto_data(source, now=now)
+        samples.append((time.perf_counter() - start) * 1000)
+        now += timedelta(minutes=5)
+
+    samples.sort()
+    print(
+        f"{len(samples)} runs: mean={statistics.mean(samples):.2f}ms "
+        f"p50={samples[len(samples) // 2]:.2f}ms p99={samples[int(len(samples) * 0.99) - 1]:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Time "latest candle" and "last N candles" lookups: crypto_prices query vs the hot cache.
+
+Fills a throwaway SQLite database with synthetic 1m candles, warms the
+memory-mapped ring from it and checks both paths return the same rows.
+
+    python benchmarks/price_lookup.py --rows 200000 --last 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+workdir = tempfile.mkdtemp(prefix="price_lookup_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'prices.db')}"
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="Candles per ticker")
+    parser.add_argument("--last", type=int, default=500, help="N for the last-N lookup")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    from src.aizen.database import Base, SessionLocal, engine
+    from src.aizen.models import CryptoPrice
+    from src.aizen.data.market.hot_cache import FIELDS, HotCandleCache
+    from src.aizen.data.market.ingest import upsert_prices
+    Base.metadata.create_all(engine, tables=[CryptoPrice.__table__])
+
+    rng = np.random.default_rng(0)
+    close = 1000 + np.cumsum(rng.normal(0, 1, args.rows))
+    first = datetime(2025, 1, 1)
+    rows = [
+        dict({field: float(c) for field in FIELDS}, ticker="ETH-USD", date=first + timedelta(minutes=i), volume=i)
+        for i, c in enumerate(close)
+    ]
+    with SessionLocal() as session:
+        upsert_prices(session, rows)
+        session.commit()
+
+    cache = HotCandleCache(os.path.join(workdir, "hot"))
+    with SessionLocal() as session:
+        cache.warm(session, "ETH-USD")
+
+        def query_latest():
+            return session.query(CryptoPrice).filter_by(ticker="ETH-USD").order_by(CryptoPrice.date.desc()).first()
+
+        def query_last():
+            return session.query(CryptoPrice.date, CryptoPrice.close_price).filter_by(ticker="ETH-USD") \
+                .order_by(CryptoPrice.date.desc()).limit(args.last).all()
+
+        db_latest_us, db_latest = timed(query_latest, args.repeat)
+        db_last_us, db_last = timed(query_last, args.repeat)
+
+    cache_latest_us, cached_latest = timed(lambda: cache.latest("ETH-USD"), args.repeat)
+    cache_last_us, cached_last = timed(lambda: cache.last("ETH-USD", args.last), args.repeat)
+
+    assert cached_latest["date"] == db_latest.date and cached_latest["close_price"] == float(db_latest.close_price)
+    assert np.allclose(cached_last["close_price"], [float(p) for _, p in reversed(db_last)])
+    assert cached_last.base is not None, "last() should return a view"
+
+    print(f"latest candle:   query {db_latest_us:9.1f}us   hot cache {cache_latest_us:7.1f}us")
+    print(f"last {args.last} candles: query {db_last_us:9.1f}us   hot cache {cache_last_us:7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
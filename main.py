@@ -1,26 +1,41 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, Query, File, UploadFile, Form, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 from decimal import Decimal
 from dotenv import load_dotenv
-from src.aizen.pipelines import UserChatPipeline, LiquidityRebalancingPipeline
+from src.aizen.pipelines import chat_record, get_user_chat_pipeline
+from src.aizen.pipelines.chat_history_writer import chat_history_writer
+from src.aizen.data.market.hot_cache import get_hot_cache
+from src.aizen.data.market.tickers import ticker_for_pair
+from src.aizen.backtest import config_params, last_candle_at, load_candles, shutdown_backtest_pool
+from src.aizen.backtest.optimizer import MAX_RANGE_DAYS, cache_key, cached_optimize, optimize_config
+from src.aizen.chains.service import ChainRejected, ChainTimeout, get_chain_service
+from src.aizen.chains.balances import get_balance_service
+from src.aizen.chains.clone_worker import get_clone_worker
+from src.aizen.cache import ALL_TAG, STATS_TAG, agent_tag, chat_tag, get_response_cache, user_tag
+from src.aizen.image_processing import IMAGE_CONTENT_TYPE, process_upload, shutdown_image_pool
+from src.aizen.formatting import format_amount_eth, format_image, format_thumbnail, parse_percent
+from src.aizen.repositories import chat_entry, chat_page, history_entry, history_page, latest_history, rebalance_counts, marketplace_response, refresh_marketplace
+from src.aizen.repositories.images import get_image, store_image
+from src.aizen.repositories.clones import FINISHED, broadcast_clone_job, clone_job_status, clone_name_taken, create_clone_job, fail_clone_job
 import jwt
 from eth_account.messages import encode_defunct
 from eth_account import Account
 from datetime import datetime, timedelta, date
 from sqlalchemy.orm import Session
-from sqlalchemy import LargeBinary, func, literal_column, cast, Date
-from src.aizen.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import LargeBinary, func, literal_column, cast, Date, select
+from src.aizen.database import get_db, get_async_db, get_async_engine, get_async_sessionmaker
 from src.aizen.schemas.user import MyAgent, ChatRequest 
-from src.aizen.models import User, Agent, UserCommission, UserChat, AgentHistory, UserDailyCloneFee, UserDailyEarnedFee, AgentDailyStat, UserDailyStat
+from src.aizen.models import User, Agent, UserCommission, UserChat, AgentHistory, UserDailyCloneFee, UserDailyEarnedFee, AgentDailyStat, UserDailyStat, UserChatSummary
 from src.aizen.schemas.user_commission import CreateUserCommission, UpdateCommission, UpdateAmountEth
 from src.aizen.schemas.agent import BuildAgentRequest, DEFAULT_CONFIG, GetAgent, DeployAgent, DeleteAgent, CloneAgent
 from src.aizen.schemas.analytics import DailyFeeAnalyticsRequest, DailyFeeAnalyticsResponse
-from web3 import Web3
-import random, json, base64, io, ast
-from PIL import Image
+from src.aizen.schemas.optimizer import OptimizeConfigRequest
+import random, json, base64, io, asyncio
 
 
 load_dotenv(override=True)
@@ -30,16 +45,22 @@ load_dotenv(override=True)
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 ACCOUNT_ADDRESS = os.getenv("ACCOUNT_ADDRESS")
 TOKEN_SECRET = os.getenv("JWT_SECRET", "supersecret")
-PERFORMANCE = ["High", "Moderate", "Very High", "Low"]
-IMAGE_URL = ['https://cdn.prod.website-files.com/63974a9c19a1dd54281c47a8/64d0b5970be523e3ea00fe44_AI-Agents.webp',
-             'https://smythos.com/wp-content/uploads/2024/10/friendly-robot-laptop-office.jpeg',
-             'https://www.augmentir.com/wp-content/uploads/2024/11/ai-agent.webp']
-
 
 if not os.getenv("OPENAI_API_KEY") or not PRIVATE_KEY or not ACCOUNT_ADDRESS:
     raise ValueError("required env variables not set")
 
-w3 = Web3(Web3.HTTPProvider("https://sepolia.infura.io/v3/35be664c4dfe4302abed873f7a231f42"))
+# RPC calls go through chain's bounded thread pool; w3 itself is only used for local helpers
+chain = get_chain_service()
+balances = get_balance_service()
+clone_worker = get_clone_worker()
+w3 = chain.w3
+
+# Reads below are cached until a write invalidates one of their tags
+response_cache = get_response_cache()
+
+def invalidate_agent(agent: Agent, *user_ids: int):
+    """Drop cached reads of `agent`, of its owner and of `user_ids` after a write to them."""
+    response_cache.invalidate(agent_tag(agent.id), user_tag(agent.user_id), *(user_tag(user_id) for user_id in user_ids))
 
 # Initialize FastAPI app
 app = FastAPI(title="Uniswap V3 LP Rebalancing API")
@@ -52,44 +73,46 @@ app.add_middleware(
     allow_headers=["*"] 
 )
 
-def generate_jwt(wallet_address: str):
-    payload = {
-        "sub": wallet_address,
-        "exp": datetime.utcnow() + timedelta(hours=24)
-    }
-    return jwt.encode(payload, TOKEN_SECRET, algorithm="HS256")
+@app.on_event("shutdown")
+def flush_chat_history():
+    chat_history_writer.close()
 
-def resize_image(image_bytes: bytes, content_type: str, max_size=(512, 512), quality=70):
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-    except Exception:
-        raise ValueError("Invalid image format")
+@app.on_event("startup")
+def check_async_engine():
+    # A missing asyncio driver should stop startup, not fail the first async request
+    get_async_engine()
 
-    image_format = content_type.split("/")[-1].upper()
-    if image_format == "JPG":
-        image_format = "JPEG"  # Pillow expects "JPEG", not "JPG"
+@app.on_event("startup")
+async def start_clone_worker():
+    clone_worker.start()
 
-    image = image.convert("RGB")
-    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+@app.on_event("shutdown")
+async def stop_clone_worker():
+    await clone_worker.stop()
 
-    output_io = io.BytesIO()
-    image.save(output_io, format=image_format, quality=quality)
+@app.on_event("shutdown")
+def stop_image_pool():
+    shutdown_image_pool()
 
-    return output_io.getvalue()
+@app.on_event("shutdown")
+def stop_backtest_pool():
+    shutdown_backtest_pool()
 
-def format_image(image_bytes: LargeBinary, content_type: str):
-    if not image_bytes:
-        image_type = "url"
-        image_data = random.choice(IMAGE_URL)
-    else:
-        image_type = "base_64"
-        image_base64 = base64.b64encode(image_bytes).decode("utf-8")    
-        image_data = f"data:{content_type};base64,{image_base64}"
+@app.on_event("shutdown")
+def stop_chain_service():
+    chain.shutdown()
 
-    return {
-        "type": image_type,
-        "data": image_data
+@app.on_event("shutdown")
+async def close_async_engine():
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+
+def generate_jwt(wallet_address: str):
+    payload = {
+        "sub": wallet_address,
+        "exp": datetime.utcnow() + timedelta(hours=24)
     }
+    return jwt.encode(payload, TOKEN_SECRET, algorithm="HS256")
 
 class CategorySelectionRequest(BaseModel):
     category: str
@@ -97,6 +120,9 @@ class CategorySelectionRequest(BaseModel):
 class GetWalletBalance(BaseModel):
     wallet_address: str
 
+class GetWalletBalances(BaseModel):
+    wallet_addresses: List[str] = Field(..., min_length=1, max_length=500)
+
 class WalletAuthRequest(BaseModel):
     wallet_address: str
     signature: str
@@ -104,7 +130,7 @@ class WalletAuthRequest(BaseModel):
 
 
 @app.post("/chat")
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+def chat(request: ChatRequest, db: Session = Depends(get_db)):
     try:
         user_id = request.user_id
         user = db.query(User).filter(User.id == user_id).first()
@@ -118,17 +144,12 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         else:
             agent_id = random.randint(10000, 99999)
         
-        user_tasks = UserChatPipeline()
+        user_tasks = get_user_chat_pipeline()
 
         response = user_tasks.handle_chat(user_id, user_input_text, agent_id)
-        
-        data = {
-            "raw": response.answer,
-            "config": response.config.dict() if hasattr(response.config, "dict") else response.config
-        }
 
-        user_tasks._save_chat_history(user_id, agent_id, user_input_text, data)
-        
+        # handle_chat already queued the turn for user_chats
+        data = chat_record(response)
         data["agent_id"] = agent_id
 
         return {"response": data}
@@ -136,73 +157,151 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    """Server-sent events variant of /chat: answer tokens stream as they arrive, the config once it validates."""
+    user_id = request.user_id
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=400, detail= f"User with id '{request.user_id}' not present")
+
+    user_input_text = request.user_input
+    agent_id = request.agent_id or random.randint(10000, 99999)
+    user_tasks = get_user_chat_pipeline()
+
+    async def event_stream():
+        yield sse_event("start", {"agent_id": agent_id})
+        try:
+            async for event, payload in user_tasks.astream_chat(user_id, user_input_text, agent_id):
+                if event != "done":
+                    yield sse_event(event, payload)
+                    continue
+
+                data = chat_record(payload)
+                data["agent_id"] = agent_id
+                yield sse_event("done", {"response": data})
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
-@app.get("/agent_marketplace", response_model=None)
-async def agent_marketplace(db: Session = Depends(get_db)):
-    agents = db.query(Agent).filter(Agent.is_deployed == True, Agent.is_active == True).order_by(Agent.created_date.desc()).all()  # Fetch all agents
+@app.get("/metrics/chat_cache")
+async def chat_cache_metrics():
+    return {"status": "success", "response": get_user_chat_pipeline().response_cache.stats()}
 
-    total_agents = len(agents)
-    deployed_agents = sum(1 for agent in agents if agent.is_deployed)
-    valid_performance_values = [
-        float(agent.performance.strip('%')) for agent in agents
-        if agent.performance and agent.performance.strip('%').replace(".", "", 1).isdigit()
-    ]
+@app.get("/metrics/chain")
+async def chain_metrics():
+    return {"status": "success", "response": dict(chain.stats(), balances=balances.stats(), clone_worker=clone_worker.stats())}
 
-    avg_performance = (
-        sum(valid_performance_values) / len(valid_performance_values)
-        if valid_performance_values else 0
-    )
+@app.get("/metrics/chat_history")
+async def chat_history_metrics():
+    return {"status": "success", "response": chat_history_writer.stats()}
 
-    results = (
-        db.query(UserCommission.agent_id, func.sum(UserCommission.amount_eth).label("total_eth"))
-        .filter(UserCommission.is_commissioned == True, UserCommission.is_active == True)
-        .group_by(UserCommission.agent_id)
-        .all()
-    )
-    
-    total_aum = 0
-    agents_aum = {}
-    for agent_id, total_eth in results:
-        agents_aum[agent_id] = total_eth
-        total_aum += total_eth
-    
-    response = {
-        "stats": {
-            "totalAgents": total_agents,
-            "deployedAgents": deployed_agents,
-            "totalAUM": format_amount_eth(str(total_aum)),  # Convert to million format
-            "avgPerformance": f"+{avg_performance:.1f}%" if total_agents else "N/A",
-        },
-        "agents": [
-            {
-                "id": agent.id,
-                "name": agent.name,
-                "description": agent.description,
-                "image": format_image(agent.image, agent.image_content),
-                "performance": agent.performance or random.choice(PERFORMANCE),
-                "aum": format_amount_eth(str(agents_aum[agent.id])) if agent.id in agents_aum else 0,
-                "il": f"{agent.il}%" if agent.il is not None else "N/A",
-                "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
-                "tags": agent.tags if agent.tags else [],
-                "is_deployed": agent.is_deployed,
-                "is_active": agent.is_active,
-                "is_trending": agent.is_trending,
-                "created_date": agent.created_date.strftime("%Y-%m-%d") if agent.created_date else "N/A",
-                "subscription_fee": agent.subscription_fee,
-                "clone_fee": format_amount_eth(str(agent.clone_fee)),
-                "cloned_by": agent.cloned_by,
-            }
-            for agent in agents
-        ],
-    }
+@app.get("/metrics/response_cache")
+async def response_cache_metrics():
+    return {"status": "success", "response": response_cache.stats()}
 
-    return {"status": "success", "response": response}
+@app.get("/market/latest/{ticker}")
+async def market_latest(ticker: str):
+    # Newest stored candle and indicators, straight from the ingest job's hot cache
+    try:
+        candle = get_hot_cache().latest(ticker.upper())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if candle is None:
+        raise HTTPException(status_code=404, detail=f"No recent candle for {ticker}")
+    return {"status": "success", "response": candle}
+
+@app.post("/optimize_config")
+def optimize_agent_config(request: OptimizeConfigRequest, db: Session = Depends(get_db)):
+    # Sync on purpose: the search is CPU bound and runs in the threadpool (and its process pool)
+    base_config = request.config or DEFAULT_CONFIG
+    try:
+        config_params(base_config)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid config: {e}")
+
+    ticker = ticker_for_pair(base_config['pool_details']['token_pair'])
+    start = datetime.combine(request.start_date, datetime.min.time())
+    end = datetime.combine(request.end_date, datetime.min.time()) + timedelta(days=1) if request.end_date else None
+    if (end or datetime.utcnow()) - start > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+    if end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    # A range reaching past the newest candle still gains candles; end it there so new candles miss the cache
+    last = last_candle_at(db, ticker)
+    if last is not None and (end is None or end > last):
+        end = last + timedelta(minutes=1)
+    elif end is None:
+        end = start
+    key = cache_key(ticker, start, end, request.interval, request.method, request.budget, request.steps, base_config)
+
+    def run():
+        candles = load_candles(db, ticker, start, end, request.interval)
+        return optimize_config(candles, base_config, method=request.method, budget=request.budget, steps=request.steps)
+
+    try:
+        result, cached = cached_optimize(key, run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "response": dict(result, ticker=ticker, cached=cached)}
+
+@app.get("/images/{image_hash}")
+async def get_image_blob(image_hash: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Content-addressed: a hash always names the same bytes, so clients may cache forever
+    etag = f'"{image_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    blob = await db.run_sync(get_image, image_hash)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(content=blob.data, media_type=blob.content_type, headers=headers)
+
+@app.get("/agent_marketplace", response_model=None)
+async def agent_marketplace(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = Query("created_date", description="created_date, performance, aum, weekly_reward or name"),
+    order: str = Query("desc", description="asc or desc"),
+    category: str = Query(None),
+    trending: bool = Query(None),
+    tag: str = Query(None),
+    search: str = Query(None, description="Part of the agent name"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        etag, body = await db.run_sync(
+            marketplace_response, page, page_size, sort=sort, order=order, category=category, trending=trending, tag=tag, search=search
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
 
 @app.post("/my_agents", response_model=None)
-async def my_agents(request: MyAgent, db: Session = Depends(get_db)):
+def my_agents(request: MyAgent, db: Session = Depends(get_db)):
+    return response_cache.get_or_set("my_agents", {"user_id": request.user_id}, [user_tag(request.user_id)],
+                                     lambda: user_agents(db, request))
+
+def user_agents(db: Session, request: MyAgent):
     agents = db.query(Agent).filter(Agent.user_id == request.user_id, Agent.is_active == True).order_by(Agent.created_date.desc()).all()
 
     if not agents:
@@ -237,8 +336,7 @@ async def my_agents(request: MyAgent, db: Session = Depends(get_db)):
     total_agents = len(agents)
     deployed_agents = sum(1 for agent in agents if agent.is_deployed)
     valid_performance_values = [
-        float(agent.performance.strip('%')) for agent in agents
-        if agent.performance and agent.performance.strip('%').replace(".", "", 1).isdigit()
+        value for value in (parse_percent(agent.performance) for agent in agents) if value is not None
     ]
 
     avg_performance = (
@@ -251,15 +349,15 @@ async def my_agents(request: MyAgent, db: Session = Depends(get_db)):
             "totalAgents": total_agents,
             "deployedAgents": deployed_agents,
             "totalAUM": format_amount_eth(str(total_aum)),  # Convert to million format
-            "avgPerformance": f"+{avg_performance:.1f}%" if total_agents else "N/A",
+            "avgPerformance": f"{avg_performance:+.1f}%" if total_agents else "N/A",
         },
         "agents": [
             {
                 "id": agent.id,
                 "name": agent.name,
                 "description": agent.description,
-                "image": format_image(agent.image, agent.image_content),
-                "performance": agent.performance or random.choice(PERFORMANCE),
+                "image": format_thumbnail(agent),
+                "performance": agent.performance or "N/A",
                 "aum": format_amount_eth(str(agents_aum[agent.id])) if agent.id in agents_aum else 0,
                 "il": f"{agent.il}%" if agent.il is not None else "N/A",
                 "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
@@ -305,7 +403,7 @@ async def agent_tools_and_capabilities(request: CategorySelectionRequest):
     return {"status": "success", "response": response}
 
 @app.post("/build_agent")
-async def build_agent(
+def build_agent(
     id: int = Form(...),
     name: str = Form(...),
     category: str = Form(...),
@@ -322,17 +420,16 @@ async def build_agent(
     if not user: 
         raise HTTPException(status_code=400, detail= f"User with id '{user_id}' not present")
     
-    image_data = None
-    content_type = None
+    image_hash = thumbnail_hash = None
 
     if image:
-        raw_image = await image.read()
-        content_type = image.content_type  
-
         try:
-            image_data = resize_image(raw_image, content_type)
-        except Exception as e:
+            # Decoded and encoded on the image process pool, off this thread's GIL
+            images = process_upload(image.file.read())
+        except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        image_hash = store_image(db, images["full"], IMAGE_CONTENT_TYPE)
+        thumbnail_hash = store_image(db, images["thumbnail"], IMAGE_CONTENT_TYPE)
     try:
         config_data = json.loads(config)
     except Exception:
@@ -353,8 +450,8 @@ async def build_agent(
         description = description,
         user_id = user_id,
         config = config_data,
-        image = image_data,
-        image_content = content_type,
+        image_hash = image_hash,
+        thumbnail_hash = thumbnail_hash,
         tags = tags,
         clone_fee = Decimal(clone_fee),
         subscription_fee = subscription_fee,
@@ -370,11 +467,18 @@ async def build_agent(
     db.commit()
     db.refresh(new_agent)
 
+    # Chats for the placeholder agent may still be queued for the background writer
+    chat_history_writer.flush()
     db.query(UserChat).filter(UserChat.user_id == user.id, UserChat.agent_id == ph_agent_id).update(
         {UserChat.agent_id: new_agent.id}, synchronize_session=False
     )
+    db.query(UserChatSummary).filter(UserChatSummary.user_id == user.id, UserChatSummary.agent_id == ph_agent_id).update(
+        {UserChatSummary.agent_id: new_agent.id}, synchronize_session=False
+    )
 
     db.commit()
+    invalidate_agent(new_agent)
+    response_cache.invalidate(chat_tag(user.id, ph_agent_id), chat_tag(user.id, new_agent.id))
 
     return {
         "status": "success",
@@ -383,7 +487,7 @@ async def build_agent(
     }
 
 @app.post("/deploy_agent")
-async def update_agent(request: BuildAgentRequest, db: Session = Depends(get_db)):
+def update_agent(request: BuildAgentRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == request.user_id).first()
 
     if not user: 
@@ -426,6 +530,12 @@ async def update_agent(request: BuildAgentRequest, db: Session = Depends(get_db)
     db.add(agent)
     db.commit()
     db.refresh(agent)
+    # Undeploying deactivates commissions across agents, so every row's AUM may change
+    refresh_marketplace(db, [agent.id] if request.is_deployed else None)
+    if request.is_deployed:
+        invalidate_agent(agent)
+    else:
+        response_cache.invalidate(ALL_TAG)
 
     return {
         "status": "success",
@@ -440,14 +550,14 @@ def verify_signature(wallet_address: str, message: str, signature: str) -> bool:
 
 
 @app.post("/wallet_auth")
-async def wallet_auth(req: WalletAuthRequest, db: Session = Depends(get_db)):
+async def wallet_auth(req: WalletAuthRequest, db: AsyncSession = Depends(get_async_db)):
     auth_wallet_address = req.wallet_address
 
     if not verify_signature(auth_wallet_address, req.message, req.signature):
         raise HTTPException(status_code=400, detail="Invalid signature")
     
     
-    user = db.query(User).filter(User.auth_wallet_address == auth_wallet_address).first()
+    user = (await db.execute(select(User).where(User.auth_wallet_address == auth_wallet_address))).scalars().first()
 
     if not user:
         account = w3.eth.account.create()
@@ -456,8 +566,8 @@ async def wallet_auth(req: WalletAuthRequest, db: Session = Depends(get_db)):
         public_key = w3.eth.account.from_key(private_key)._key_obj.public_key.to_hex() 
         user = User(auth_wallet_address = auth_wallet_address, wallet_address = wallet_address, public_key = public_key, private_key = private_key)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     return {
         "user_id": user.id,
@@ -468,8 +578,11 @@ async def wallet_auth(req: WalletAuthRequest, db: Session = Depends(get_db)):
 @app.get("/agent_history/{user_id}")
 async def get_agent_history_for_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[Dict[str, Any]]:
+    return await db.run_sync(agent_history_for_user, user_id)
+
+def agent_history_for_user(db: Session, user_id: int) -> List[Dict[str, Any]]:
     """
     For a given user_id, fetch all agent_ids from UserCommission,
     then return each agent's details along with up to 10 most recent history entries
@@ -491,56 +604,21 @@ async def get_agent_history_for_user(
         return []
     
     agents = db.query(Agent).filter(Agent.is_active == True, Agent.user_id == user_id).all()
-    
+
+    # 2) Up to 10 most recent history entries and the rebalance count of every agent, in one query each
+    agent_ids = [agent.id for agent in agents]
+    histories = latest_history(db, agent_ids)
+    rebalance_count = rebalance_counts(db, agent_ids)
 
     response: List[Dict[str, Any]] = []
     for agent in agents:
-        # 4) Fetch up to 10 most recent history entries
-        histories = (
-            db.query(AgentHistory)
-              .filter(AgentHistory.agent_id == agent.id)
-              .order_by(AgentHistory.created_at.desc())
-              .all()
-        )
-
-        reason_to_type = {
-            'Position out of range; executed rebalance': 'rebalanced',
-            'No action; position in range': 'in_range',
-            'Skipped; within rebalance timeframe': 'skipped',
-            'Initial liquidity deployment': 'initial',
-            'Applied below-trigger': 'Below Trigger Rebalance',
-            'Applied above-trigger': 'Above Trigger Rebalance',
-            'Applied positive bias to current price': 'Positive Bias',
-            'Applied negative bias to current price': 'Negative Bias'
-        }
-
-        hist_list = [{
-                "event": h.reason,
-                "type": reason_to_type.get(h.reason, "unknown"),
-                "rebalance_bias": h.rebalance_bias,
-                "positive_bias": h.positive_bias,
-                "timestamp": h.created_at.isoformat()
-            }
-            for h in histories
-        ]
-
-        # 5) Count total rebalances (where last_rebalanced_at is not null)
-        rebalance_count = (
-            db.query(AgentHistory)
-              .filter(
-                  
-                  AgentHistory.agent_id == agent.id,
-                  AgentHistory.last_rebalanced_at.isnot(None)
-              )
-              .count()
-        )
 
         response.append({
             "id": agent.id,
             "agentName": agent.name,
             "description": agent.description,
-            "image": format_image(agent.image, agent.image_content),
-            "performance": agent.performance or random.choice(PERFORMANCE),
+            "image": format_thumbnail(agent),
+            "performance": agent.performance or "N/A",
             "aum": f"${float(agent.aum) / 1_000:.1f}K" if agent.aum and agent.aum.replace(".", "", 1).isdigit() else 0,
             "il": f"{agent.il}%" if agent.il is not None else "N/A",
             "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
@@ -554,15 +632,15 @@ async def get_agent_history_for_user(
             "is_active": agent.is_active,
             "is_trending": agent.is_trending,
             "performance": getattr(agent, 'performance', None),
-            "rebalanceCount": rebalance_count,
-            "agentHistory": hist_list,
+            "rebalanceCount": rebalance_count.get(agent.id, 0),
+            "agentHistory": [history_entry(h) for h in histories.get(agent.id, [])],
         })
 
     return response
 
 @app.get("/get_private_key")
-async def private_key(id: int = Query(..., description="ID of the agent to update"), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == id).first()
+async def private_key(id: int = Query(..., description="ID of the agent to update"), db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, id)
 
     if not user:
         return {
@@ -573,7 +651,7 @@ async def private_key(id: int = Query(..., description="ID of the agent to updat
     return {"status": "success", "private_key": user.private_key}
 
 @app.post("/commission")
-async def save_user_commission(request: CreateUserCommission, db: Session = Depends(get_db)):
+def save_user_commission(request: CreateUserCommission, db: Session = Depends(get_db)):
     agent = db.query(Agent).filter(Agent.id == request.agent_id, Agent.is_active==True, Agent.is_deployed == True).first()
 
     if not agent:
@@ -605,6 +683,8 @@ async def save_user_commission(request: CreateUserCommission, db: Session = Depe
     db.add(user_commission)
     db.commit()
     db.refresh(user_commission)
+    refresh_marketplace(db, [agent.id])
+    invalidate_agent(agent, user.id)
 
     return {
         "status": "success",
@@ -614,7 +694,13 @@ async def save_user_commission(request: CreateUserCommission, db: Session = Depe
     }
 
 @app.post("/get_agent")
-async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
+async def get_agent(request: GetAgent, db: AsyncSession = Depends(get_async_db)):
+    # The default date range ends today, so the day is part of the key
+    params = dict(request.model_dump(), today=date.today())
+    tags = [agent_tag(request.agent_id), user_tag(request.user_id), STATS_TAG]
+    return await response_cache.aget_or_set("get_agent", params, tags, lambda: db.run_sync(agent_details, request))
+
+def agent_details(db: Session, request: GetAgent):
     user_id = request.user_id
     if user_id:
         user = db.query(User).filter(User.id == user_id).first()
@@ -627,42 +713,9 @@ async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
     if not agent:
         raise HTTPException(status_code=400, detail= f"Agent with '{request.agent_id}' not present")
     
-    histories = (
-            db.query(AgentHistory)
-              .filter(AgentHistory.agent_id == agent.id)
-              .order_by(AgentHistory.created_at.desc())
-              .all()
-        )
-    
-    reason_to_type = {
-        'Position out of range; executed rebalance': 'rebalanced',
-        'No action; position in range': 'in_range',
-        'Skipped; within rebalance timeframe': 'skipped',
-        'Initial liquidity deployment': 'initial',
-        'Applied below-trigger': 'Below Trigger Rebalance',
-        'Applied above-trigger': 'Above Trigger Rebalance',
-        'Applied positive bias to current price': 'Positive Bias',
-        'Applied negative bias to current price': 'Negative Bias'
-    }
-
-    hist_list = [{
-            "event": h.reason,
-            "type": reason_to_type.get(h.reason, "unknown"),
-            "rebalance_bias": h.rebalance_bias,
-            "positive_bias": h.positive_bias,
-            "timestamp": h.created_at.isoformat()
-        }
-        for h in histories
-    ]
-
-    rebalance_count = (
-            db.query(AgentHistory)
-              .filter(
-                  AgentHistory.agent_id == agent.id,
-                  AgentHistory.last_rebalanced_at.isnot(None)
-              )
-              .count()
-        )
+    # Newest page of the history; older pages come from /agent/{agent_id}/history
+    histories, history_cursor = history_page(db, agent.id)
+    rebalance_count = rebalance_counts(db, [agent.id]).get(agent.id, 0)
     
     clone_agent = db.query(Agent).filter(Agent.cloned_by == agent.id, Agent.user_id == user.id, Agent.is_active == True).first() if user_id else None
 
@@ -687,23 +740,24 @@ async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
         paused_at = user_commission.paused_at.strftime("%Y-%m-%d")
 
     
+    start_date, end_date = request.start_date, request.end_date
     if not start_date:
-        end_date = datetime.utcnow()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=7)
     elif not end_date:
-        end_date = datetime.utcnow()
+        end_date = datetime.utcnow().date()
 
     agent_daily_stats = db.query(AgentDailyStat).filter(
         AgentDailyStat.agent_id == agent.id,
-        AgentDailyStat.created_at >= start_date.date(),
-        AgentDailyStat.created_at <= end_date.date()
+        AgentDailyStat.created_at >= start_date,
+        AgentDailyStat.created_at < end_date + timedelta(days=1)
     ).order_by(AgentDailyStat.created_at.asc()).all()
 
     stats = []
 
     for stat in agent_daily_stats:
         params = {
-            "date": stat.created_a.isoformat(),
+            "date": stat.created_at.isoformat(),
             "invested_eth": float(stat.total_invested_eth),
             "reward_earned": float(stat.total_reward_earned),
             "impermanent_loss": float(stat.total_impermanent_loss),
@@ -716,8 +770,8 @@ async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
         "id": agent.id,
         "agentName": agent.name,
         "description": agent.description,
-        "image": format_image(agent.image, agent.image_content),
-        "performance": agent.performance or random.choice(PERFORMANCE),
+        "image": format_image(agent.image_hash),
+        "performance": agent.performance or "N/A",
         "aum": format_amount_eth(str(result.total_eth)) if result else 0,
         "il": f"{agent.il}%" if agent.il is not None else "N/A",
         "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
@@ -736,7 +790,8 @@ async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
         "is_commissioned": user_commission.is_commissioned if user_commission else False,
         "user_id": agent.user_id,
         "rebalanceCount": rebalance_count,
-        "agentHistory": hist_list,
+        "agentHistory": [history_entry(h) for h in histories],
+        "historyCursor": history_cursor,
         "agent_stats": stats
     }
     
@@ -745,8 +800,29 @@ async def get_agent(request: GetAgent, db: Session = Depends(get_db)):
         "response": data
     }
 
+@app.get("/agent/{agent_id}/history")
+async def get_agent_history_page(
+    agent_id: int,
+    cursor: str = Query(None, description="historyCursor / next_cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of an agent's history, newest first."""
+    try:
+        histories, next_cursor = await db.run_sync(history_page, agent_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "success",
+        "response": {
+            "agentHistory": [history_entry(h) for h in histories],
+            "next_cursor": next_cursor
+        }
+    }
+
 @app.post("/update_agent")
-async def deploy_agent(request: DeployAgent, db: Session = Depends(get_db)):
+def deploy_agent(request: DeployAgent, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == request.user_id).first()
 
     if not user:
@@ -773,6 +849,11 @@ async def deploy_agent(request: DeployAgent, db: Session = Depends(get_db)):
     db.add(agent)
 
     db.commit()
+    refresh_marketplace(db, [agent.id] if request.is_deployed else None)
+    if request.is_deployed:
+        invalidate_agent(agent)
+    else:
+        response_cache.invalidate(ALL_TAG)
 
     return {
         "status_code": 200,
@@ -781,51 +862,80 @@ async def deploy_agent(request: DeployAgent, db: Session = Depends(get_db)):
     }
 
 @app.post("/wallet_balance")
-async def get_wallet_balance(request: GetWalletBalance, db: Session = Depends(get_db)):
+async def get_wallet_balance(request: GetWalletBalance):
     wallet_address = request.wallet_address
 
     if not w3.is_address(wallet_address):
         raise HTTPException(status_code=400, detail="Invalid wallet address")
     
     try:
-        balance_wei = w3.eth.get_balance(wallet_address)
-        balance_eth = w3.from_wei(balance_wei, 'ether')
-        balance_eth = Decimal(balance_eth)
+        balance_eth = await balances.get_balance(wallet_address)
         return {
             "wallet_address": wallet_address,
             "wallet_balance": format(balance_eth.normalize(), 'f')
         }
+    except ChainTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching balance: {str(e)}")
     
+@app.post("/wallet_balances")
+async def get_wallet_balances(request: GetWalletBalances):
+    invalid = [address for address in request.wallet_addresses if not w3.is_address(address)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid wallet addresses: {', '.join(invalid)}")
+
+    try:
+        results = await balances.get_balances(request.wallet_addresses)
+    except ChainTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching balances: {str(e)}")
+
+    return {
+        "status": "success",
+        "response": [
+            {"wallet_address": address, "wallet_balance": format(balance.normalize(), 'f'), "block": block}
+            for address, (block, balance) in results.items()
+        ]
+    }
+
 @app.get("/user_chat_history")
-def get_user_chat_history(user_id: int, agent_id: int, db: Session = Depends(get_db)):
-    # Query the UserChat model and filter by user_id and agent_id
-    chats = (
-        db.query(UserChat)
-        .filter(UserChat.user_id == user_id, UserChat.agent_id == agent_id)
-        .order_by(UserChat.created_at.desc())  # Sorting by created_at in descending order
-        .all()
-    )
+def get_user_chat_history(
+    user_id: int,
+    agent_id: int,
+    before: str = Query(None, description="before_cursor of a page: older chats"),
+    after: str = Query(None, description="after_cursor of a page: newer chats"),
+    limit: int = Query(20, ge=1, le=100),
+    include_response: bool = Query(True, description="False leaves out each chat's response JSON"),
+    db: Session = Depends(get_db)
+):
+    """One page of the user's chats with the agent, newest first."""
+    params = {"user_id": user_id, "agent_id": agent_id, "before": before, "after": after, "limit": limit, "include_response": include_response}
+    return response_cache.get_or_set("user_chat_history", params, [chat_tag(user_id, agent_id)],
+                                     lambda: user_chat_history(db, **params))
 
-    # If no chats found, return an HTTP 404
-    if not chats:
+def user_chat_history(db: Session, user_id: int, agent_id: int, before: str, after: str, limit: int, include_response: bool):
+    try:
+        chats, before_cursor, after_cursor = chat_page(db, user_id, agent_id, before, after, limit, include_response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # If the pair has no chats at all, return an HTTP 404
+    if not chats and not (before or after):
         raise HTTPException(status_code=404, detail="No chat history found for the given user and agent.")
 
-    # Return a list of chat histories (you can customize the response format as needed)
-    chat_history = [
-        {
-            "user_query": chat.user_query,
-            "response": chat.response,
-            "created_at": chat.created_at
+    return {
+        "status": "success",
+        "response": {
+            "chats": [chat_entry(chat, include_response) for chat in chats],
+            "before_cursor": before_cursor,
+            "after_cursor": after_cursor
         }
-        for chat in chats
-    ]
-
-    return chat_history
+    }
 
 @app.post("/update_commission")
-async def update_commission(request: UpdateCommission, db: Session = Depends(get_db)):
+def update_commission(request: UpdateCommission, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == request.user_id).first()
 
     if not user:
@@ -850,6 +960,8 @@ async def update_commission(request: UpdateCommission, db: Session = Depends(get
 
     db.add(user_commission)
     db.commit()
+    refresh_marketplace(db, [agent.id])
+    invalidate_agent(agent, user.id)
 
     return {
         "status": "success",
@@ -858,7 +970,10 @@ async def update_commission(request: UpdateCommission, db: Session = Depends(get
 
 
 @app.get("/user_commission/{user_id}")
-async def get_agent_history_for_user( user_id: int, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
+async def get_user_commissions(user_id: int, db: AsyncSession = Depends(get_async_db)) -> List[Dict[str, Any]]:
+    return await db.run_sync(user_commissions, user_id)
+
+def user_commissions(db: Session, user_id: int) -> List[Dict[str, Any]]:
     """
     For a given user_id, fetch all agent_ids from UserCommission,
     then return each agent's details along with up to 10 most recent history entries
@@ -891,54 +1006,20 @@ async def get_agent_history_for_user( user_id: int, db: Session = Depends(get_db
           .all()
     )
 
+    # 4) Up to 10 most recent history entries and the rebalance count of every agent, in one query each
+    histories = latest_history(db, agent_ids)
+    rebalance_count = rebalance_counts(db, agent_ids)
+
     response: List[Dict[str, Any]] = []
     for agent in agents:
-        # 4) Fetch up to 10 most recent history entries
-        histories = (
-            db.query(AgentHistory)
-              .filter(AgentHistory.agent_id == agent.id)
-              .order_by(AgentHistory.created_at.desc())
-              .limit(10)
-              .all()
-        )
-
-        reason_to_type = {
-            'Position out of range; executed rebalance': 'rebalanced',
-            'No action; position in range': 'in_range',
-            'Skipped; within rebalance timeframe': 'skipped',
-            'Initial liquidity deployment': 'initial',
-            'Applied below-trigger': 'Below Trigger Rebalance',
-            'Applied above-trigger': 'Above Trigger Rebalance',
-            'Applied positive bias to current price': 'Positive Bias',
-            'Applied negative bias to current price': 'Negative Bias'
-        }
-
-        hist_list = [{
-                "event": h.reason,
-                "type": reason_to_type.get(h.reason, "unknown"),
-                "rebalance_bias": h.rebalance_bias,
-                "positive_bias": h.positive_bias,
-                "timestamp": h.created_at.isoformat()
-            }
-            for h in histories
-        ]
-
-        # 5) Count total rebalances (where last_rebalanced_at is not null)
-        rebalance_count = (
-            db.query(AgentHistory)
-              .filter(
-                  AgentHistory.agent_id == agent.id,
-                  AgentHistory.last_rebalanced_at.isnot(None)
-              )
-              .count()
-        )
+        paused_at = commission_paused_at[agent.id]
 
         response.append({
             "id": agent.id,
             "agentName": agent.name,
             "description": agent.description,
-            "image": format_image(agent.image, agent.image_content),
-            "performance": agent.performance or random.choice(PERFORMANCE),
+            "image": format_thumbnail(agent),
+            "performance": agent.performance or "N/A",
             "aum": f"${float(agent.aum) / 1_000:.1f}K" if agent.aum and agent.aum.replace(".", "", 1).isdigit() else 0,
             "il": f"{agent.il}%" if agent.il is not None else "N/A",
             "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
@@ -950,26 +1031,20 @@ async def get_agent_history_for_user( user_id: int, db: Session = Depends(get_db
             "duration": "N/A",  # Placeholder
             "is_commissioned": True,
             "is_active": commission_state[agent.id],
-            "paused_at": commission_paused_at(agent.id).strftime("%Y-%m-%d"),
+            "paused_at": paused_at.strftime("%Y-%m-%d") if paused_at else None,
             "is_trending": agent.is_trending,
             "amount_eth": format_amount_eth(str(commission_amounts[agent.id])),
-            "rebalanceCount": rebalance_count,
-            "agentHistory": hist_list,
+            "rebalanceCount": rebalance_count.get(agent.id, 0),
+            "agentHistory": [history_entry(h) for h in histories.get(agent.id, [])],
         })
 
     response = sorted(response, key=lambda x: not x["is_active"])
 
     return response
 
-def format_amount_eth(amount: str):
-    amount_float = float(Decimal(amount))
-    formatted_amount = format(amount_float, '.10f').rstrip('0').rstrip('.')
-
-    return formatted_amount
-    
 
 @app.post("/update_amount_eth")
-async def add_token(request: UpdateAmountEth, db: Session = Depends(get_db)):
+def add_token(request: UpdateAmountEth, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == request.user_id).first()
 
     if not user:
@@ -996,6 +1071,8 @@ async def add_token(request: UpdateAmountEth, db: Session = Depends(get_db)):
 
     db.add(user_commission)
     db.commit()
+    refresh_marketplace(db, [agent.id])
+    invalidate_agent(agent, user.id)
 
     return {
         "status": "success",
@@ -1004,7 +1081,7 @@ async def add_token(request: UpdateAmountEth, db: Session = Depends(get_db)):
 
 
 @app.post("/delete_agent")
-async def delete_agent(request: DeleteAgent, db: Session = Depends(get_db)):
+def delete_agent(request: DeleteAgent, db: Session = Depends(get_db)):
     agent = db.query(Agent).filter(Agent.id == request.agent_id, Agent.is_active == True).first()
 
     if not agent:
@@ -1029,14 +1106,57 @@ async def delete_agent(request: DeleteAgent, db: Session = Depends(get_db)):
             synchronize_session=False
     )
     db.commit()
+    invalidate_agent(agent)
     
     return {
         "status": "success",
         "message": f"Agent deleted succesfully"
     }
 
-@app.post("/clone_agent")
-async def clone_agent(req: CloneAgent, db: Session = Depends(get_db)):
+@app.post("/clone_agent", status_code=202)
+async def clone_agent(req: CloneAgent, db: AsyncSession = Depends(get_async_db)):
+    """
+    Broadcast the clone fee and return a job at once; the clone worker creates the
+    agent when the transfer confirms. Follow the job at /clone_jobs/{job_id} or /ws/clone_jobs/{job_id}.
+    """
+    agent, user, receiver = await db.run_sync(clone_parties, req)
+    try:
+        job = await db.run_sync(create_clone_job, user.id, agent, req.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One transfer per sender at a time, so concurrent clones get consecutive nonces
+    async with chain.sender_lock(user.wallet_address):
+        try:
+            signed_tx, nonce = await chain.sign_transfer(user.private_key, user.wallet_address, receiver.wallet_address, job.fee_amount)
+        except ChainTimeout as e:
+            await db.run_sync(fail_clone_job, job.id, str(e))
+            raise HTTPException(status_code=504, detail=str(e))
+        except Exception as e:
+            await db.run_sync(fail_clone_job, job.id, str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+
+        tx_hash = w3.to_hex(signed_tx.hash)
+        raw_tx = w3.to_hex(signed_tx.raw_transaction)
+        if not await db.run_sync(broadcast_clone_job, job.id, tx_hash, user.wallet_address, nonce, raw_tx):
+            raise HTTPException(status_code=500, detail="Clone job was finished before its transfer was sent")
+
+        try:
+            await chain.broadcast(raw_tx)
+        except ChainRejected as e:
+            await db.run_sync(fail_clone_job, job.id, str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            # The transfer may have reached the node; the clone worker resends it or fails the job by its nonce
+            print(f"Sending clone job {job.id} transfer failed: {e}")
+
+    return {
+        "status": "success",
+        "response": {"job_id": job.id, "status": "broadcast", "tx_hash": tx_hash}
+    }
+
+def clone_parties(db: Session, req: CloneAgent):
+    """The agent to clone, the cloning user and the agent's owner, who receives the clone fee."""
     agent = db.query(Agent).filter(Agent.id == req.agent_id, Agent.is_active == True).first()
 
     if not agent:
@@ -1046,106 +1166,53 @@ async def clone_agent(req: CloneAgent, db: Session = Depends(get_db)):
     if not user: 
         raise HTTPException(status_code=400, detail=f"User with id '{req.user_id}' not present")
     
-    sender_wallet_address = user.wallet_address
-    sender_private_key = user.private_key
     receiver = db.query(User).filter(User.id == agent.user_id).first()
 
     if not receiver or not receiver.wallet_address:
         raise HTTPException(status_code=400, detail="Receiver wallet address not found")
 
-    receiver_wallet_address = receiver.wallet_address
+    # Checked before the fee is sent; create_clone_job then reserves the name
+    if clone_name_taken(db, req.name):
+        raise HTTPException(status_code=400, detail=f"Agent with name '{req.name}' already exists")
 
-    amount_in_eth = agent.clone_fee or Decimal('0') 
-    amount_in_wei = w3.to_wei(float(amount_in_eth), 'ether')
+    return agent, user, receiver
 
-    try:
-        tx = {
-            'nonce': w3.eth.get_transaction_count(sender_wallet_address),
-            'to': receiver_wallet_address,
-            'value': amount_in_wei,
-            'gas': 21000,
-            'gasPrice': w3.eth.gas_price,
-            'chainId': 11155111  # Chain ID for Sepolia
-        }
+@app.get("/clone_jobs/{job_id}")
+async def get_clone_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.run_sync(clone_job_status, job_id)
 
-        signed_tx = w3.eth.account.sign_transaction(tx, private_key=sender_private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Clone job '{job_id}' not found")
 
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return {"status": "success", "response": job}
 
-        if receipt.status != 1:
-            raise HTTPException(status_code=500, detail="Transaction failed on chain")
-        
-        clone_fee_log = UserDailyCloneFee(
-            agent_id=agent.id,
-            user_id=receiver.id,              
-            sent_by_user_id=user.id,         
-            fee_amount=amount_in_eth
-        )
-        db.add(clone_fee_log)
-        
-    except Exception as e:
-        try:
-            error_dict = ast.literal_eval(str(e))  # safely convert string -> dict
-            error_message = error_dict.get('message', 'Something went wrong')
-        except Exception:
-            error_message = str(e)
-        raise HTTPException(status_code=500, detail= error_message)
-
-    new_agent = Agent(
-        name= req.name,
-        description=agent.description,
-        category=agent.category,
-        image=agent.image,
-        image_content=agent.image_content,
-        user_id=req.user_id,
-        cloned_by=agent.id,
-        is_deployed=False,
-        is_active=True,
-        is_trending=False,
-        performance=agent.performance or random.choice(PERFORMANCE),
-        config=agent.config,
-        tags=agent.tags,
-        subscription_fee = agent.subscription_fee,
-        clone_fee = agent.clone_fee
-    )
-
-    db.add(new_agent)
-    db.commit()
-    db.refresh(new_agent)
-    
-    data = {
-        "id": new_agent.id,
-        "agentName": new_agent.name,
-        "description": new_agent.description,
-        "image": format_image(new_agent.image, new_agent.image_content),
-        "performance": new_agent.performance or random.choice(PERFORMANCE),
-        "aum": f"${float(new_agent.aum) / 1_000:.1f}K" if new_agent.aum and new_agent.aum.replace(".", "", 1).isdigit() else 0,
-        "il": f"{new_agent.il}%" if new_agent.il is not None else "N/A",
-        "weeklyReward": f"{new_agent.weekly_reward}%" if new_agent.weekly_reward else "N/A",
-        "tags": new_agent.tags if new_agent.tags else [],
-        "created_date": new_agent.created_date.strftime("%Y-%m-%d") if new_agent.created_date else "N/A",
-        "duration": "N/A",  # Placeholder
-        "subscription_fee": new_agent.subscription_fee,
-        "clone_fee": format_amount_eth(str(new_agent.clone_fee)),
-        "cloned_by": new_agent.cloned_by,
-        "is_deployed": new_agent.is_deployed,
-        "is_active": new_agent.is_active,
-        "is_trending": new_agent.is_trending,
-        "user_id": new_agent.user_id,
-        "config": new_agent.config
-    }
-
-    return {
-        "status": "success",
-        "response": data
-    }
+@app.websocket("/ws/clone_jobs/{job_id}")
+async def watch_clone_job(websocket: WebSocket, job_id: str):
+    """Sends the job every time its status changes and closes once it is completed or failed."""
+    await websocket.accept()
+    last_status = None
+    try:
+        while True:
+            async with get_async_sessionmaker()() as db:
+                job = await db.run_sync(clone_job_status, job_id)
+            if job is None:
+                await websocket.send_json({"status": "error", "detail": f"Clone job '{job_id}' not found"})
+                break
+            if job["status"] != last_status:
+                await websocket.send_json({"status": "success", "response": job})
+                last_status = job["status"]
+            if last_status in FINISHED:
+                break
+            await asyncio.sleep(clone_worker.poll_interval)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
 
 @app.get("/search_agent_name/{agent_name}")
-async def search_agent_name(agent_name: str, db: Session = Depends(get_db)):
+async def search_agent_name(agent_name: str, db: AsyncSession = Depends(get_async_db)):
     is_existing = False
 
-    agent = db.query(Agent).filter(Agent.name.ilike(agent_name)).first()
+    agent = (await db.execute(select(Agent.id).where(Agent.name.ilike(agent_name)).limit(1))).first()
     is_existing = True if agent else False
 
     return {
@@ -1155,31 +1222,38 @@ async def search_agent_name(agent_name: str, db: Session = Depends(get_db)):
     }
 
 @app.post("/user_stats")
-async def get_user_stats( req: DailyFeeAnalyticsRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == req.user_id).first()
+async def get_user_stats( req: DailyFeeAnalyticsRequest, db: AsyncSession = Depends(get_async_db)):
+    params = dict(req.model_dump(), today=date.today())
+    return await response_cache.aget_or_set("user_stats", params, [user_tag(req.user_id), STATS_TAG], lambda: user_stats(db, req))
+
+async def user_stats(db: AsyncSession, req: DailyFeeAnalyticsRequest):
+    user = await db.get(User, req.user_id)
 
     if not user:
         raise HTTPException(status_code=400, detail= f"User with id '{req.user_id}' not present")
     
+    start_date, end_date = req.start_date, req.end_date
     if not start_date:
-        end_date = datetime.utcnow()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=7)
     elif not end_date:
-        end_date = datetime.utcnow()
+        end_date = datetime.utcnow().date()
 
-    stats = db.query(UserDailyStat).filter(
-        UserDailyStat.user_id == req.user_id,
-        UserDailyStat.created_at >= start_date.date(),
-        UserDailyStat.created_at <= end_date.date()
-    ).order_by(UserDailyStat.created_at.asc()).all()
+    stats = (await db.execute(
+        select(UserDailyStat).where(
+            UserDailyStat.user_id == req.user_id,
+            UserDailyStat.created_at >= start_date,
+            UserDailyStat.created_at < end_date + timedelta(days=1)
+        ).order_by(UserDailyStat.created_at.asc())
+    )).scalars().all()
 
     if not stats:
         raise HTTPException(status_code=404, detail="No stats found for this user in the given date range")
 
     return {
         "user_id": req.user_id,
-        "start_date": start_date.date().isoformat(),
-        "end_date": end_date.date().isoformat(),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
         "stats": [
             {
                 "date": stat.created_at.isoformat(),
@@ -1197,6 +1271,10 @@ async def get_user_stats( req: DailyFeeAnalyticsRequest, db: Session = Depends(g
 
 @app.post("/user_earned_fees",response_model=List[DailyFeeAnalyticsResponse])
 def get_daily_fee_analytics( req: DailyFeeAnalyticsRequest, db: Session = Depends(get_db)):
+    params = dict(req.model_dump(), today=date.today())
+    return response_cache.get_or_set("user_earned_fees", params, [user_tag(req.user_id), STATS_TAG], lambda: daily_fee_analytics(db, req))
+
+def daily_fee_analytics(db: Session, req: DailyFeeAnalyticsRequest):
 
     user = db.query(User).filter(User.id == req.user_id).first()
 
@@ -1237,17 +1315,17 @@ def get_daily_fee_analytics( req: DailyFeeAnalyticsRequest, db: Session = Depend
         fee_map[row.day] = {
             "date": row.day,
             "clone_fee": float(row.total_clone_fee),
-            "usage_fee": 0.0
+            "fee_earned": 0.0
         }
 
     for row in usage_fees:
         if row.day in fee_map:
-            fee_map[row.day]["usage_fee"] = float(row.total_usage_fee)
+            fee_map[row.day]["fee_earned"] = float(row.total_usage_fee)
         else:
             fee_map[row.day] = {
                 "date": row.day,
                 "clone_fee": 0.0,
-                "usage_fee": float(row.total_usage_fee)
+                "fee_earned": float(row.total_usage_fee)
             }
 
     # Ensure 0 values for missing days
@@ -1257,7 +1335,7 @@ def get_daily_fee_analytics( req: DailyFeeAnalyticsRequest, db: Session = Depend
             fee_map[d] = {
                 "date": d,
                 "clone_fee": 0.0,
-                "usage_fee": 0.0
+                "fee_earned": 0.0
             }
 
     return sorted(fee_map.values(), key=lambda x: x["date"])
@@ -0,0 +1 @@
+from .engine import backtest_configs, config_params, last_candle_at, load_candles, shutdown_backtest_pool, simulate
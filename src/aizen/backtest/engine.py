@@ -0,0 +1,211 @@
+"""
+Backtests of agent configs over candles stored in crypto_prices.
+
+Every config starts with the same capital in a Uniswap V3 position ranged
+around the first candle. At each candle the position earns its share of that
+candle's fees while the price is inside its range. Once per
+`rebalance_timeframe` minutes an out-of-range position is closed and re-opened
+around the current tick with `tick_range`. If `triggered_range` fires against
+the position's current range, the trigger's lower/higher widths replace the
+config's liquidity_range.
+
+This is not a replay of the live rebalance job, which shares the two helpers
+but not what follows a trigger. The job measures deviation against a range
+it computes around the tick at the start of each run. It turns a fired
+trigger's lower/higher into a base tick, (lower + higher) / 2, and ranges
+around that with the config's liquidity_range. Otherwise it shifts the tick
+by the LLM bias, which cannot be replayed. Scores describe what the config's
+triggers ask for, not what the job does with them.
+
+The simulation steps through time once and treats all configs as arrays, so
+scoring a thousand configs costs about as much per candle as scoring one.
+`backtest_configs` also splits large batches across a shared process pool.
+
+Model assumptions:
+- ticks are those of the candle's USD price, floored as slot0 reports them;
+- candle volume is in USD;
+- the pool's other in-range liquidity is worth `pool_tvl` USD as a full-range
+  position (concentrated positions count many times their deposit);
+- each rebalance loses `rebalance_cost` of the position's value to swaps and gas.
+"""
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+
+from src.aizen.models import CryptoPrice
+from src.aizen.protocols.ticks import tick_range, tick_spacing, triggered_range
+from src.aizen.signals.batch_indicators import TIMEFRAMES
+
+DEFAULT_CAPITAL = 10_000.0
+DEFAULT_POOL_TVL = 1_000_000_000.0
+REBALANCE_COST = 0.003
+CHUNK_CONFIGS = 256         # Configs per worker task
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+
+RESULT_COLUMNS = ["performance", "il", "weekly_reward", "daily_rebalance", "time_in_range", "fees", "final_value"]
+
+
+def load_candles(session, ticker: str, start: datetime, end: Optional[datetime] = None, interval: str = "1m") -> pd.DataFrame:
+    """Stored candles for one ticker as a date-indexed frame of price and volume, resampled to `interval`."""
+    query = session.query(CryptoPrice.date, CryptoPrice.close_price, CryptoPrice.volume) \
+        .filter(CryptoPrice.ticker == ticker, CryptoPrice.date >= start)
+    if end is not None:
+        query = query.filter(CryptoPrice.date < end)
+    candles = pd.DataFrame(query.order_by(CryptoPrice.date).all(), columns=["date", "price", "volume"]).set_index("date")
+    candles = candles.astype({"price": float}).fillna({"volume": 0})
+    if interval != "1m" and not candles.empty:
+        candles = candles.resample(TIMEFRAMES[interval]).agg({"price": "last", "volume": "sum"}).dropna(subset=["price"])
+    return candles
+
+
+def last_candle_at(session, ticker: str) -> Optional[datetime]:
+    """Date of the newest stored candle for `ticker`, or None if it has none."""
+    return session.query(func.max(CryptoPrice.date)).filter(CryptoPrice.ticker == ticker).scalar()
+
+
+def config_params(config: dict) -> dict:
+    """The fields of an agent config the backtest reads; raises KeyError/ValueError for unusable configs."""
+    return {
+        "lower": float(config["liquidity_range"]["lower"]),
+        "upper": float(config["liquidity_range"]["higher"]),
+        "buffer": float(config.get("buffer", 0)),
+        "spacing": tick_spacing(config["pool_details"]["fee_tier"]),
+        "fee_rate": config["pool_details"]["fee_tier"] / 100,
+        "timeframe": float(config["rebalance_timeframe"]),
+        "triggers": config.get("rebalance_triggers") or {}
+    }
+
+
+def _value_per_liquidity(sqrt_price, sqrt_lower, sqrt_upper):
+    """USD value of one unit of liquidity: token0 valued at the price plus token1."""
+    s = np.clip(sqrt_price, sqrt_lower, sqrt_upper)
+    return (1 / s - 1 / sqrt_upper) * sqrt_price ** 2 + (s - sqrt_lower)
+
+
+def _sqrt_tick_price(tick):
+    return np.sqrt(1.0001 ** np.asarray(tick, dtype=np.float64))
+
+
+def simulate(minutes, price, volume, params: List[dict], capital=DEFAULT_CAPITAL, pool_tvl=DEFAULT_POOL_TVL,
+             rebalance_cost=REBALANCE_COST) -> pd.DataFrame:
+    """
+    Run every config in `params` (see config_params) over one price series.
+
+    `minutes` are candle times in minutes from the first candle. Returns one row
+    per config with RESULT_COLUMNS: performance, il, weekly_reward and
+    time_in_range in percent, daily_rebalance as a count per day, and fees and
+    final_value in USD.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    ticks = np.floor(np.log(price) / math.log(1.0001)).astype(np.int64)
+    sqrt_price = np.sqrt(price)
+
+    n = len(params)
+    lower = np.array([p["lower"] for p in params])
+    upper = np.array([p["upper"] for p in params])
+    fee_rate = np.array([p["fee_rate"] for p in params])
+    timeframe = np.array([p["timeframe"] for p in params])
+
+    def open_range(i, tick, range_lower, range_upper):
+        return tick_range(int(tick), range_lower, range_upper, params[i]["buffer"], params[i]["spacing"])
+
+    ranges = np.array([open_range(i, ticks[0], lower[i], upper[i]) for i in range(n)], dtype=np.int64).reshape(n, 2)
+    lo, hi = ranges[:, 0].copy(), ranges[:, 1].copy()
+    sqrt_lo, sqrt_hi = _sqrt_tick_price(lo), _sqrt_tick_price(hi)
+    liquidity = capital / _value_per_liquidity(sqrt_price[0], sqrt_lo, sqrt_hi)
+
+    # What the first deposit would be worth if simply held
+    s0 = np.clip(sqrt_price[0], sqrt_lo, sqrt_hi)
+    hodl_token0 = liquidity * (1 / s0 - 1 / sqrt_hi)
+    hodl_token1 = liquidity * (s0 - sqrt_lo)
+
+    fees = np.zeros(n)
+    rebalances = np.zeros(n, dtype=np.int64)
+    in_range_candles = np.zeros(n, dtype=np.int64)
+    last_check = np.full(n, minutes[0], dtype=np.float64)
+
+    for t in range(1, len(price)):
+        tick = ticks[t]
+        in_range = (lo <= tick) & (tick <= hi)
+        in_range_candles += in_range
+        # Share of the candle's fees: our liquidity against the pool's full-range equivalent
+        pool_liquidity = pool_tvl / (2 * sqrt_price[t])
+        fees += np.where(in_range, fee_rate * volume[t] * liquidity / (liquidity + pool_liquidity), 0.0)
+
+        due = minutes[t] - last_check >= timeframe
+        if not due.any():
+            continue
+        last_check[due] = minutes[t]
+        for i in np.flatnonzero(due & ~in_range):
+            triggered = triggered_range(tick, lo[i], hi[i], params[i]["triggers"])
+            range_lower, range_upper = (triggered[0], triggered[1]) if triggered else (lower[i], upper[i])
+            value = liquidity[i] * _value_per_liquidity(sqrt_price[t], sqrt_lo[i], sqrt_hi[i]) * (1 - rebalance_cost)
+
+            lo[i], hi[i] = open_range(i, tick, range_lower, range_upper)
+            sqrt_lo[i], sqrt_hi[i] = _sqrt_tick_price(lo[i]), _sqrt_tick_price(hi[i])
+            liquidity[i] = value / _value_per_liquidity(sqrt_price[t], sqrt_lo[i], sqrt_hi[i])
+            rebalances[i] += 1
+
+    final_value = liquidity * _value_per_liquidity(sqrt_price[-1], sqrt_lo, sqrt_hi)
+    hodl_value = hodl_token0 * price[-1] + hodl_token1
+    days = max((minutes[-1] - minutes[0]) / 1440, 1 / 1440)
+    return pd.DataFrame({
+        "performance": ((final_value + fees) / capital - 1) * 100,
+        "il": (final_value / hodl_value - 1) * 100,
+        "weekly_reward": fees / capital * 100 / days * 7,
+        "daily_rebalance": rebalances / days,
+        "time_in_range": in_range_candles / max(len(price) - 1, 1) * 100,
+        "fees": fees,
+        "final_value": final_value
+    }, columns=RESULT_COLUMNS)
+
+
+def _simulate_chunk(args):
+    return simulate(*args[0], **args[1])
+
+
+@lru_cache(maxsize=1)
+def get_backtest_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the API process has running threads (DB pools, chain RPC) a fork would copy mid-flight
+    return ProcessPoolExecutor(max_workers=BACKTEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def shutdown_backtest_pool():
+    if get_backtest_pool.cache_info().currsize:
+        get_backtest_pool().shutdown(wait=False, cancel_futures=True)
+        get_backtest_pool.cache_clear()
+
+
+def backtest_configs(candles: pd.DataFrame, configs: List[dict], workers: Optional[int] = None,
+                     chunk_size: int = CHUNK_CONFIGS, **kwargs) -> pd.DataFrame:
+    """
+    Backtest agent configs over a frame from `load_candles`; one result row per config, in order.
+
+    Batches larger than `chunk_size` are split across the shared pool of
+    BACKTEST_WORKERS processes, which is started once and reused by every call.
+    `workers=1` runs everything in this process. Extra keyword arguments go to
+    `simulate`.
+    """
+    if len(candles) < 2:
+        raise ValueError("Need at least two candles to backtest")
+    dates = candles.index.values
+    minutes = (dates - dates[0]) / np.timedelta64(1, "m")
+    series = (minutes, candles["price"].to_numpy(), candles["volume"].to_numpy())
+    params = [config_params(config) for config in configs]
+
+    workers = workers or BACKTEST_WORKERS
+    if workers == 1 or len(params) <= chunk_size:
+        return simulate(*series, params, **kwargs)
+
+    chunks = [(series + (params[i:i + chunk_size],), kwargs) for i in range(0, len(params), chunk_size)]
+    results = list(get_backtest_pool().map(_simulate_chunk, chunks))
+    return pd.concat(results, ignore_index=True)
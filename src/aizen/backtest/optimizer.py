@@ -0,0 +1,187 @@
+"""
+Config search over the backtest engine.
+
+Candidates are an agent config with some fields replaced, addressed by dotted
+paths such as "liquidity_range.lower". A search space maps each path to a
+(low, high) tuple for continuous fields or a list of choices. Every candidate
+of a round is scored in one `backtest_configs` call, and the result is the
+Pareto front of fee yield (weekly_reward, higher is better) against
+impermanent loss (il, closer to zero is better) and daily_rebalance (lower
+is better).
+"""
+import copy
+import hashlib
+import itertools
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .engine import backtest_configs
+
+DEFAULT_SPACE = {
+    "liquidity_range.lower": (0.01, 0.3),
+    "liquidity_range.higher": (0.01, 0.3),
+    "buffer": (0.0, 0.1),
+    "rebalance_timeframe": [5, 15, 30, 60, 240]
+}
+# Searched as well when the base config has rebalance triggers
+TRIGGER_SPACE = {
+    "rebalance_triggers.below.by": (5.0, 100.0),
+    "rebalance_triggers.above.by": (5.0, 100.0)
+}
+
+OBJECTIVES = {"weekly_reward": 1, "il": 1, "daily_rebalance": -1}   # 1 maximize, -1 minimize
+CACHE_SIZE = 64
+MAX_RANGE_DAYS = int(os.getenv("OPTIMIZE_MAX_DAYS", "90"))     # Longest candle range a search may backtest
+
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def default_space(base_config: dict) -> dict:
+    space = dict(DEFAULT_SPACE)
+    triggers = base_config.get("rebalance_triggers") or {}
+    for path, bounds in TRIGGER_SPACE.items():
+        if path.split(".")[1] in triggers:
+            space[path] = bounds
+    return space
+
+
+def apply_params(base_config: dict, params: dict) -> dict:
+    config = copy.deepcopy(base_config)
+    for path, value in params.items():
+        *parents, leaf = path.split(".")
+        node = config
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return config
+
+
+def _value(path, value):
+    # Timeframes are whole minutes in AgentConfig
+    return int(value) if path == "rebalance_timeframe" else round(float(value), 4)
+
+
+def grid_size(space: dict, steps: int = 5) -> int:
+    return math.prod(len(bounds) if isinstance(bounds, list) else steps for bounds in space.values())
+
+
+def grid_params(space: dict, steps: int = 5) -> List[dict]:
+    axes = []
+    for path, bounds in space.items():
+        values = bounds if isinstance(bounds, list) else np.linspace(bounds[0], bounds[1], steps)
+        axes.append([(path, _value(path, v)) for v in values])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def random_params(space: dict, count: int, rng, parents: Optional[List[dict]] = None, scale: float = 1.0) -> List[dict]:
+    """
+    `count` random candidates, uniform over the space or, given `parents`,
+    perturbed around randomly picked parents by `scale` of each range.
+    """
+    candidates = []
+    for _ in range(count):
+        parent = parents[rng.integers(len(parents))] if parents else None
+        params = {}
+        for path, bounds in space.items():
+            if isinstance(bounds, list):
+                keep = parent is not None and rng.random() < 0.7
+                params[path] = parent[path] if keep else bounds[rng.integers(len(bounds))]
+            elif parent is None:
+                params[path] = _value(path, rng.uniform(*bounds))
+            else:
+                width = (bounds[1] - bounds[0]) * scale
+                params[path] = _value(path, np.clip(rng.normal(parent[path], width), *bounds))
+        candidates.append(params)
+    return candidates
+
+
+def pareto_front(results: pd.DataFrame, objectives: Dict[str, int] = OBJECTIVES) -> np.ndarray:
+    """Boolean mask of the rows no other row beats on every objective."""
+    values = np.column_stack([results[column].to_numpy() * sign for column, sign in objectives.items()])
+    front = np.ones(len(values), dtype=bool)
+    for i in range(len(values)):
+        if not front[i]:
+            continue
+        dominated = np.all(values <= values[i], axis=1) & np.any(values < values[i], axis=1)
+        front &= ~dominated
+    return front
+
+
+def optimize_config(candles: pd.DataFrame, base_config: dict, space: Optional[dict] = None, method: str = "random",
+                    budget: int = 1000, rounds: int = 4, steps: int = 5, seed: int = 0, workers: Optional[int] = None,
+                    **kwargs) -> dict:
+    """
+    Search the space around `base_config` and return {'front', 'evaluated'}.
+
+    "grid" scores every combination of `steps` values per continuous field,
+    and raises ValueError if that is more than `budget` candidates. "random"
+    spends `budget` over `rounds`. The first round samples uniformly;
+    each later round samples around the current Pareto front in a shrinking
+    neighbourhood. The front lists each optimal candidate's config and its
+    backtest results, sorted by weekly_reward.
+    """
+    space = space or default_space(base_config)
+    rng = np.random.default_rng(seed)
+
+    if method == "grid":
+        size = grid_size(space, steps)
+        if size > budget:
+            raise ValueError(f"Grid of {size} candidates exceeds the budget of {budget}; lower steps or raise budget")
+        batches = [grid_params(space, steps)]
+    elif method == "random":
+        batches = None
+    else:
+        raise ValueError(f"Unknown optimizer method: {method}")
+
+    evaluated: List[dict] = []
+    results = []
+    per_round = max(budget // rounds, 1)
+    for round_number in range(1 if batches else rounds):
+        if batches:
+            candidates = batches[0]
+        elif round_number == 0:
+            candidates = random_params(space, per_round, rng)
+        else:
+            front = pareto_front(pd.concat(results, ignore_index=True))
+            parents = [evaluated[i] for i in np.flatnonzero(front)]
+            candidates = random_params(space, per_round, rng, parents, scale=0.2 * 0.5 ** (round_number - 1))
+
+        configs = [apply_params(base_config, params) for params in candidates]
+        results.append(backtest_configs(candles, configs, workers=workers, **kwargs))
+        evaluated += candidates
+
+    results = pd.concat(results, ignore_index=True)
+    front = results[pareto_front(results)].sort_values("weekly_reward", ascending=False)
+    return {
+        "front": [
+            {"params": evaluated[i], "config": apply_params(base_config, evaluated[i]), "results": row.round(4).to_dict()}
+            for i, row in front.iterrows()
+        ],
+        "evaluated": len(results)
+    }
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cached_optimize(key: str, run) -> Tuple[dict, bool]:
+    """Result of `run()` for `key`, from the process-wide LRU cache when present; also returns whether it was."""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key], True
+    result = run()
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result, False
@@ -0,0 +1,2 @@
+from .ttl import TTLCache
+from .response import ALL_TAG, STATS_TAG, ResponseCache, agent_tag, chat_tag, get_response_cache, user_tag
@@ -0,0 +1,209 @@
+"""
+Cache of endpoint responses, invalidated by tags.
+
+Entries are keyed by route and parameters and carry tags such as "user:12"
+or "agent:7". Each tag has a version number. The versions of an entry's tags
+are part of its key, so `invalidate(tag)` bumps the version and every entry
+tagged with it stops matching. Nothing has to be scanned or deleted; stale
+entries age out through the TTL or the backend's eviction. Every entry also
+carries ALL_TAG, so `invalidate(ALL_TAG)` drops everything.
+
+Two backends exist:
+- MemoryBackend is a per-process LRU (the default);
+- RedisBackend is shared by every API worker and by the scheduler, so writes
+  from jobs reach the API. Set RESPONSE_CACHE_URL=redis://... to use it; it
+  needs the `redis` package. Its calls block on the network, so the async
+  methods of ResponseCache run them in a worker thread.
+
+With the memory backend, invalidations from another process never arrive,
+and RESPONSE_CACHE_TTL bounds how stale an entry can get. Values are stored
+as their jsonable_encoder form, so a hit returns exactly what FastAPI would
+have serialized on a miss. Callers must not change what `get` returns.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "5000"))
+KEY_PREFIX = "aizen:response:"
+ALL_TAG = "*"
+STATS_TAG = "daily_stats"     # Rows written by the daily stats and fee jobs
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()     # key -> (expires_at, value)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: List[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisBackend:
+    blocking = True
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str):
+        value = self._redis.get(KEY_PREFIX + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value, ttl: float):
+        self._redis.set(KEY_PREFIX + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def versions(self, tags: List[str]) -> List[int]:
+        values = self._redis.mget([f"{KEY_PREFIX}tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    def bump(self, tags: List[str]):
+        pipeline = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{KEY_PREFIX}tag:{tag}")
+        pipeline.execute()
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float = RESPONSE_CACHE_TTL) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {}    # route -> counters
+
+    def _record(self, route: str, name: str):
+        with self._lock:
+            stats = self._stats.setdefault(route, {"hits": 0, "misses": 0, "errors": 0})
+            stats[name] += 1
+
+    def _key(self, route: str, params: dict, tags: List[str]) -> Optional[str]:
+        versions = self.backend.versions(tags)
+        raw = json.dumps([route, params, tags, versions], sort_keys=True, default=str)
+        return f"{route}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def get(self, route: str, params: dict, tags: Iterable[str]):
+        """(key, value): the cached value or None, and the key to `set` it under after a miss."""
+        tags = sorted(set(tags) | {ALL_TAG})
+        try:
+            key = self._key(route, params, tags)
+            value = self.backend.get(key)
+        except Exception as e:
+            # A cache outage must not take the endpoint down with it
+            logger.warning(f"Response cache lookup for {route} failed: {e}")
+            self._record(route, "errors")
+            return None, None
+        self._record(route, "misses" if value is None else "hits")
+        return key, value
+
+    def set(self, route: str, key: Optional[str], value):
+        """Store `value` under `key` and return its encoded form."""
+        value = jsonable_encoder(value)
+        if key is None:
+            return value
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache store for {route} failed: {e}")
+            self._record(route, "errors")
+        return value
+
+    def get_or_set(self, route: str, params: dict, tags: Iterable[str], compute: Callable[[], Any]):
+        key, value = self.get(route, params, tags)
+        if value is None:
+            value = self.set(route, key, compute())
+        return value
+
+    async def _offload(self, method, *args):
+        # Keep a blocking backend's round trips off the event loop
+        if getattr(self.backend, "blocking", True):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def aget_or_set(self, route: str, params: dict, tags: Iterable[str], compute: Callable[[], Awaitable[Any]]):
+        key, value = await self._offload(self.get, route, params, tags)
+        if value is None:
+            value = await self._offload(self.set, route, key, await compute())
+        return value
+
+    def invalidate(self, *tags: str):
+        if not tags:
+            return
+        try:
+            self.backend.bump(list(tags))
+        except Exception as e:
+            logger.warning(f"Response cache invalidation of {tags} failed: {e}")
+
+    async def ainvalidate(self, *tags: str):
+        await self._offload(self.invalidate, *tags)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                route: dict(stats, hit_rate=stats["hits"] / max(stats["hits"] + stats["misses"], 1))
+                for route, stats in self._stats.items()
+            }
+        return {"backend": type(self.backend).__name__, "ttl": self.ttl, "routes": routes}
+
+
+def user_tag(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def agent_tag(agent_id) -> str:
+    return f"agent:{agent_id}"
+
+
+def chat_tag(user_id, agent_id) -> str:
+    return f"chat:{user_id}:{agent_id}"
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    if RESPONSE_CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            return ResponseCache(RedisBackend(RESPONSE_CACHE_URL))
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_URL points at Redis but the redis package is missing; caching in memory")
+    return ResponseCache(MemoryBackend())
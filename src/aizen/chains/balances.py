@@ -0,0 +1,133 @@
+"""
+Cached, batched ETH balance lookups.
+
+`batch_balances` fetches many balances in JSON-RPC batches. Each batch also
+carries eth_blockNumber, so every balance is tagged with the block it was
+read at. BalanceService keeps those readings for BALANCE_CACHE_TTL seconds,
+about one Sepolia block. Concurrent requests for an address already being
+fetched wait on that fetch instead of issuing their own, and the addresses
+still missing are fetched together in one batch.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from web3 import Web3
+
+from .service import SEPOLIA_RPC_URL, ChainService, get_chain_service
+
+logger = logging.getLogger(__name__)
+
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "12"))
+BALANCE_BATCH_SIZE = int(os.getenv("BALANCE_BATCH_SIZE", "100"))
+BALANCE_CACHE_SIZE = 10_000     # Expired entries are dropped once the cache grows past this
+
+
+def batch_balances(w3: Web3, addresses: List[str], batch_size: int = BALANCE_BATCH_SIZE) -> Dict[str, Tuple[int, int]]:
+    """Checksum address -> (block number, balance in wei), `batch_size` addresses per JSON-RPC batch."""
+    balances = {}
+    for i in range(0, len(addresses), batch_size):
+        chunk = addresses[i:i + batch_size]
+        with w3.batch_requests() as batch:
+            batch.add(w3.eth.get_block_number())
+            for address in chunk:
+                batch.add(w3.eth.get_balance(address, "latest"))
+            block, *wei = batch.execute()
+        balances.update((address, (block, value)) for address, value in zip(chunk, wei))
+    return balances
+
+
+def to_eth(w3: Web3, wei: int) -> Decimal:
+    return Decimal(w3.from_wei(wei, 'ether'))
+
+
+class BalanceService:
+    def __init__(self, chain: ChainService, rpc_url: str = SEPOLIA_RPC_URL, ttl: float = BALANCE_CACHE_TTL,
+                 batch_size: int = BALANCE_BATCH_SIZE) -> None:
+        self.chain = chain
+        # Batching switches the whole provider into batch mode, so batches get a provider of their own
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": chain.timeout}))
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._batch_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[float, int, int]] = {}     # address -> (expires_at, block, wei)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "batches": 0, "fetched": 0}
+
+    def _fetch(self, addresses: List[str]) -> Dict[str, Tuple[int, int]]:
+        with self._batch_lock:
+            return batch_balances(self.w3, addresses, self.batch_size)
+
+    async def get_balances(self, addresses: Iterable[str]) -> Dict[str, Tuple[int, Decimal]]:
+        """
+        Checksum address -> (block number, balance in ETH) for every address.
+
+        Raises ValueError for an invalid address and ChainTimeout when the node
+        does not answer in time.
+        """
+        addresses = list(dict.fromkeys(Web3.to_checksum_address(address) for address in addresses))
+        now = time.monotonic()
+        found, waiting, missing = {}, {}, []
+        for address in addresses:
+            cached = self._cache.get(address)
+            if cached is not None and cached[0] > now:
+                found[address] = cached[1:]
+                self._stats["hits"] += 1
+            elif address in self._in_flight:
+                waiting[address] = self._in_flight[address]
+                self._stats["coalesced"] += 1
+            else:
+                missing.append(address)
+                self._stats["misses"] += 1
+
+        if missing:
+            future = asyncio.get_running_loop().create_future()
+            # Nobody may be waiting on it; don't let an unread error get logged
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            for address in missing:
+                self._in_flight[address] = future
+            try:
+                fetched = await self.chain.call("get_balances", self._fetch, missing,
+                                                timeout=self.chain.timeout * (len(missing) // self.batch_size + 1))
+                future.set_result(fetched)
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                for address in missing:
+                    self._in_flight.pop(address, None)
+            self._stats["batches"] += 1
+            self._stats["fetched"] += len(missing)
+            expires_at = time.monotonic() + self.ttl
+            if len(self._cache) > BALANCE_CACHE_SIZE:
+                self._cache = {address: entry for address, entry in self._cache.items() if entry[0] > now}
+            for address, (block, wei) in fetched.items():
+                self._cache[address] = (expires_at, block, wei)
+            found.update(fetched)
+
+        for address, future in waiting.items():
+            found[address] = (await future)[address]
+
+        return {address: (found[address][0], to_eth(self.w3, found[address][1])) for address in addresses}
+
+    async def get_balance(self, address: str) -> Decimal:
+        return next(iter((await self.get_balances([address])).values()))[1]
+
+    def invalidate(self, *addresses: str):
+        """Forget cached balances, e.g. of both sides of a transfer just made."""
+        for address in addresses:
+            self._cache.pop(Web3.to_checksum_address(address), None)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return dict(self._stats, cached=sum(1 for entry in self._cache.values() if entry[0] > now), in_flight=len(self._in_flight))
+
+
+@lru_cache(maxsize=1)
+def get_balance_service() -> BalanceService:
+    return BalanceService(get_chain_service())
@@ -0,0 +1,150 @@
+"""
+Background confirmation of clone fee transfers.
+
+/clone_agent records the signed fee transfer on its job, sends it and returns.
+CloneWorker runs on the API's event loop. Every CLONE_POLL_INTERVAL seconds it
+reads the open clone jobs from the database and asks the node for their
+receipts through ChainService, so no thread is held while a block is mined. A
+mined transfer completes its job and creates the agent; a reverted one fails it.
+
+A broadcast job without a receipt is never failed for taking long, since its
+transfer can still be mined. It fails only once the sender's nonce count has
+passed the job's nonce, meaning another transaction used the nonce. A transfer
+the node does not know (the send timed out or was dropped from the mempool) is
+sent again. Jobs still pending after CLONE_CONFIRM_TIMEOUT seconds never had a
+transfer signed, because the process died mid-request, and fail.
+
+The jobs live in the database, so a restarted API resumes where it stopped.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from src.aizen.cache import agent_tag, get_response_cache, user_tag
+from src.aizen.database import get_async_sessionmaker
+from src.aizen.repositories.clones import clone_job_wallets, complete_clone_job, fail_clone_job, open_clone_jobs
+from .balances import get_balance_service
+from .service import ChainRejected, ChainService, ChainTimeout, get_chain_service
+
+logger = logging.getLogger(__name__)
+
+CLONE_POLL_INTERVAL = float(os.getenv("CLONE_POLL_INTERVAL", "3"))
+CLONE_CONFIRM_TIMEOUT = float(os.getenv("CLONE_CONFIRM_TIMEOUT", "600"))
+
+
+class CloneWorker:
+    def __init__(self, chain: ChainService, poll_interval: float = CLONE_POLL_INTERVAL,
+                 confirm_timeout: float = CLONE_CONFIRM_TIMEOUT) -> None:
+        self.chain = chain
+        self.poll_interval = poll_interval
+        self.confirm_timeout = confirm_timeout
+        self._task = None
+        self._stats = {"polls": 0, "completed": 0, "failed": 0, "expired": 0, "rebroadcast": 0, "errors": 0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="clone-worker")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Clone worker poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self):
+        """Check every open job once."""
+        self._stats["polls"] += 1
+        async with get_async_sessionmaker()() as db:
+            jobs = await db.run_sync(open_clone_jobs)
+        for job, result in zip(jobs, await asyncio.gather(*(self._check(job) for job in jobs), return_exceptions=True)):
+            if isinstance(result, Exception):
+                self._stats["errors"] += 1
+                logger.error(f"Checking clone job {job.id} failed: {result}")
+
+    async def _check(self, job):
+        receipt = mined_nonces = None
+        if job.tx_hash:
+            try:
+                # Read the nonce count before the receipt: a count past the job's nonce
+                # with no receipt then means another transaction took the nonce
+                if job.nonce is not None:
+                    mined_nonces = await self.chain.get_transaction_count(job.sender)
+                receipt = await self.chain.get_receipt(job.tx_hash)
+                if receipt is None and mined_nonces is not None and mined_nonces <= job.nonce:
+                    await self._rebroadcast(job)
+            except ChainTimeout:
+                return
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Receipt lookup for clone job {job.id} failed: {e}")
+                return
+
+        async with get_async_sessionmaker()() as db:
+            if receipt is None:
+                if not job.tx_hash:
+                    if job.updated_at and datetime.utcnow() - job.updated_at > timedelta(seconds=self.confirm_timeout):
+                        if await db.run_sync(fail_clone_job, job.id, "Transaction was never broadcast"):
+                            self._stats["expired"] += 1
+                            logger.warning(f"Clone job {job.id} expired before its transfer was signed")
+                elif mined_nonces is not None and mined_nonces > job.nonce:
+                    if await db.run_sync(fail_clone_job, job.id, "Transaction was replaced by another with the same nonce"):
+                        self._stats["failed"] += 1
+                        logger.warning(f"Clone job {job.id} failed: nonce {job.nonce} of {job.sender} was used by another transaction")
+                return
+
+            if receipt.status != 1:
+                if await db.run_sync(fail_clone_job, job.id, "Transaction failed on chain"):
+                    self._stats["failed"] += 1
+                return
+
+            try:
+                finished = await db.run_sync(complete_clone_job, job.id)
+            except Exception as e:
+                # Retrying would fail the same way every poll; fail the job so the user sees why
+                await db.rollback()
+                error = f"Clone could not be created: {getattr(e, 'orig', None) or e}"
+                if await db.run_sync(fail_clone_job, job.id, error):
+                    self._stats["failed"] += 1
+                    logger.error(f"Clone job {job.id} failed after its transfer confirmed: {e}")
+                return
+            if finished is None:
+                return
+            self._stats["completed"] += 1
+            logger.info(f"Clone job {job.id} created agent {finished.new_agent_id}")
+            get_balance_service().invalidate(*await db.run_sync(clone_job_wallets, finished))
+        # The receiver's earned fees and the cloner's agents both changed
+        await get_response_cache().ainvalidate(agent_tag(finished.new_agent_id), user_tag(finished.user_id), user_tag(finished.receiver_id))
+
+    async def _rebroadcast(self, job):
+        """Send the job's transfer again if the node has lost it."""
+        if not job.raw_tx or await self.chain.knows_transaction(job.tx_hash):
+            return
+        try:
+            await self.chain.broadcast(job.raw_tx)
+            self._stats["rebroadcast"] += 1
+            logger.info(f"Resent clone job {job.id} transfer {job.tx_hash}")
+        except ChainRejected as e:
+            # E.g. the nonce was just used; the next poll sees the count move past it
+            logger.warning(f"Node refused clone job {job.id} transfer {job.tx_hash}: {e}")
+
+    def stats(self) -> dict:
+        return dict(self._stats, running=self._task is not None and not self._task.done())
+
+
+@lru_cache(maxsize=1)
+def get_clone_worker() -> CloneWorker:
+    return CloneWorker(get_chain_service())
@@ -0,0 +1,217 @@
+"""
+Async access to the Sepolia node for the API.
+
+web3's HTTPProvider is synchronous. ChainService runs every RPC call on its own
+bounded thread pool, so a slow node or a transaction waiting for its receipt
+ties up one pool thread instead of the event loop. Calls that outlive their
+timeout raise ChainTimeout. The HTTP request underneath carries the same
+timeout, so the pool thread is freed soon after. `stats()` reports the queue
+depth (calls waiting for a thread), calls in flight, and per-method counts,
+errors, timeouts and latency.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import lru_cache
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound, Web3RPCError
+
+logger = logging.getLogger(__name__)
+
+SEPOLIA_RPC_URL = os.getenv("SEPOLIA_RPC_URL", "https://sepolia.infura.io/v3/35be664c4dfe4302abed873f7a231f42")
+SEPOLIA_CHAIN_ID = 11155111
+CHAIN_RPC_WORKERS = int(os.getenv("CHAIN_RPC_WORKERS", "16"))
+CHAIN_RPC_TIMEOUT = float(os.getenv("CHAIN_RPC_TIMEOUT", "10"))
+CHAIN_RECEIPT_TIMEOUT = float(os.getenv("CHAIN_RECEIPT_TIMEOUT", "120"))
+TRANSFER_GAS = 21000
+
+
+class ChainTimeout(TimeoutError):
+    pass
+
+
+class ChainRejected(Exception):
+    """The node refused a transaction, so it was not broadcast."""
+
+
+def rpc_error_message(error: Web3RPCError) -> str:
+    detail = (error.rpc_response or {}).get("error")
+    if isinstance(detail, dict):
+        return detail.get("message") or str(detail)
+    return error.message
+
+
+class ChainService:
+    def __init__(self, rpc_url: str = SEPOLIA_RPC_URL, chain_id: int = SEPOLIA_CHAIN_ID, workers: int = CHAIN_RPC_WORKERS,
+                 timeout: float = CHAIN_RPC_TIMEOUT, receipt_timeout: float = CHAIN_RECEIPT_TIMEOUT) -> None:
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": timeout}))
+        self.chain_id = chain_id
+        self.workers = workers
+        self.timeout = timeout
+        self.receipt_timeout = receipt_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chain-rpc")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._max_queued = 0
+        self._methods = {}
+        self._sender_locks = {}
+
+    def _record(self, method: str, **counts):
+        with self._lock:
+            stats = self._methods.setdefault(method, {"calls": 0, "errors": 0, "timeouts": 0, "total_s": 0.0, "max_s": 0.0})
+            for key, value in counts.items():
+                if key == "max_s":
+                    stats[key] = max(stats[key], value)
+                else:
+                    stats[key] += value
+
+    async def call(self, method: str, fn, *args, timeout: float = None):
+        """Run `fn(*args)` on the pool and await it for at most `timeout` seconds (default: the service's)."""
+        timeout = timeout or self.timeout
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        state = {"started": False, "abandoned": False}
+
+        def run():
+            with self._lock:
+                if state["abandoned"]:
+                    return None
+                state["started"] = True
+                self._queued -= 1
+                self._in_flight += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, run)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                # Timed out while still waiting for a thread: it will never run
+                if not state["started"]:
+                    state["abandoned"] = True
+                    self._queued -= 1
+            self._record(method, timeouts=1)
+            logger.warning(f"Chain call {method} timed out after {timeout}s")
+            raise ChainTimeout(f"Chain call {method} timed out after {timeout}s")
+        except Exception:
+            self._record(method, errors=1)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._record(method, calls=1, total_s=elapsed, max_s=elapsed)
+
+    async def get_balance(self, address: str) -> Decimal:
+        """Balance of `address` in ETH."""
+        balance_wei = await self.call("get_balance", self.w3.eth.get_balance, address)
+        return Decimal(self.w3.from_wei(balance_wei, 'ether'))
+
+    def sender_lock(self, sender: str) -> asyncio.Lock:
+        """
+        Held around nonce, sign and send for `sender`.
+
+        Nonces come from the pending block, which counts transactions still in the
+        mempool, so a sender's transfers in this process get consecutive nonces.
+        """
+        with self._lock:
+            return self._sender_locks.setdefault(sender.lower(), asyncio.Lock())
+
+    async def sign_transfer(self, private_key: str, sender: str, receiver: str, amount_eth: Decimal):
+        """(signed transaction, nonce) for a transfer of `amount_eth`; hold `sender_lock` until it is broadcast."""
+        nonce = await self.call("get_transaction_count", self.w3.eth.get_transaction_count, sender, "pending")
+        gas_price = await self.call("gas_price", lambda: self.w3.eth.gas_price)
+        tx = {
+            'nonce': nonce,
+            'to': receiver,
+            'value': self.w3.to_wei(float(amount_eth), 'ether'),
+            'gas': TRANSFER_GAS,
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        }
+        return self.w3.eth.account.sign_transaction(tx, private_key=private_key), nonce
+
+    async def broadcast(self, raw_tx) -> str:
+        """Send a signed transaction; returns its hash, and raises ChainRejected if the node refuses it."""
+        raw_tx = Web3.to_bytes(hexstr=raw_tx) if isinstance(raw_tx, str) else bytes(raw_tx)
+        try:
+            await self.call("send_raw_transaction", self.w3.eth.send_raw_transaction, raw_tx)
+        except Web3RPCError as e:
+            message = rpc_error_message(e)
+            # Sent before, e.g. by a request that timed out; it is in the mempool
+            if "already known" not in message.lower() and "known transaction" not in message.lower():
+                raise ChainRejected(message) from e
+        return Web3.to_hex(Web3.keccak(raw_tx))
+
+    async def send_transfer(self, private_key: str, sender: str, receiver: str, amount_eth: Decimal) -> str:
+        """Sign and broadcast a transfer of `amount_eth` from `sender` to `receiver`; returns the tx hash."""
+        async with self.sender_lock(sender):
+            signed_tx, _ = await self.sign_transfer(private_key, sender, receiver, amount_eth)
+            return await self.broadcast(signed_tx.raw_transaction)
+
+    async def get_transaction_count(self, address: str) -> int:
+        """Transactions from `address` mined so far, i.e. the next nonce not yet used on chain."""
+        return await self.call("get_transaction_count", self.w3.eth.get_transaction_count, address)
+
+    async def knows_transaction(self, tx_hash: str) -> bool:
+        """True if the node has the transaction, mined or in its mempool."""
+        def lookup():
+            try:
+                self.w3.eth.get_transaction(tx_hash)
+                return True
+            except TransactionNotFound:
+                return False
+
+        return await self.call("get_transaction", lookup)
+
+    async def get_receipt(self, tx_hash: str):
+        """The transaction's receipt, or None while it is not mined."""
+        def receipt():
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                return None
+
+        return await self.call("get_transaction_receipt", receipt)
+
+    async def transfer(self, private_key: str, sender: str, receiver: str, amount_eth: Decimal):
+        """Send `amount_eth` from `sender` to `receiver` and wait for the receipt."""
+        tx_hash = await self.send_transfer(private_key, sender, receiver, amount_eth)
+        return await self.call(
+            "wait_for_transaction_receipt",
+            lambda: self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout),
+            timeout=self.receipt_timeout + self.timeout
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            methods = {
+                method: dict(stats, avg_s=stats["total_s"] / stats["calls"] if stats["calls"] else 0.0)
+                for method, stats in self._methods.items()
+            }
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queued,
+                "in_flight": self._in_flight,
+                "methods": methods
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_chain_service() -> ChainService:
+    return ChainService()
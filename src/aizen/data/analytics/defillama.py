@@ -4,6 +4,7 @@ import logging
 
 class DefiLlamaAPI:
     BASE_URL = "https://api.llama.fi"
+    COINS_URL = "https://coins.llama.fi"
 
     def __init__(self):
         # Set up the logger
@@ -15,15 +16,14 @@ class DefiLlamaAPI:
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
 
-    def _get(self, endpoint):
+    def _get(self, endpoint, base_url=None, params=None):
         """Helper method for making GET requests to the API with logging."""
-        url = f"{self.BASE_URL}{endpoint}"
+        url = f"{base_url or self.BASE_URL}{endpoint}"
         self.logger.info(f"Sending GET request to {url}")
         try:
-            response = requests.get(url)
+            response = requests.get(url, params=params, timeout=30)
             response.raise_for_status()
-            self.logger.info(f"Received response with status code {
-                             response.status_code}")
+            self.logger.info(f"Received response with status code {response.status_code}")
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error while making GET request: {e}")
@@ -55,11 +55,15 @@ class DefiLlamaAPI:
 
     def get_current_prices(self, coins):
         """Get current prices of tokens by contract address."""
-        return self._get(f"/prices/current/{coins}")
+        return self._get(f"/prices/current/{coins}", base_url=self.COINS_URL)
 
     def get_historical_prices(self, timestamp, coins):
         """Get historical prices of tokens by contract address."""
-        return self._get(f"/prices/historical/{timestamp}/{coins}")
+        return self._get(f"/prices/historical/{timestamp}/{coins}", base_url=self.COINS_URL)
+
+    def get_price_chart(self, coins, start, span, period):
+        """Get `span` price points `period` apart (e.g. '5m', '1h') from unix time `start`."""
+        return self._get(f"/chart/{coins}", base_url=self.COINS_URL, params={"start": start, "span": span, "period": period})
 
     def get_stablecoins(self):
         """List all stablecoins along with their circulating amounts."""
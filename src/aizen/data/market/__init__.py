@@ -0,0 +1,9 @@
+from .base import MarketDataSource, CANDLE_COLUMNS, source_metrics
+from .yfinance_source import YFinanceSource
+from .defillama_source import DefiLlamaSource
+from .replay_source import FileReplaySource
+from .cached_source import CachedSource
+from .fallback_source import FallbackSource
+from .factory import get_market_data_source, is_offline
+from .ingest import CandleIngestor
+from .hot_cache import HotCandleCache, get_hot_cache
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+CANDLE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+CANDLE_INDEX = ["ticker", "date"]
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+
+_metrics: Dict[str, dict] = {}
+_metrics_lock = threading.Lock()
+
+
+def record_source_metric(name: str, **deltas):
+    with _metrics_lock:
+        metrics = _metrics.setdefault(name, {"calls": 0, "errors": 0, "retries": 0, "rows": 0, "latency_s": 0.0, "last_error": None})
+        for key, value in deltas.items():
+            if key == "last_error":
+                metrics[key] = value
+            else:
+                metrics[key] = metrics.get(key, 0) + value
+
+
+def source_metrics() -> Dict[str, dict]:
+    """Per-source call, error and latency counters since process start."""
+    with _metrics_lock:
+        snapshot = {name: dict(metrics) for name, metrics in _metrics.items()}
+    for metrics in snapshot.values():
+        latency = metrics.pop("latency_s")
+        metrics["avg_latency_ms"] = latency / metrics["calls"] * 1000 if metrics["calls"] else 0.0
+        metrics["error_rate"] = metrics["errors"] / metrics["calls"] if metrics["calls"] else 0.0
+    return snapshot
+
+
+class MarketDataSource(ABC):
+    """
+    Source of OHLCV candles for many tickers at once.
+
+    `fetch_candles` returns a frame indexed by (ticker, date) with CANDLE_COLUMNS,
+    dates as naive UTC, sorted, one row per (ticker, date) and no missing closes.
+    Tickers served by a fallback rather than the preferred source are listed in
+    the frame's attrs["fallback"].
+    It retries failed requests with exponential backoff and records latency and
+    errors under the source's name; subclasses implement `_fetch_candles`.
+    """
+
+    name = "base"
+
+    def __init__(self, retries: int = 2, backoff: float = 0.5) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch_candles(self, tickers: Iterable[str], start: datetime, end: Optional[datetime] = None, interval: str = "1m") -> pd.DataFrame:
+        tickers = list(tickers)
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                candles = self.normalize(self._fetch_candles(tickers, start, end, interval))
+            except Exception as e:
+                record_source_metric(self.name, calls=1, errors=1, latency_s=time.perf_counter() - started, last_error=str(e))
+                if attempt == self.retries:
+                    raise
+                record_source_metric(self.name, retries=1)
+                self.logger.warning(f"{self.name} fetch failed ({e}), retrying")
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            record_source_metric(self.name, calls=1, rows=len(candles), latency_s=time.perf_counter() - started)
+            return candles
+
+    @abstractmethod
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        pass
+
+    @staticmethod
+    def empty_frame() -> pd.DataFrame:
+        index = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=CANDLE_INDEX)
+        return pd.DataFrame(columns=CANDLE_COLUMNS, index=index, dtype=float)
+
+    @staticmethod
+    def normalize(frame: pd.DataFrame) -> pd.DataFrame:
+        """Bring a (ticker, date) frame to the shape described above."""
+        attrs = dict(frame.attrs)
+        if frame.empty:
+            frame = MarketDataSource.empty_frame()
+            frame.attrs.update(attrs)
+            return frame
+
+        frame = frame[CANDLE_COLUMNS].copy()
+        dates = pd.DatetimeIndex(frame.index.get_level_values("date"))
+        if dates.tz is not None:
+            dates = dates.tz_convert("UTC").tz_localize(None)
+        frame.index = pd.MultiIndex.from_arrays([frame.index.get_level_values("ticker"), dates], names=CANDLE_INDEX)
+
+        frame = frame.dropna(subset=["Close"])
+        frame["Volume"] = pd.to_numeric(frame["Volume"], errors="coerce").fillna(0)
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        frame.attrs = attrs
+        return frame
@@ -0,0 +1,90 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from .base import INTERVAL_SECONDS, MarketDataSource, record_source_metric
+
+CACHE_DIR = os.getenv("MARKET_DATA_CACHE_DIR", "db/market_cache")
+PARTIAL_CACHE_TTL = float(os.getenv("MARKET_DATA_PARTIAL_CACHE_TTL", "3600"))   # Seconds a short or fallback result stays cached
+PUBLISH_LAG = float(os.getenv("MARKET_DATA_PUBLISH_LAG", "300"))                # Seconds upstream may take to publish a closed candle
+
+
+class CachedSource(MarketDataSource):
+    """
+    Read-through Parquet cache in front of another source.
+
+    Each (ticker, interval, start, end) range is one file under
+    <cache_dir>/<source>/<interval>/<ticker>/. Only ranges that ended at least
+    one interval plus PUBLISH_LAG ago are cached; later ones always go to the
+    wrapped source. A result with fewer candles than the range holds (empty
+    included) or served by a fallback source is kept as a partial file and only
+    trusted for `partial_ttl` seconds, since upstream may not have published all
+    of it yet. Hits and misses are counted per ticker under "cache".
+    """
+
+    name = "cache"
+
+    def __init__(self, source: MarketDataSource, cache_dir: str = CACHE_DIR, partial_ttl: float = PARTIAL_CACHE_TTL,
+                 publish_lag: float = PUBLISH_LAG) -> None:
+        super().__init__(retries=0)
+        self.source = source
+        self.cache_dir = cache_dir
+        self.partial_ttl = partial_ttl
+        self.publish_lag = publish_lag
+
+    def _path(self, ticker: str, start: datetime, end: datetime, interval: str, partial: bool = False) -> str:
+        filename = f"{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}{'.partial' if partial else ''}.parquet"
+        return os.path.join(self.cache_dir, self.source.name, interval, ticker, filename)
+
+    def _read(self, ticker: str, start: datetime, end: datetime, interval: str) -> Optional[pd.DataFrame]:
+        """The cached candles, or None if there are none or only an expired partial result."""
+        path = self._path(ticker, start, end, interval)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        path = self._path(ticker, start, end, interval, partial=True)
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) <= self.partial_ttl:
+            return pd.read_parquet(path)
+        return None
+
+    def _write(self, candles: pd.DataFrame, ticker: str, start: datetime, end: datetime, interval: str, partial: bool):
+        path = self._path(ticker, start, end, interval, partial)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        candles.to_parquet(path)
+        if not partial:
+            stale = self._path(ticker, start, end, interval, partial=True)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def cacheable(self, end: Optional[datetime], interval: str) -> bool:
+        """True if every candle up to `end` should be published by now."""
+        step = INTERVAL_SECONDS.get(interval, 0)
+        return end is not None and end <= datetime.utcnow() - timedelta(seconds=step + self.publish_lag)
+
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        if not self.cacheable(end, interval):
+            return self.source.fetch_candles(tickers, start, end, interval)
+
+        frames = []
+        missing = []
+        for ticker in tickers:
+            candles = self._read(ticker, start, end, interval)
+            if candles is not None:
+                frames.append(candles)
+            else:
+                missing.append(ticker)
+        record_source_metric(self.name, hits=len(tickers) - len(missing), misses=len(missing))
+
+        if missing:
+            fetched = self.source.fetch_candles(missing, start, end, interval)
+            fallback = set(fetched.attrs.get("fallback", ()))
+            expected = int((end - start).total_seconds() // INTERVAL_SECONDS[interval]) if interval in INTERVAL_SECONDS else 0
+            fetched_tickers = fetched.index.get_level_values("ticker")
+            for ticker in missing:
+                candles = fetched[fetched_tickers == ticker]
+                self._write(candles, ticker, start, end, interval, partial=candles.empty or len(candles) < expected or ticker in fallback)
+            frames.append(fetched)
+
+        return pd.concat(frames) if frames else self.empty_frame()
@@ -0,0 +1,60 @@
+import math
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from src.aizen.data.analytics.defillama import DefiLlamaAPI
+from .base import INTERVAL_SECONDS, MarketDataSource
+
+# Ticker -> DefiLlama coin id
+TICKER_COINS = {
+    "ETH-USD": "coingecko:ethereum",
+    "BTC-USD": "coingecko:bitcoin"
+}
+
+
+class DefiLlamaSource(MarketDataSource):
+    """
+    Prices from the DefiLlama coins API, every ticker in one chart request.
+
+    DefiLlama only publishes prices, so each candle has Open = High = Low = Close
+    and no volume. Those candles would skew the ATR, Bollinger Bands and VWAP
+    folded into crypto_prices, so it is not among the default sources.
+    """
+
+    name = "defillama"
+
+    def __init__(self, coins=TICKER_COINS, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.coins = coins
+        self.api = DefiLlamaAPI()
+
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        coin_tickers = {self.coins[t]: t for t in tickers if t in self.coins}
+        if not coin_tickers:
+            return self.empty_frame()
+
+        step = INTERVAL_SECONDS[interval]
+        end = end or datetime.utcnow()
+        start_ts = int(pd.Timestamp(start).timestamp())
+        span = max(1, math.ceil((pd.Timestamp(end).timestamp() - start_ts) / step))
+
+        data = self.api.get_price_chart(",".join(coin_tickers), start_ts, span, interval)
+        if data is None:
+            raise RuntimeError("DefiLlama price chart request failed")
+
+        records = []
+        for coin, series in data.get("coins", {}).items():
+            ticker = coin_tickers.get(coin)
+            for point in series.get("prices", []):
+                date = datetime.utcfromtimestamp(point["timestamp"])
+                if ticker and date < end:
+                    records.append((ticker, date, point["price"]))
+        if not records:
+            return self.empty_frame()
+
+        frame = pd.DataFrame(records, columns=["ticker", "date", "Close"]).set_index(["ticker", "date"])
+        frame["Open"] = frame["High"] = frame["Low"] = frame["Close"]
+        frame["Volume"] = 0
+        return frame
@@ -0,0 +1,47 @@
+import os
+from functools import lru_cache
+
+from .base import MarketDataSource
+from .cached_source import CachedSource
+from .defillama_source import DefiLlamaSource
+from .fallback_source import FallbackSource
+from .replay_source import FileReplaySource
+from .yfinance_source import YFinanceSource
+
+
+def is_offline() -> bool:
+    return os.getenv("MARKET_DATA_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def build_source(name: str) -> MarketDataSource:
+    if name == "yfinance":
+        return YFinanceSource()
+    if name == "defillama":
+        return DefiLlamaSource()
+    if name == "pool_twap":
+        # Imported here so that web3 and the chain endpoint are only touched when configured
+        from .pool_twap_source import PoolTWAPSource
+        return PoolTWAPSource()
+    raise ValueError(f"Unknown market data source: {name}")
+
+
+@lru_cache(maxsize=1)
+def get_market_data_source() -> MarketDataSource:
+    """
+    Source used by the jobs.
+
+    With MARKET_DATA_OFFLINE set, candles are replayed from the recording at
+    MARKET_DATA_FIXTURE and nothing touches the network. Otherwise the sources
+    named in MARKET_DATA_SOURCES (default "yfinance") are tried in order behind
+    the Parquet cache. The jobs fold every candle into the indicators, so only
+    list price-only sources ("defillama", "pool_twap") where a candle with
+    Open = High = Low = Close and no volume beats a missing one.
+    """
+    if is_offline():
+        fixture = os.getenv("MARKET_DATA_FIXTURE")
+        if not fixture:
+            raise ValueError("MARKET_DATA_OFFLINE requires MARKET_DATA_FIXTURE")
+        return FileReplaySource(fixture)
+
+    names = [name.strip() for name in os.getenv("MARKET_DATA_SOURCES", "yfinance").split(",") if name.strip()]
+    return CachedSource(FallbackSource([build_source(name) for name in names]))
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional
+
+import pandas as pd
+
+from .base import MarketDataSource
+
+
+class FallbackSource(MarketDataSource):
+    """
+    Tries sources in order; tickers a source fails on or returns nothing for
+    are asked from the next one. Tickers not served by the first source are
+    listed in the result's attrs["fallback"].
+    """
+
+    name = "fallback"
+
+    def __init__(self, sources: List[MarketDataSource]) -> None:
+        super().__init__(retries=0)
+        self.sources = sources
+
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        frames = []
+        remaining = list(tickers)
+        errors = []
+        fallback = []
+        for source in self.sources:
+            if not remaining:
+                break
+            try:
+                candles = source.fetch_candles(remaining, start, end, interval)
+            except Exception as e:
+                self.logger.warning(f"{source.name} failed for {remaining}: {e}")
+                errors.append(e)
+                continue
+            frames.append(candles)
+            served = set(candles.index.get_level_values("ticker"))
+            if source is not self.sources[0]:
+                fallback += [ticker for ticker in remaining if ticker in served]
+            remaining = [ticker for ticker in remaining if ticker not in served]
+
+        if errors and len(errors) == len(self.sources):
+            raise errors[-1]
+        candles = pd.concat(frames) if frames else self.empty_frame()
+        candles.attrs["fallback"] = fallback
+        return candles
@@ -0,0 +1,181 @@
+import logging
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.aizen.models import CryptoPrice
+
+logger = logging.getLogger(__name__)
+
+HOT_CACHE_DIR = os.getenv("MARKET_HOT_CACHE_DIR", "db/market_hot")
+HOT_CACHE_ROWS = 4096           # Candles kept per ticker; about 2.8 days of 1m candles
+
+# crypto_prices columns kept per candle, besides its date
+FIELDS = [
+    "open_price", "high_price", "low_price", "close_price", "volume",
+    "rsi", "bb_upper", "bb_middle", "bb_lower", "volatility", "macd", "macd_signal",
+    "macd_histogram", "atr", "price_range", "vwap"
+]
+ROW_DTYPE = np.dtype([("date", "M8[us]")] + [(field, "<f8") for field in FIELDS])
+
+
+class HotCandleCache:
+    """
+    Memory-mapped ring of each ticker's most recent candles.
+
+    Every ticker has a <ticker>.npy file of ROW_DTYPE records holding the ring
+    twice over, so candle i sits at both i % capacity and i % capacity +
+    capacity. As a result the last n candles are always one contiguous slice.
+    A <ticker>.count.npy file holds the number of candles appended so far and
+    a generation that `invalidate` bumps. `last` and `snapshot` therefore cost
+    two index computations and return views into the mapping without copying
+    anything. Callers that keep a view across appends should copy it.
+
+    Appends write the rows before bumping the count, so readers in other
+    processes never see a half-written candle. A reader asking for the whole
+    capacity may see its oldest rows replaced while an append is in progress.
+
+    The newest candle is also kept per process as a converted dict, versioned
+    by the ring's generation and the candle's date. Readers (the ingest job,
+    the rebalance job, the API) pay for the conversion once per new candle;
+    until then they only compare the version.
+    """
+
+    def __init__(self, directory: str = HOT_CACHE_DIR, capacity: int = HOT_CACHE_ROWS) -> None:
+        self.directory = directory
+        self.capacity = capacity
+        self._maps = {}
+        self._latest = {}   # ticker -> ((generation, candle date), candle dict)
+
+    def _paths(self, ticker: str):
+        if not ticker or ticker.startswith(".") or os.path.basename(ticker) != ticker:
+            raise ValueError(f"Invalid ticker: {ticker!r}")
+        base = os.path.join(self.directory, ticker)
+        return f"{base}.npy", f"{base}.count.npy"
+
+    def _open(self, ticker: str, create: bool = False):
+        """(rows, count) memmaps for the ticker, or None if it has no file and `create` is off."""
+        if ticker in self._maps:
+            return self._maps[ticker]
+
+        rows_path, count_path = self._paths(ticker)
+        if os.path.exists(rows_path) and os.path.exists(count_path):
+            rows, count = open_memmap(rows_path, mode="r+"), open_memmap(count_path, mode="r+")
+            if rows.dtype == ROW_DTYPE and rows.shape == (2 * self.capacity,) and count.shape == (2,):
+                self._maps[ticker] = (rows, count)
+                return self._maps[ticker]
+            del rows, count
+            logger.info(f"Rebuilding hot cache for {ticker}: layout changed")
+        elif not create:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        rows = open_memmap(rows_path, mode="w+", dtype=ROW_DTYPE, shape=(2 * self.capacity,))
+        count = open_memmap(count_path, mode="w+", dtype=np.int64, shape=(2,))    # [appended, generation]
+        self._maps[ticker] = (rows, count)
+        return self._maps[ticker]
+
+    def count(self, ticker: str) -> int:
+        maps = self._open(ticker)
+        return int(maps[1][0]) if maps else 0
+
+    def last(self, ticker: str, n: int) -> np.ndarray:
+        """The ticker's last n candles (fewer if it has fewer), oldest first, as a view into the ring."""
+        maps = self._open(ticker)
+        if maps is None:
+            return np.empty(0, dtype=ROW_DTYPE)
+        rows, count = maps
+        total = int(count[0])
+        n = min(n, total, self.capacity)
+        if n <= 0:
+            return rows[:0]
+        end = (total - 1) % self.capacity + self.capacity + 1
+        return rows[end - n:end]
+
+    def snapshot(self, ticker: str) -> Optional[Tuple[tuple, np.ndarray]]:
+        """
+        ((generation, date), values) for the newest candle, or None.
+
+        `values` are its FIELDS as a float64 view into the ring.
+        """
+        last = self.last(ticker, 1)
+        if len(last) == 0:
+            return None
+        generation = int(self._maps[ticker][1][1])
+        # Every ROW_DTYPE field is 8 bytes wide: the row reads as date bits followed by the float fields
+        return (generation, last["date"][0]), last.view(np.float64)[1:]
+
+    def latest(self, ticker: str, session=None) -> Optional[dict]:
+        """
+        The ticker's newest candle as {date, <FIELDS>}, with NaN as None.
+
+        An empty ring is first warmed from crypto_prices when a session is given.
+        The dict is shared until the next candle arrives; copy it before changing it.
+        """
+        if session is not None and self.count(ticker) == 0:
+            self.warm(session, ticker)
+        snapshot = self.snapshot(ticker)
+        if snapshot is None:
+            return None
+        version, values = snapshot
+        cached = self._latest.get(ticker)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        candle = {"date": version[1].astype(datetime)}
+        for field, value in zip(FIELDS, values.tolist()):
+            candle[field] = None if value != value else value
+        self._latest[ticker] = (version, candle)
+        return candle
+
+    def append(self, ticker: str, candles: List[dict]) -> int:
+        """
+        Append crypto_prices rows (dicts with date and FIELDS) in date order.
+
+        Rows no newer than the ticker's latest candle are skipped. Returns the
+        number of rows appended.
+        """
+        rows, count = self._open(ticker, create=True)
+        total = int(count[0])
+        if total:
+            newest = rows[(total - 1) % self.capacity]["date"]
+            candles = [c for c in candles if np.datetime64(c["date"], "us") > newest]
+        candles = candles[-self.capacity:]
+        if not candles:
+            return 0
+
+        batch = np.empty(len(candles), dtype=ROW_DTYPE)
+        batch["date"] = [np.datetime64(c["date"], "us") for c in candles]
+        for field in FIELDS:
+            batch[field] = [np.nan if c.get(field) is None else float(c[field]) for c in candles]
+
+        slots = (total + np.arange(len(batch))) % self.capacity
+        rows[slots] = batch
+        rows[slots + self.capacity] = batch
+        count[0] = total + len(batch)
+        return len(batch)
+
+    def invalidate(self, ticker: str):
+        """Empty the ticker's ring, e.g. after its history was rewritten."""
+        maps = self._open(ticker)
+        if maps is not None:
+            maps[1][0] = 0
+            maps[1][1] += 1
+        self._latest.pop(ticker, None)
+
+    def warm(self, session, ticker: str) -> int:
+        """Refill an empty ring with the ticker's newest stored candles."""
+        columns = [CryptoPrice.date] + [getattr(CryptoPrice, field) for field in FIELDS]
+        stored = session.query(*columns).filter(CryptoPrice.ticker == ticker).order_by(CryptoPrice.date.desc()).limit(self.capacity).all()
+        candles = [dict(zip(["date"] + FIELDS, row)) for row in reversed(stored)]
+        self.invalidate(ticker)
+        return self.append(ticker, candles)
+
+
+@lru_cache(maxsize=1)
+def get_hot_cache() -> HotCandleCache:
+    return HotCandleCache()
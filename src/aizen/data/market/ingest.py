@@ -0,0 +1,287 @@
+import csv
+import io
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import pandas as pd
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.aizen.database import SessionLocal
+from src.aizen.models import CryptoPrice, IndicatorState
+from src.aizen.signals.batch_indicators import PANEL_LEVELS, BatchIndicators
+from src.aizen.signals.streaming_indicators import StreamingIndicators
+from .base import CANDLE_COLUMNS, MarketDataSource
+from .hot_cache import HotCandleCache, get_hot_cache
+from .partitions import ensure_partitions
+from .replay_source import FileReplaySource
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 1000
+COPY_THRESHOLD = 5000           # Rows from which COPY through a staging table beats multi-row INSERT
+BACKFILL_CHUNK = timedelta(days=7)
+
+# crypto_prices columns written per candle, in COPY order
+PRICE_COLUMNS = [
+    "ticker", "date", "open_price", "high_price", "low_price", "close_price", "volume",
+    "rsi", "bb_upper", "bb_middle", "bb_lower", "volatility", "macd", "macd_signal",
+    "macd_histogram", "atr", "price_range", "vwap"
+]
+UPDATE_COLUMNS = PRICE_COLUMNS[2:]
+
+INDICATOR_COLUMNS = {
+    "rsi": "RSI",
+    "bb_upper": "BB_upper",
+    "bb_middle": "BB_middle",
+    "bb_lower": "BB_lower",
+    "volatility": "Volatility",
+    "macd": "MACD",
+    "macd_signal": "MACD_signal",
+    "macd_histogram": "MACD_histogram",
+    "atr": "ATR",
+    "price_range": "Price_Range",
+    "vwap": "VWAP"
+}
+
+
+def upsert_prices(session, rows: List[dict]):
+    """INSERT ... ON CONFLICT (ticker, date) DO UPDATE, in multi-row batches."""
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(CryptoPrice)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ticker", "date"],
+        set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS}
+    )
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        session.execute(stmt, rows[start:start + UPSERT_BATCH_SIZE])
+
+
+def copy_prices(session, rows: List[dict]):
+    """COPY rows into a temp staging table, then merge them into crypto_prices in one statement."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in PRICE_COLUMNS])
+    buffer.seek(0)
+
+    columns = ", ".join(PRICE_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS crypto_prices_stage AS SELECT {columns} FROM crypto_prices WITH NO DATA")
+        cursor.execute("TRUNCATE crypto_prices_stage")
+        cursor.copy_expert(f"COPY crypto_prices_stage ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"INSERT INTO crypto_prices ({columns}) SELECT {columns} FROM crypto_prices_stage "
+            f"ON CONFLICT (ticker, date) DO UPDATE SET {updates}"
+        )
+    finally:
+        cursor.close()
+
+
+def write_prices(session, rows: List[dict]):
+    if not rows:
+        return
+    ensure_partitions(session, (row["date"] for row in rows))
+    if session.bind.dialect.name == "postgresql" and len(rows) >= COPY_THRESHOLD:
+        copy_prices(session, rows)
+    else:
+        upsert_prices(session, rows)
+
+
+class CandleIngestor:
+    """
+    Writes candles to crypto_prices together with their indicators.
+
+    Indicators come from each ticker's StreamingIndicators state, which is
+    stored in indicator_states next to the date of the last candle folded in,
+    so every candle is folded exactly once and rows are upserted on
+    (ticker, date). Backfills compute a whole range at once and leave the state
+    where folding in every candle of it would have. Written rows also go to the
+    hot cache of recent candles.
+    """
+
+    def __init__(self, session_factory=SessionLocal, hot_cache: Optional[HotCandleCache] = None):
+        self.session_factory = session_factory
+        self.hot_cache = hot_cache or get_hot_cache()
+
+    def ingest(self, candles: pd.DataFrame) -> int:
+        """Store every candle newer than its ticker's state; returns the number of rows written."""
+        if candles.empty:
+            return 0
+
+        tickers = list(candles.index.get_level_values("ticker").unique())
+        with self.session_factory() as session:
+            states = {
+                state.ticker: state
+                for state in session.query(IndicatorState).filter(IndicatorState.ticker.in_(tickers)).all()
+            }
+
+            rows = {}
+            for ticker, frame in candles.groupby(level="ticker"):
+                state = states.get(ticker)
+                indicators = None
+                if state is not None:
+                    try:
+                        indicators = StreamingIndicators.from_state(state.state)
+                    except ValueError as e:
+                        logger.info(f"Replaying indicators for {ticker}: {e}")
+                if indicators is None:
+                    indicators, candle_at = self.replay_indicators(session, ticker)
+                    state = states[ticker] = state or IndicatorState(ticker=ticker)
+                    state.candle_at = candle_at
+
+                frame = frame.droplevel("ticker")
+                if state.candle_at is not None:
+                    # Each candle may only be folded into the running state once
+                    frame = frame[frame.index > state.candle_at]
+                if frame.empty:
+                    logger.info(f"No new candle for {ticker} since {state.candle_at}")
+                    continue
+
+                rows[ticker] = self.candle_rows(ticker, frame, indicators)
+                state.candle_at = frame.index[-1].to_pydatetime()
+                state.state = indicators.to_state()
+                session.add(state)
+
+            write_prices(session, [row for ticker_rows in rows.values() for row in ticker_rows])
+            session.commit()
+
+            for ticker, ticker_rows in rows.items():
+                try:
+                    if self.hot_cache.count(ticker):
+                        self.hot_cache.append(ticker, ticker_rows)
+                    else:
+                        self.hot_cache.warm(session, ticker)
+                except OSError as e:
+                    logger.warning(f"Hot cache not updated for {ticker}: {e}")
+        return sum(len(ticker_rows) for ticker_rows in rows.values())
+
+    def backfill(self, source: MarketDataSource, tickers: Iterable[str], start: datetime, end: datetime,
+                 interval: str = "1m", chunk: timedelta = BACKFILL_CHUNK, record: Optional[str] = None) -> int:
+        """
+        Load [start, end), recomputing indicators from `start`.
+
+        Candles are fetched chunk by chunk, indicators for every ticker come from
+        one BatchIndicators pass over the whole range, and rows are written back a
+        chunk per transaction. Existing rows in the range are overwritten. If live
+        data already runs past `end`, the ticker's indicator state is dropped so
+        the next ingest replays it from the table.
+        """
+        tickers = list(tickers)
+        chunks = []
+        fetched = []
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + chunk, end)
+            candles = source.fetch_candles(tickers, chunk_start, chunk_end, interval)
+            if not candles.empty:
+                fetched.append(candles)
+            chunks.append((chunk_start, chunk_end))
+            logger.info(f"Fetched {len(candles)} candles for {chunk_start:%Y-%m-%d %H:%M} - {chunk_end:%Y-%m-%d %H:%M}")
+            chunk_start = chunk_end
+        if not fetched:
+            return 0
+
+        candles = pd.concat(fetched)
+        candles = candles[~candles.index.duplicated(keep="last")].sort_index()
+        candles["Volume"] = candles["Volume"].fillna(0).astype("int64")
+        frame = self.indicator_frame(candles)
+
+        written = 0
+        dates = frame.index.get_level_values("date")
+        for chunk_start, chunk_end in chunks:
+            rows = self.frame_rows(frame[(dates >= chunk_start) & (dates < chunk_end)])
+            with self.session_factory() as session:
+                write_prices(session, rows)
+                session.commit()
+            written += len(rows)
+            logger.info(f"Backfilled {len(rows)} candles for {chunk_start:%Y-%m-%d %H:%M} - {chunk_end:%Y-%m-%d %H:%M}")
+
+        with self.session_factory() as session:
+            states = {
+                state.ticker: state
+                for state in session.query(IndicatorState).filter(IndicatorState.ticker.in_(tickers)).all()
+            }
+            for ticker, history in candles.groupby(level="ticker"):
+                candle_at = history.index[-1][1].to_pydatetime()
+                # Rewritten history; the ring is refilled on its next use
+                self.hot_cache.invalidate(ticker)
+                state = states.get(ticker)
+                if state is not None and state.candle_at is not None and state.candle_at > candle_at:
+                    session.delete(state)
+                    continue
+                indicators = StreamingIndicators.from_history(
+                    history["High"], history["Low"], history["Close"], history["Volume"].tolist()
+                )
+                state = state or IndicatorState(ticker=ticker)
+                state.candle_at = candle_at
+                state.state = indicators.to_state()
+                session.add(state)
+            session.commit()
+
+        if record:
+            FileReplaySource.record(candles, record)
+        return written
+
+    @staticmethod
+    def indicator_frame(candles: pd.DataFrame) -> pd.DataFrame:
+        """(ticker, date) candles with the indicator columns StreamingIndicators.update would give each row."""
+        panel = pd.concat({"1m": candles.rename(columns={"Close": "price"})}, names=["interval"])
+        batch = BatchIndicators(panel.reorder_levels(PANEL_LEVELS), precise=True)
+        frame = batch.calculate_technical_indicators()
+
+        # Before its first full window ATR falls back to the mean range of the
+        # candles so far, not of the whole series as the batch kernel does
+        early = batch.layout.position < StreamingIndicators().atr_periods - 1
+        running_range = frame["Price_Range"].groupby(batch.layout.ids).cumsum() / (batch.layout.position + 1)
+        frame.loc[early, "ATR"] = running_range.to_numpy()[early]
+        return frame.droplevel("interval").rename(columns={"price": "Close"})
+
+    @staticmethod
+    def frame_rows(frame: pd.DataFrame) -> List[dict]:
+        """crypto_prices rows for an `indicator_frame` slice."""
+        columns = [frame.index.get_level_values("ticker"), frame.index.get_level_values("date").to_pydatetime()]
+        columns += [frame[column].tolist() for column in CANDLE_COLUMNS]
+        columns += [frame[key].tolist() for key in INDICATOR_COLUMNS.values()]
+        keys = ["ticker", "date", "open_price", "high_price", "low_price", "close_price", "volume", *INDICATOR_COLUMNS]
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    @staticmethod
+    def candle_rows(ticker: str, frame: pd.DataFrame, indicators: StreamingIndicators) -> List[dict]:
+        rows = []
+        for date, open_price, high, low, close, volume in frame.itertuples():
+            volume = int(volume) if not pd.isna(volume) else 0
+            values = indicators.update(high, low, close, volume)
+            row = {
+                "ticker": ticker,
+                "date": date.to_pydatetime(),
+                "open_price": float(open_price),
+                "high_price": float(high),
+                "low_price": float(low),
+                "close_price": float(close),
+                "volume": volume
+            }
+            for column, key in INDICATOR_COLUMNS.items():
+                row[column] = values[key]
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def replay_indicators(session, ticker: str):
+        """Rebuild a ticker's indicator state from its stored candles; only needed once per ticker."""
+        indicators = StreamingIndicators()
+        last_candle_at = None
+        prices = session.query(
+            CryptoPrice.date,
+            CryptoPrice.high_price,
+            CryptoPrice.low_price,
+            CryptoPrice.close_price,
+            CryptoPrice.volume
+            ).filter(CryptoPrice.ticker == ticker).order_by(CryptoPrice.date).yield_per(1000)
+
+        for date, high, low, close, volume in prices:
+            indicators.update(high, low, close, volume or 0)
+            last_candle_at = date
+        return indicators, last_candle_at
@@ -0,0 +1,132 @@
+"""
+Monthly range partitions for crypto_prices on Postgres.
+
+`partition_crypto_prices` converts the plain table once. Rows then live in one
+child table per month (crypto_prices_YYYY_MM) with the (ticker, date) unique
+index in each. The primary key becomes (id, date) because Postgres requires
+the partition key in every unique constraint. The ORM model keeps mapping `id`,
+which stays unique through the shared sequence.
+
+Afterwards `ensure_partitions` creates the months that rows are about to land in;
+the ingestor calls it before every write. `drop_partitions` enforces retention by
+detaching and dropping whole months instead of running a DELETE. On other
+databases, or before the conversion, both functions do nothing.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+TABLE = "crypto_prices"
+
+_known_months = set()    # Months whose partition this process has already seen
+
+
+def month_start(date: datetime) -> datetime:
+    return datetime(date.year, date.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(session) -> bool:
+    if session.bind.dialect.name != "postgresql":
+        return False
+    return bool(session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace)"
+    ), {"table": TABLE}).scalar())
+
+
+def existing_partitions(session) -> dict:
+    """Partition month -> partition table name."""
+    names = session.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND parent.relnamespace = current_schema()::regnamespace"
+    ), {"table": TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        try:
+            partitions[datetime.strptime(name[len(TABLE) + 1:], "%Y_%m")] = name
+        except ValueError:
+            continue
+    return partitions
+
+
+def create_partition(session, month: datetime):
+    session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(session, dates: Iterable[datetime]):
+    """Create the month partitions covering `dates`; after the first call per month this is a set lookup."""
+    months = {month_start(date) for date in dates} - _known_months
+    if not months or not is_partitioned(session):
+        return
+    existing = existing_partitions(session)
+    for month in sorted(months - set(existing)):
+        create_partition(session, month)
+        logger.info(f"Created partition {partition_name(month)}")
+    _known_months.update(months)
+
+
+def drop_partitions(session, before: datetime) -> List[str]:
+    """Detach and drop every month partition that ends on or before `before`; returns the dropped tables."""
+    if not is_partitioned(session):
+        return []
+    dropped = []
+    for month, name in sorted(existing_partitions(session).items()):
+        if add_months(month, 1) > before:
+            break
+        session.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        session.execute(text(f"DROP TABLE {name}"))
+        _known_months.discard(month)
+        dropped.append(name)
+        logger.info(f"Dropped partition {name}")
+    return dropped
+
+
+def partition_crypto_prices(session):
+    """
+    One-off conversion of a plain crypto_prices table into monthly partitions.
+
+    Runs in the caller's transaction: the old table is renamed and copied into
+    the partitioned one, then dropped, and the id sequence moves over with it.
+    """
+    if session.bind.dialect.name != "postgresql" or is_partitioned(session):
+        return
+
+    old = f"{TABLE}_unpartitioned"
+    session.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old}"))
+    # Constraint and index names are schema wide; free them for the new table
+    for name in (f"{TABLE}_pkey", f"uq_{TABLE}_ticker_date", f"ix_{TABLE}_id"):
+        session.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_old"))
+
+    session.execute(text(f"CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (date)"))
+    session.execute(text(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date)"))
+    session.execute(text(f"ALTER TABLE {TABLE} ADD CONSTRAINT uq_{TABLE}_ticker_date UNIQUE (ticker, date)"))
+
+    first, last = session.execute(text(f"SELECT min(date), max(date) FROM {old}")).one()
+    month = month_start(first or datetime.utcnow())
+    last = month_start(max(last or month, datetime.utcnow()))
+    while month <= last:
+        create_partition(session, month)
+        month = add_months(month, 1)
+
+    session.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {old}"))
+    session.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq OWNED BY {TABLE}.id"))
+    session.execute(text(f"DROP TABLE {old}"))
+    _known_months.clear()
+    logger.info(f"Partitioned {TABLE} by month")
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from .base import CANDLE_COLUMNS, CANDLE_INDEX, MarketDataSource
+
+
+class FileReplaySource(MarketDataSource):
+    """
+    Candles recorded to a CSV or Parquet file, for offline runs and tests.
+
+    The file holds one row per candle with ticker, date and CANDLE_COLUMNS;
+    `record` writes a fetched frame in that layout. A recording holds a single
+    interval, so `interval` is not used to filter.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str) -> None:
+        super().__init__(retries=0)
+        self.path = path
+        self._candles = None
+
+    def _load(self) -> pd.DataFrame:
+        if self._candles is None:
+            if self.path.endswith(".parquet"):
+                table = pd.read_parquet(self.path)
+            else:
+                table = pd.read_csv(self.path, parse_dates=["date"])
+            self._candles = self.normalize(table.set_index(CANDLE_INDEX))
+        return self._candles
+
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        candles = self._load()
+        dates = candles.index.get_level_values("date")
+        mask = candles.index.get_level_values("ticker").isin(tickers) & (dates >= start)
+        if end is not None:
+            mask &= dates < end
+        return candles[mask]
+
+    @staticmethod
+    def record(candles: pd.DataFrame, path: str) -> None:
+        table = candles[CANDLE_COLUMNS].reset_index()
+        if path.endswith(".parquet"):
+            table.to_parquet(path, index=False)
+        else:
+            table.to_csv(path, index=False)
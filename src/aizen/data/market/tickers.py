@@ -0,0 +1,16 @@
+# Pool token pair -> yfinance ticker used for its signals
+PAIR_TICKERS = {
+    'ETH/USDC': 'ETH-USD',
+    'USDC/ETH': 'ETH-USD',
+    'WETH/USDC': 'ETH-USD',
+    'USDC/WETH': 'ETH-USD',
+    'BTC/USDC': 'BTC-USD',
+    'USDC/BTC': 'BTC-USD',
+    'WBTC/USDC': 'BTC-USD',
+    'USDC/WBTC': 'BTC-USD'
+}
+DEFAULT_TICKER = 'BTC-USD'
+TICKERS = sorted(set(PAIR_TICKERS.values()))
+
+def ticker_for_pair(token_pair):
+    return PAIR_TICKERS.get(token_pair, DEFAULT_TICKER)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+import yfinance as yf
+
+from .base import MarketDataSource
+
+
+class YFinanceSource(MarketDataSource):
+    """
+    Candles from Yahoo Finance, every ticker in one download.
+
+    Yahoo serves 1m bars for the last 30 days only, at most 8 days per request;
+    longer histories need a coarser interval.
+    """
+
+    name = "yfinance"
+
+    def _fetch_candles(self, tickers: list, start: datetime, end: Optional[datetime], interval: str) -> pd.DataFrame:
+        data = yf.download(tickers, start=start, end=end, interval=interval, progress=False)
+        if data.empty:
+            self.logger.info(f"No candles for {tickers} from {start} to {end}")
+            return self.empty_frame()
+
+        # (date) x (field, ticker) -> (ticker, date) x field
+        candles = data.stack(level=1, future_stack=True).swaplevel()
+        candles.index.names = ["ticker", "date"]
+        return candles
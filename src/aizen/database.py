@@ -1,5 +1,7 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
 
@@ -7,7 +9,40 @@ load_dotenv(override=True)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connections per process: the API's sync and async engines each keep up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW; size them against Postgres' max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+ASYNC_DRIVERS = {
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+
+def pool_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the asyncio one (asyncpg for Postgres)."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -19,3 +54,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@lru_cache(maxsize=1)
+def get_async_engine():
+    # Created on first use so jobs and scripts never need the asyncio driver
+    url = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+    try:
+        return create_async_engine(url, **pool_options(url))
+    except ImportError as e:
+        scheme = url.partition("://")[0]
+        raise RuntimeError(
+            f"The async database URL uses {scheme}, but its driver is not installed ({e.name}). "
+            "Install requirements.txt or set ASYNC_DATABASE_URL to a driver that is."
+        ) from e
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    return async_sessionmaker(get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """
+    AsyncSession dependency for `async def` endpoints.
+
+    Code written against the sync Session API (db.query, the repositories)
+    runs unchanged on it through `await db.run_sync(fn, *args)`, without
+    blocking the event loop.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
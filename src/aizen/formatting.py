@@ -0,0 +1,45 @@
+import os
+import random
+from decimal import Decimal
+
+IMAGE_URL = ['https://cdn.prod.website-files.com/63974a9c19a1dd54281c47a8/64d0b5970be523e3ea00fe44_AI-Agents.webp',
+             'https://smythos.com/wp-content/uploads/2024/10/friendly-robot-laptop-office.jpeg',
+             'https://www.augmentir.com/wp-content/uploads/2024/11/ai-agent.webp']
+# Public origin of this API, prefixed to /images/{hash} so other origins can load them
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "").rstrip("/")
+
+
+def image_url(image_hash: str) -> str:
+    return f"{IMAGE_BASE_URL}/images/{image_hash}"
+
+
+def format_image(image_hash: str):
+    if not image_hash:
+        image_data = random.choice(IMAGE_URL)
+    else:
+        image_data = image_url(image_hash)
+
+    return {
+        "type": "url",
+        "data": image_data
+    }
+
+
+def format_thumbnail(agent):
+    """format_image() of the agent's thumbnail, for lists; agents from before thumbnails get the full image."""
+    return format_image(agent.thumbnail_hash or agent.image_hash)
+
+
+def format_amount_eth(amount: str):
+    amount_float = float(Decimal(amount))
+    formatted_amount = format(amount_float, '.10f').rstrip('0').rstrip('.')
+
+    return formatted_amount
+
+
+def parse_percent(value):
+    # Backtested scores are stored as e.g. "12.3%" or "-4.0%"
+    try:
+        return float(value.strip('%')) if value else None
+    except ValueError:
+        return None
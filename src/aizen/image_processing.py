@@ -0,0 +1,69 @@
+"""
+Agent image processing for uploads.
+
+`process_image` decodes an upload once and encodes every entry of
+IMAGE_SIZES as WebP: "full" for agent detail and "thumbnail" for lists. For
+JPEGs, `draft()` has libjpeg decode at the smallest 1/2, 1/4 or 1/8 scale
+that still covers the full size. A 12MP photo is then decoded at about 1/64
+of the pixels instead of being decoded in full and then shrunk. The
+thumbnail is scaled down from the full size instead of from the original.
+
+Decoding and encoding are CPU bound and hold the GIL, so uploads run on a
+process pool (IMAGE_WORKERS processes). This module only imports Pillow,
+which keeps spawning the workers cheap.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+IMAGE_SIZES = {"full": (512, 512), "thumbnail": (128, 128)}
+IMAGE_CONTENT_TYPE = "image/webp"
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(os.cpu_count() or 1, 4))))
+MAX_IMAGE_PIXELS = 50_000_000   # Reject larger uploads before decoding (decompression bombs)
+
+
+def process_image(data: bytes, quality: int = WEBP_QUALITY) -> Dict[str, bytes]:
+    """WebP bytes of the image for every entry of IMAGE_SIZES; ValueError if it is not an image."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image is too large ({image.width}x{image.height})")
+        # Only JPEG (and PCD) decoders support draft; others ignore it
+        image.draft("RGB", max(IMAGE_SIZES.values()))
+        image = ImageOps.exif_transpose(image)
+    except ValueError:
+        raise
+    except Exception:
+        raise ValueError("Invalid image format")
+
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA") or "transparency" in image.info else "RGB")
+
+    outputs = {}
+    for name, size in sorted(IMAGE_SIZES.items(), key=lambda item: -item[1][0] * item[1][1]):
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="WEBP", quality=quality, method=4)
+        outputs[name] = output.getvalue()
+    return outputs
+
+
+@lru_cache(maxsize=1)
+def get_image_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the API process has running threads (DB pools, chain RPC) a fork would copy mid-flight
+    return ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def process_upload(data: bytes) -> Dict[str, bytes]:
+    """`process_image` on the pool; blocks the calling thread, not the interpreter."""
+    return get_image_pool().submit(process_image, data).result()
+
+
+def shutdown_image_pool():
+    if get_image_pool.cache_info().currsize:
+        get_image_pool().shutdown(wait=False, cancel_futures=True)
@@ -1,3 +1,10 @@
 from .fetch_crypto_price import fetch_and_store_crypto_data
 from .pool_rebalance import liquidity_pool_rebalancing
-from .marketplace_fee import process_marketplace_fees
\ No newline at end of file
+from .marketplace_fee import process_marketplace_fees
+from .backfill_crypto_prices import backfill_crypto_prices
+from .crypto_price_retention import maintain_crypto_prices
+from .score_agents import score_agents
+from .migrate_agent_images import migrate_agent_images
+from .add_user_chat_index import add_user_chat_index
+from .migrate_schema import migrate_schema
+from .add_crypto_price_constraint import add_crypto_price_constraint
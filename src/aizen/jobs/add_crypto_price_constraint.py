@@ -0,0 +1,54 @@
+"""
+Remove duplicate (ticker, date) rows from crypto_prices and add the
+uq_crypto_prices_ticker_date constraint that ingestion upserts on.
+
+    python -m src.aizen.jobs.add_crypto_price_constraint
+
+New databases get the constraint from create_all. Of each duplicated
+(ticker, date) the row with the highest id, the one written last, is kept.
+Safe to re-run: once the constraint exists nothing is deleted. Run it before
+crypto_price_retention --partition, which copies the rows into a table that
+already has the constraint.
+"""
+import logging
+from sqlalchemy import inspect, text
+from src.aizen.database import engine
+
+logging.basicConfig(level=logging.INFO)
+
+TABLE = "crypto_prices"
+CONSTRAINT = "uq_crypto_prices_ticker_date"
+
+def has_constraint(conn) -> bool:
+    schema = inspect(conn)
+    names = {constraint["name"] for constraint in schema.get_unique_constraints(TABLE)}
+    names |= {index["name"] for index in schema.get_indexes(TABLE) if index["unique"]}
+    return CONSTRAINT in names
+
+def add_crypto_price_constraint() -> int:
+    """Returns the number of duplicate rows deleted."""
+    with engine.begin() as conn:
+        if has_constraint(conn):
+            logging.info(f"Constraint {CONSTRAINT} is already in place")
+            return 0
+
+        if conn.dialect.name == "postgresql":
+            # Blocks ingestion until commit, so no duplicate lands between the delete and the constraint
+            conn.execute(text(f"LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE"))
+            deleted = conn.execute(text(
+                f"DELETE FROM {TABLE} a USING {TABLE} b "
+                f"WHERE a.ticker = b.ticker AND a.date = b.date AND a.id < b.id"
+            )).rowcount
+            conn.execute(text(f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} UNIQUE (ticker, date)"))
+        else:
+            deleted = conn.execute(text(
+                f"DELETE FROM {TABLE} WHERE id NOT IN (SELECT max(id) FROM {TABLE} GROUP BY ticker, date)"
+            )).rowcount
+            # SQLite can't add a constraint to an existing table; ON CONFLICT uses a unique index the same way
+            conn.execute(text(f"CREATE UNIQUE INDEX {CONSTRAINT} ON {TABLE} (ticker, date)"))
+
+    logging.info(f"Deleted {deleted} duplicate rows; constraint {CONSTRAINT} is in place")
+    return deleted
+
+if __name__ == "__main__":
+    add_crypto_price_constraint()
@@ -0,0 +1,34 @@
+"""
+Create the (user_id, agent_id, created_at, id) index that chat history pages read through.
+
+    python -m src.aizen.jobs.add_user_chat_index
+
+New databases get it from create_all. On Postgres it is built CONCURRENTLY,
+so /chat keeps writing while it builds. Safe to re-run: an existing index is
+left alone. If a concurrent build fails it leaves an INVALID index behind;
+drop that index and run this again.
+"""
+import logging
+from sqlalchemy import text
+from src.aizen.database import engine
+from src.aizen.models import UserChat
+
+logging.basicConfig(level=logging.INFO)
+
+INDEX_NAME = "ix_user_chats_user_id_agent_id_created_at"
+
+def add_user_chat_index():
+    index = next(index for index in UserChat.__table__.indexes if index.name == INDEX_NAME)
+    if engine.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY refuses to run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+                f"ON {UserChat.__tablename__} (user_id, agent_id, created_at, id)"
+            ))
+    else:
+        index.create(engine, checkfirst=True)
+    logging.info(f"Index {INDEX_NAME} is in place")
+
+if __name__ == "__main__":
+    add_user_chat_index()
@@ -0,0 +1,48 @@
+"""
+Backfill crypto_prices with historical candles.
+
+    python -m src.aizen.jobs.backfill_crypto_prices --start 2025-01-01 --end 2025-01-29
+    python -m src.aizen.jobs.backfill_crypto_prices --start 2025-01-01 --fixture candles.parquet
+
+crypto_prices holds 1m candles; Yahoo only serves those for the last 30 days,
+so older ranges need a recorded fixture (--record writes one while backfilling).
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from src.aizen.data.market import CandleIngestor, FileReplaySource, get_market_data_source, source_metrics
+from src.aizen.jobs.fetch_crypto_price import TICKER
+
+logging.basicConfig(level=logging.INFO)
+
+def backfill_crypto_prices(start, end=None, tickers=TICKER, interval="1m", chunk_days=7, fixture=None, record=None):
+    source = FileReplaySource(fixture) if fixture else get_market_data_source()
+    end = end or datetime.utcnow()
+    written = CandleIngestor().backfill(
+        source,
+        tickers,
+        start,
+        end,
+        interval=interval,
+        chunk=timedelta(days=chunk_days),
+        record=record
+    )
+    logging.info(f"Backfilled {written} candles for {tickers} from {start} to {end}")
+    logging.info(f"Market data sources: {source_metrics()}")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill crypto_prices with historical candles.")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="First candle date (UTC), e.g. 2025-01-01")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="End date (UTC, exclusive); defaults to now")
+    parser.add_argument("--tickers", nargs="+", default=TICKER)
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--chunk-days", type=int, default=7, help="Days fetched and written per chunk (Yahoo allows 8 for 1m)")
+    parser.add_argument("--fixture", help="Replay candles from this CSV/Parquet recording instead of the configured sources")
+    parser.add_argument("--record", help="Also write the fetched candles to this CSV/Parquet file")
+    args = parser.parse_args()
+
+    backfill_crypto_prices(args.start, args.end, args.tickers, args.interval, args.chunk_days, args.fixture, args.record)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Keep crypto_prices partitioned by month and drop months past retention.
+
+    python -m src.aizen.jobs.crypto_price_retention --partition       # one-off conversion of the table
+    python -m src.aizen.jobs.crypto_price_retention --keep-months 6
+
+Runs daily from the scheduler so next month's partition exists before its first candle.
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+from src.aizen.database import SessionLocal
+from src.aizen.data.market.partitions import add_months, drop_partitions, ensure_partitions, month_start, partition_crypto_prices
+
+logging.basicConfig(level=logging.INFO)
+
+RETENTION_MONTHS = int(os.getenv("PRICE_RETENTION_MONTHS", "0"))   # 0 keeps every month
+
+def maintain_crypto_prices(keep_months=RETENTION_MONTHS, partition=False, now=None):
+    month = month_start(now or datetime.utcnow())
+    with SessionLocal() as session:
+        if partition:
+            partition_crypto_prices(session)
+        ensure_partitions(session, [month, add_months(month, 1)])
+        dropped = drop_partitions(session, add_months(month, -keep_months)) if keep_months else []
+        session.commit()
+    logging.info(f"crypto_prices partitions up to date; dropped {dropped or 'none'}")
+    return dropped
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain crypto_prices month partitions.")
+    parser.add_argument("--partition", action="store_true", help="Convert a plain crypto_prices table to month partitions first")
+    parser.add_argument("--keep-months", type=int, default=RETENTION_MONTHS, help="Whole months kept before the current one; 0 keeps all")
+    args = parser.parse_args()
+
+    maintain_crypto_prices(args.keep_months, args.partition)
+
+if __name__ == "__main__":
+    main()
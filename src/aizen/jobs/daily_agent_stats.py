@@ -4,6 +4,7 @@ from sqlalchemy.sql import func
 from sqlalchemy import Integer
 from decimal import Decimal
 from src.aizen.database import SessionLocal
+from src.aizen.cache import STATS_TAG, get_response_cache
 
 db: Session = SessionLocal()
 
@@ -47,6 +48,7 @@ def calculate_daily_agent_stats():
             print(f"[Error] Could not compute daily stats for agent {agent_id}: {e}")
 
     db.commit()
+    get_response_cache().invalidate(STATS_TAG)
     print(f"[Info] Daily agent stats updated for {len(agent_ids)} agents.")
 
 if __name__ == "__main__":
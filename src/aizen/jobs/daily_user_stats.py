@@ -3,6 +3,7 @@ from src.aizen.models import AgentStat, UserCommission, UserDailyStat
 from sqlalchemy.sql import func
 from decimal import Decimal
 from src.aizen.database import SessionLocal
+from src.aizen.cache import STATS_TAG, get_response_cache
 
 db: Session = SessionLocal()
 
@@ -48,6 +49,7 @@ def calculate_daily_user_stats():
             print(f"[Error] Could not compute daily stats for user {user_id}: {e}")
 
     db.commit()
+    get_response_cache().invalidate(STATS_TAG)
     print(f"[Info] Daily stats updated for {len(user_ids)} users.")
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ from src.aizen.database import SessionLocal
 from datetime import datetime, timedelta
 from decimal import Decimal
 from src.aizen.models import User, Agent, UserCommission, UserDailyEarnedFee
+from src.aizen.repositories import refresh_marketplace
+from src.aizen.cache import ALL_TAG, get_response_cache
+from src.aizen.chains.balances import batch_balances
 from web3 import Web3
 import logging
 import ast
@@ -29,6 +32,17 @@ def process_marketplace_fees():
 
     user_earned_fees = {}
 
+    # Every sender's balance in a few batched RPCs instead of one call per commission
+    senders = db.query(User).filter(User.id.in_({c.user_id for c in commissions})).all()
+    # An invalid address fails only its own commissions below, not the whole run
+    sender_addresses = sorted({Web3.to_checksum_address(u.wallet_address) for u in senders if u.wallet_address and Web3.is_address(u.wallet_address)})
+    try:
+        balances_wei = {address: wei for address, (_, wei) in batch_balances(w3, sender_addresses).items()}
+    except Exception as e:
+        # Nodes without batch support still get served, one balance per commission
+        logging.warning(f"Batched balance lookup failed, fetching balances one by one: {e}")
+        balances_wei = {}
+
     for commission in commissions:
         try:
             # Fetch relevant users and agent
@@ -53,8 +67,10 @@ def process_marketplace_fees():
             daily_fee_eth = Decimal(commission.amount_eth) * annual_fee_pct / DAYS_IN_YEAR
 
             # Check if sender has sufficient balance
-            balance = w3.eth.get_balance(sender.wallet_address)
-            balance_eth = Decimal(w3.from_wei(balance, 'ether'))
+            sender_address = Web3.to_checksum_address(sender.wallet_address)
+            if sender_address not in balances_wei:
+                balances_wei[sender_address] = w3.eth.get_balance(sender_address)
+            balance_eth = Decimal(w3.from_wei(balances_wei[sender_address], 'ether'))
 
             if balance_eth < daily_fee_eth:
                 logging.warning(f"User {sender.id} has insufficient balance ({balance_eth:.6f} ETH). Disabling commission.")
@@ -76,7 +92,10 @@ def process_marketplace_fees():
             tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
             receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
 
+            # The transfer and its gas came out of the batched balance
+            balances_wei[sender_address] -= receipt.gasUsed * receipt.effectiveGasPrice
             if receipt.status == 1:
+                balances_wei[sender_address] -= tx['value']
                 user_earned_fees[agent.user_id] += daily_fee_eth
                 logging.info(f"✅ {daily_fee_eth:.6f} ETH transferred from user {sender.id} to agent owned by {receiver.id}")
             else:
@@ -92,11 +111,14 @@ def process_marketplace_fees():
             logging.error(f"⚠️ Error processing commission ID {commission.id}: {error_message}")
             continue
 
-    for user_id, earned_fee in user_earned_fees:
+    for user_id, earned_fee in user_earned_fees.items():
         new_entry = UserDailyEarnedFee(user_id = user_id, fee_earned = earned_fee)
         db.add(new_entry)
 
     db.commit()
+    # Commissions without funds were deactivated above
+    refresh_marketplace(db)
+    get_response_cache().invalidate(ALL_TAG)
 
     db.close()
 
@@ -0,0 +1,76 @@
+"""
+Move agent images stored inline on agents into content-addressed image_blobs,
+then give every agent with an image a WebP thumbnail.
+
+    python -m src.aizen.jobs.migrate_agent_images
+
+Agents created before image_blobs show the default image until this has run,
+and lists show their full image until they have a thumbnail.
+Safe to re-run: agents that already have an image_hash or thumbnail_hash are skipped.
+"""
+import argparse
+import logging
+from src.aizen.database import SessionLocal
+from src.aizen.models import Agent
+from src.aizen.repositories import refresh_marketplace
+from src.aizen.repositories.images import agent_image_hash, get_image, store_image
+from src.aizen.image_processing import IMAGE_CONTENT_TYPE, process_image
+
+logging.basicConfig(level=logging.INFO)
+
+def migrate_agent_images(batch_size=100):
+    migrated = 0
+    with SessionLocal() as db:
+        while True:
+            agents = (
+                db.query(Agent)
+                  .filter(Agent.image_hash.is_(None), Agent.image.isnot(None))
+                  .order_by(Agent.id)
+                  .limit(batch_size)
+                  .all()
+            )
+            if not agents:
+                break
+            for agent in agents:
+                agent_image_hash(db, agent)
+            db.commit()
+            migrated += len(agents)
+            logging.info(f"Moved {migrated} agent images into image_blobs")
+
+        thumbnails = {}     # image_hash -> thumbnail_hash; clones share images
+        after_id = 0
+        while True:
+            agents = (
+                db.query(Agent)
+                  .filter(Agent.thumbnail_hash.is_(None), Agent.image_hash.isnot(None), Agent.id > after_id)
+                  .order_by(Agent.id)
+                  .limit(batch_size)
+                  .all()
+            )
+            if not agents:
+                break
+            for agent in agents:
+                if agent.image_hash not in thumbnails:
+                    blob = get_image(db, agent.image_hash)
+                    try:
+                        thumbnails[agent.image_hash] = store_image(db, process_image(blob.data)["thumbnail"], IMAGE_CONTENT_TYPE) if blob else None
+                    except ValueError as e:
+                        logging.warning(f"Agent {agent.id} image {agent.image_hash} could not be thumbnailed: {e}")
+                        thumbnails[agent.image_hash] = None
+                agent.thumbnail_hash = thumbnails[agent.image_hash]
+            after_id = agents[-1].id
+            db.commit()
+            logging.info(f"Thumbnailed agent images up to agent {after_id}")
+
+        refresh_marketplace(db)
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline agent images into image_blobs and thumbnail them.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Agents migrated per transaction")
+    args = parser.parse_args()
+
+    migrate_agent_images(args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Bring an existing database up to the models: add new columns, tables and indexes.
+
+    python -m src.aizen.jobs.migrate_schema
+
+New databases get all of it from create_all. Safe to re-run: columns, tables
+and indexes that already exist are left alone. Run it before deploying code
+that reads them.
+"""
+import logging
+from sqlalchemy import inspect, text
+from src.aizen.database import engine
+from src.aizen.models import Agent, ImageBlob, MarketplaceAgent, CloneJob, UserChatSummary, IndicatorState
+
+logging.basicConfig(level=logging.INFO)
+
+# Model -> columns added to its existing table
+NEW_COLUMNS = {
+    Agent: ("image_hash", "thumbnail_hash"),
+}
+NEW_TABLES = (ImageBlob, MarketplaceAgent, CloneJob, UserChatSummary, IndicatorState)
+NEW_INDEXES = {
+    Agent: ("ix_agents_image_hash",),
+}
+
+def add_column(conn, table, column):
+    column_type = column.type.compile(conn.dialect)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {column.name} {column_type}"))
+    elif column.name not in {existing["name"] for existing in inspect(conn).get_columns(table.name)}:
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def migrate_schema():
+    with engine.begin() as conn:
+        for model, columns in NEW_COLUMNS.items():
+            for name in columns:
+                add_column(conn, model.__table__, model.__table__.c[name])
+                logging.info(f"Column {model.__tablename__}.{name} is in place")
+
+        for model in NEW_TABLES:
+            model.__table__.create(conn, checkfirst=True)
+            # A table created before one of its indexes was added to the model gets it here
+            for index in model.__table__.indexes:
+                index.create(conn, checkfirst=True)
+            logging.info(f"Table {model.__tablename__} is in place")
+
+        for model, names in NEW_INDEXES.items():
+            for index in model.__table__.indexes:
+                if index.name in names:
+                    index.create(conn, checkfirst=True)
+                    logging.info(f"Index {index.name} is in place")
+
+if __name__ == "__main__":
+    migrate_schema()
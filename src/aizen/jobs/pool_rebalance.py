@@ -1,9 +1,14 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from src.aizen.database import SessionLocal
-from src.aizen.pipelines.liquidity_rebalancing_pipeline import LiquidityRebalancingPipeline
+from src.aizen.pipelines.liquidity_rebalancing_pipeline import get_liquidity_rebalancing_pipeline
 from src.aizen.models import (Agent, UserCommission, CryptoPrice, UserAgentPool, AgentHistory, User)
 from src.aizen.protocols.uniswapv3 import UniswapV3
+from src.aizen.protocols.oracle import PoolOracle
+from src.aizen.protocols.ticks import triggered_range
+from src.aizen.jobs.fetch_crypto_price import ticker_for_pair
+from src.aizen.data.market.hot_cache import get_hot_cache
+from src.aizen.cache import agent_tag, get_response_cache
 from datetime import datetime, timedelta
 import json, logging
 
@@ -11,9 +16,45 @@ logging.basicConfig(level=logging.INFO)
 
 WALLET_ADDRESS = '0xb94447784Dc9E9c9c69BeD754a9C9Eea786065AA'
 
-def liquidity_pool_rebalancing():
+PRICE_FIELDS = ['open_price','high_price','low_price','close_price',
+                'volume','rsi','bb_upper','bb_middle','bb_lower',
+                'volatility','macd','macd_signal','macd_histogram',
+                'atr','price_range','vwap']
+
+def load_price_map(db, tickers, as_of=None):
+    """Latest stored candle per ticker (Decimal → float), optionally as of a past date for offline replays."""
+    price_map = {}
+    hot_cache = get_hot_cache()
+    for t in tickers:
+        if as_of is None:
+            # Served from the memory-mapped ring; warmed from the table on first use
+            latest = hot_cache.latest(t, db)
+            if latest is not None:
+                price_map[t] = {f: latest[f] for f in PRICE_FIELDS}
+                continue
+        query = db.query(CryptoPrice).filter_by(ticker=t)
+        if as_of is not None:
+            query = query.filter(CryptoPrice.date <= as_of)
+        p = query.order_by(desc(CryptoPrice.date)).first()
+        price_map[t] = {f: (float(getattr(p, f)) if getattr(p, f) is not None else None) for f in PRICE_FIELDS}
+    return price_map
+
+_oracles = {}
+
+def load_oracle_prices(price_map, pools):
+    """Add each pool's spot and TWAP prices (spot_price, twap_60s, ...) to its ticker's entry, read at one block."""
+    for ticker, pool_details in pools.items():
+        key = (pool_details['token_pair'], pool_details['fee_tier'])
+        try:
+            if key not in _oracles:
+                _oracles[key] = PoolOracle(pool_details)
+            price_map[ticker].update(_oracles[key].price_fields())
+        except Exception as e:
+            logging.warning(f"Pool oracle unavailable for {ticker}: {e}")
+
+def liquidity_pool_rebalancing(as_of=None):
     db: Session = SessionLocal()
-    rebalancer = LiquidityRebalancingPipeline()
+    rebalancer = get_liquidity_rebalancing_pipeline()
 
     user = db.query(User).filter(User.wallet_address == WALLET_ADDRESS).first()
     PRIVATE_KEY = user.private_key
@@ -34,19 +75,12 @@ def liquidity_pool_rebalancing():
         ).all()
         pool_map = {(p.agent_id, p.user_id): p for p in pools}
 
-        # Preload latest prices (Decimal → float)
-        tickers = {
-            'ETH-USD' if a.config['pool_details']['token_pair'] in ['ETH/USDC','USDC/ETH'] else 'BTC-USD'
-            for a in agents.values()
-        }
-        price_map = {}
-        for t in tickers:
-            p = db.query(CryptoPrice).filter_by(ticker=t).order_by(desc(CryptoPrice.date)).first()
-            price_map[t] = {f: (float(getattr(p, f)) if getattr(p, f) is not None else None)
-                            for f in ['open_price','high_price','low_price','close_price',
-                                      'volume','rsi','bb_upper','bb_middle','bb_lower',
-                                      'volatility','macd','macd_signal','macd_histogram',
-                                      'atr','price_range','vwap']}
+        # Preload latest prices
+        pools_by_ticker = {ticker_for_pair(a.config['pool_details']['token_pair']): a.config['pool_details'] for a in agents.values()}
+        price_map = load_price_map(db, pools_by_ticker, as_of)
+        if as_of is None:
+            # On-chain TWAPs only describe the present
+            load_oracle_prices(price_map, pools_by_ticker)
 
         now = datetime.utcnow()
         new_pools = []
@@ -69,7 +103,7 @@ def liquidity_pool_rebalancing():
                     'buffer': cfg['buffer']
                 }
                 init_lo, init_hi = uni.calculate_new_ticks(current_tick, base_cfg)
-                ticker = 'ETH-USD' if cfg['pool_details']['token_pair'] in ['ETH/USDC','USDC/ETH'] else 'BTC-USD'
+                ticker = ticker_for_pair(cfg['pool_details']['token_pair'])
                 decision = rebalancer.rebalance_now(cfg, price_map[ticker])
 
                 agent_cache[a.id] = {
@@ -143,21 +177,11 @@ def liquidity_pool_rebalancing():
                 continue
 
             # OUT-OF-RANGE: triggers or bias shift on current price
-            span = init_hi - init_lo
-            deviation = ((init_lo - current_tick) / span * 100) if current_tick < init_lo else ((current_tick - init_hi) / span * 100)
-
             trigger_lo = trigger_hi = None
             reason = ''
-            below_cfg = triggers.get('below')
-            above_cfg = triggers.get('above')
-            if below_cfg and all(k in below_cfg for k in ('by','lower','higher')):
-                if current_tick < init_lo and deviation >= below_cfg['by']:
-                    trigger_lo, trigger_hi = below_cfg['lower'], below_cfg['higher']
-                    reason = f"Applied below-trigger"
-            if trigger_lo is None and above_cfg and all(k in above_cfg for k in ('by','lower','higher')):
-                if current_tick > init_hi and deviation >= above_cfg['by']:
-                    trigger_lo, trigger_hi = above_cfg['lower'], above_cfg['higher']
-                    reason = f"Applied above-trigger"
+            triggered = triggered_range(current_tick, init_lo, init_hi, triggers)
+            if triggered:
+                trigger_lo, trigger_hi, reason = triggered
 
             if trigger_lo is not None:
                 base_tick = (trigger_lo + trigger_hi) / 2
@@ -197,7 +221,9 @@ def liquidity_pool_rebalancing():
         if new_pools:
             db.add_all(new_pools)
         db.add_all(history_entries)
+        rebalanced = {agent_tag(h.agent_id) for h in history_entries}
         db.commit()
+        get_response_cache().invalidate(*rebalanced)
         logging.info("Rebalancing complete with detailed history.")
 
     except Exception as e:
@@ -0,0 +1,62 @@
+"""
+Backtest every active agent's config and store the results as its performance, il and weekly_reward.
+
+    python -m src.aizen.jobs.score_agents --days 30
+"""
+import argparse
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from src.aizen.database import SessionLocal
+from src.aizen.models import Agent
+from src.aizen.backtest import backtest_configs, config_params, load_candles
+from src.aizen.data.market.tickers import ticker_for_pair
+from src.aizen.repositories import refresh_marketplace
+from src.aizen.cache import ALL_TAG, get_response_cache
+
+logging.basicConfig(level=logging.INFO)
+
+def score_agents(days=30, interval="1m", now=None):
+    start = (now or datetime.utcnow()) - timedelta(days=days)
+    with SessionLocal() as db:
+        agents = db.query(Agent).filter(Agent.is_active == True).all()
+
+        by_ticker = defaultdict(list)
+        for agent in agents:
+            try:
+                config_params(agent.config)
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Agent {agent.id} has no backtestable config ({e}); skipping")
+                continue
+            by_ticker[ticker_for_pair(agent.config['pool_details']['token_pair'])].append(agent)
+
+        scored = 0
+        for ticker, ticker_agents in by_ticker.items():
+            candles = load_candles(db, ticker, start, now, interval)
+            if len(candles) < 2:
+                logging.warning(f"Not enough {ticker} candles since {start} to score {len(ticker_agents)} agents")
+                continue
+
+            results = backtest_configs(candles, [a.config for a in ticker_agents])
+            for agent, result in zip(ticker_agents, results.itertuples()):
+                agent.performance = f"{result.performance:.1f}%"
+                agent.il = f"{result.il:.2f}"
+                agent.weekly_reward = f"{result.weekly_reward:.2f}"
+            scored += len(ticker_agents)
+            logging.info(f"Scored {len(ticker_agents)} {ticker} agents over {len(candles)} candles")
+
+        db.commit()
+        refresh_marketplace(db)
+        get_response_cache().invalidate(ALL_TAG)
+    return scored
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest agent configs and store their scores.")
+    parser.add_argument("--days", type=int, default=30, help="Days of stored candles to replay")
+    parser.add_argument("--interval", default="1m", help="Candle interval to replay at (1m, 5m, 1h, 1d)")
+    args = parser.parse_args()
+
+    score_agents(args.days, args.interval)
+
+if __name__ == "__main__":
+    main()
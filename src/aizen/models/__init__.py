@@ -9,4 +9,9 @@ from .agent_stat import AgentStat
 from .user_daily_earned_fee import UserDailyEarnedFee
 from .user_daily_clone_fee import UserDailyCloneFee
 from .user_daily_stat import UserDailyStat
-from .agent_daily_stat import AgentDailyStat
\ No newline at end of file
+from .agent_daily_stat import AgentDailyStat
+from .user_chat_summary import UserChatSummary
+from .indicator_state import IndicatorState
+from .marketplace_agent import MarketplaceAgent
+from .image_blob import ImageBlob
+from .clone_job import CloneJob
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, LargeBinary, ARRAY, Numeric, Float
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func  # Recommended for timestamps
+from sqlalchemy.orm import deferred
 from src.aizen.database import Base
 
 
@@ -18,7 +19,11 @@ class Agent(Base):
     config = Column(JSONB, nullable = False, default = {})
 
     # Optional fields (not in request payload but exist in the table)
-    image = Column(LargeBinary, nullable=True, default=None)
+    # Existing databases get both hashes and image_blobs from jobs.migrate_schema
+    image_hash = Column(String(64), nullable=True, index=True)     # ImageBlob served from /images/{hash}
+    thumbnail_hash = Column(String(64), nullable=True)             # Small ImageBlob for lists; image_hash when unset
+    # Inline image of agents created before image_blobs; moved out by migrate_agent_images
+    image = deferred(Column(LargeBinary, nullable=True, default=None))
     image_content = Column(String, nullable= True, default=None)
     performance = Column(String, nullable=True, default=None)
     aum = Column(String, nullable=True, default=None)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, func, BOOLEAN, Float
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, func, BOOLEAN, Float, Index
 from src.aizen.database import Base
 
 class AgentHistory(Base):
@@ -13,4 +13,7 @@ class AgentHistory(Base):
     created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=True)
     rebalance_logic = Column(Text, nullable = True)
     rebalance_bias = Column(Float, nullable=True)
-    positive_bias = Column(BOOLEAN, nullable = True)
\ No newline at end of file
+    positive_bias = Column(BOOLEAN, nullable = True)
+
+    # Newest-first history per agent: the windowed latest-N query and cursor pages
+    __table_args__ = (Index("ix_agent_history_agent_id_created_at", "agent_id", "created_at", "id"),)
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, Index, text
+from src.aizen.database import Base
+from datetime import datetime
+from uuid import uuid4
+
+class CloneJob(Base):
+    """
+    One /clone_agent request: the clone fee transfer and the agent created once it confirms.
+
+    status goes pending (row written, transfer not signed) -> broadcast (transfer
+    signed and recorded, then sent; waiting for the receipt) -> completed
+    (new_agent_id set) or failed (error set). A broadcast job keeps the signed
+    transaction and its nonce, so the worker can resend it or tell that another
+    transaction took the nonce.
+    """
+    __tablename__ = "clone_jobs"
+
+    id = Column(String(32), primary_key=True, default=lambda: uuid4().hex)
+    user_id = Column(Integer, nullable=False)           # Cloning user, who pays the fee
+    agent_id = Column(Integer, nullable=False)          # Agent being cloned
+    receiver_id = Column(Integer, nullable=False)       # Owner of agent_id, who receives the fee
+    name = Column(String, nullable=False)
+    fee_amount = Column(Numeric(precision=30, scale=20), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")
+    tx_hash = Column(String(66), nullable=True)
+    sender = Column(String(42), nullable=True)          # Wallet the fee is sent from
+    nonce = Column(Integer, nullable=True)
+    raw_tx = Column(Text, nullable=True)                # Signed transfer, hex
+    new_agent_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_clone_jobs_status_created_at", "status", "created_at"),
+        # An open job reserves its agent name, so two clones can't both pay for the same one
+        Index("uq_clone_jobs_open_name", "name", unique=True,
+              postgresql_where=text("status IN ('pending', 'broadcast')"),
+              sqlite_where=text("status IN ('pending', 'broadcast')")),
+    )
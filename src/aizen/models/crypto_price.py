@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, DECIMAL, BigInteger, Float
+from sqlalchemy import Column, Integer, String, DateTime, DECIMAL, BigInteger, Float, UniqueConstraint
 from src.aizen.database import Base
 
 class CryptoPrice(Base):
@@ -24,5 +24,9 @@ class CryptoPrice(Base):
     price_range = Column(Float)
     vwap = Column(Float)
 
-    __table_args__ = ({"sqlite_autoincrement": True},)
+    __table_args__ = (
+        # Upsert key for ingestion; existing databases get it from jobs.add_crypto_price_constraint
+        UniqueConstraint("ticker", "date", name="uq_crypto_prices_ticker_date"),
+        {"sqlite_autoincrement": True}
+    )
 
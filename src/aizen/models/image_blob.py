@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from src.aizen.database import Base
+from datetime import datetime
+
+class ImageBlob(Base):
+    """Image bytes stored once, keyed by the SHA-256 of their content."""
+    __tablename__ = "image_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    content_type = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime
+from src.aizen.database import Base
+from datetime import datetime
+
+class IndicatorState(Base):
+    __tablename__ = "indicator_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String(10), nullable=False, unique=True)
+    candle_at = Column(DateTime, nullable=False)        # Date of the last candle folded into the state
+    state = Column(JSON, nullable=False)                # StreamingIndicators.to_state()
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Numeric, JSON, ARRAY, Index
+from src.aizen.database import Base
+from datetime import datetime
+
+class MarketplaceAgent(Base):
+    """Read model of /agent_marketplace: one row per deployed agent, rebuilt by refresh_marketplace."""
+    __tablename__ = "marketplace_agents"
+
+    agent_id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    category = Column(String, nullable=True)
+    image = Column(JSON, nullable=False)                    # format_thumbnail() of the agent
+    performance = Column(String, nullable=True)
+    performance_value = Column(Float, nullable=True)        # parse_percent(performance), for sorting
+    il = Column(String, nullable=True)
+    weekly_reward = Column(String, nullable=True)
+    weekly_reward_value = Column(Float, nullable=True)
+    aum_eth = Column(Numeric(precision=30, scale=20), nullable=False, default=0)    # Active commissions
+    tags = Column(ARRAY(String), nullable=True)
+    is_trending = Column(Boolean, default=False)
+    created_date = Column(DateTime, nullable=True)
+    subscription_fee = Column(Float, default=0)
+    clone_fee = Column(Numeric(precision=30, scale=20), default=0)
+    cloned_by = Column(Integer, nullable=True)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_marketplace_agents_created_date", "created_date"),
+        Index("ix_marketplace_agents_performance_value", "performance_value"),
+        Index("ix_marketplace_agents_aum_eth", "aum_eth"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
 from src.aizen.database import Base
 from datetime import datetime
 
@@ -11,3 +11,6 @@ class UserChat(Base):
     user_query = Column(String, nullable=False)
     response = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Serves chat history pages; existing databases get it from jobs.add_user_chat_index
+    __table_args__ = (Index("ix_user_chats_user_id_agent_id_created_at", "user_id", "agent_id", "created_at", "id"),)
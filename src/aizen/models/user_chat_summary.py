@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Text, DateTime, UniqueConstraint
+from src.aizen.database import Base
+from datetime import datetime
+
+class UserChatSummary(Base):
+    __tablename__ = "user_chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    agent_id = Column(Integer, nullable=False)
+    summary = Column(Text, nullable=False, default="")          # Rolling summary of turns that fell out of the memory window
+    summarized_until = Column(DateTime, nullable=True)          # created_at of the newest chat folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("user_id", "agent_id", name="uq_user_chat_summaries_user_agent"),)
@@ -1,2 +1,2 @@
-from .liquidity_rebalancing_pipeline import LiquidityRebalancingPipeline
-from .user_chat_pipeline import UserChatPipeline
\ No newline at end of file
+from .liquidity_rebalancing_pipeline import LiquidityRebalancingPipeline, get_liquidity_rebalancing_pipeline
+from .user_chat_pipeline import UserChatPipeline, chat_record, get_user_chat_pipeline
\ No newline at end of file
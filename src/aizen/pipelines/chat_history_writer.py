@@ -0,0 +1,141 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+from datetime import datetime
+from src.aizen.cache import chat_tag, get_response_cache
+from src.aizen.database import SessionLocal
+from src.aizen.models import UserChat
+import threading
+import logging
+import atexit
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.25   # Seconds a batch may wait for more chats before it is written
+MAX_BATCH_SIZE = 200
+WRITE_RETRIES = 3       # Further attempts at a batch after a connection-level error
+RETRY_BACKOFF = 0.5     # Seconds before the first retry, doubled for each one after
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """
+    Writes UserChat rows from a background thread so /chat never waits on the insert.
+
+    Chats are queued by `submit` and inserted in batches, each batch in its own
+    short-lived session. `flush` blocks until everything queued so far is committed.
+
+    A batch that fails on the connection is retried with backoff. Once retries
+    run out, or when the batch itself is rejected (a constraint or a value the
+    column can't take), its rows are inserted one by one so a single bad chat
+    only loses itself. Rows that still fail are logged and counted as dropped.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_batch_size=MAX_BATCH_SIZE,
+                 retries=WRITE_RETRIES, backoff=RETRY_BACKOFF):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "batches": 0, "retries": 0, "row_fallbacks": 0, "dropped": 0}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, user_id: int, agent_id: int, user_query: str, response: dict, created_at: datetime = None):
+        self._ensure_started()
+        self._queue.put({
+            "user_id": user_id,
+            "agent_id": agent_id,
+            "user_query": user_query,
+            "response": response,
+            "created_at": created_at or datetime.utcnow()
+        })
+
+    def flush(self):
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                self._insert(batch)
+                self._stats["batches"] += 1
+                return
+            except Exception as e:
+                retryable = isinstance(e, OperationalError) or (isinstance(e, DBAPIError) and e.connection_invalidated)
+                if not retryable or attempt == self.retries:
+                    logger.warning("Failed to write %d chat(s), writing them one by one: %s", len(batch), e)
+                    break
+                self._stats["retries"] += 1
+                delay = self.backoff * 2 ** attempt
+                logger.warning("Failed to write %d chat(s), retrying in %.1fs: %s", len(batch), delay, e)
+                time.sleep(delay)
+
+        self._stats["row_fallbacks"] += 1
+        for chat in batch:
+            try:
+                self._insert([chat])
+            except Exception as e:
+                self._stats["dropped"] += 1
+                logger.error("Dropped chat of user %s with agent %s: %s", chat["user_id"], chat["agent_id"], e)
+
+    def _insert(self, chats):
+        with SessionLocal() as session:
+            session.execute(insert(UserChat), chats)
+            session.commit()
+        self._stats["written"] += len(chats)
+        get_response_cache().invalidate(*{chat_tag(chat["user_id"], chat["agent_id"]) for chat in chats})
+
+    def stats(self) -> dict:
+        return dict(self._stats, queued=self._queue.qsize())
+
+
+chat_history_writer = ChatHistoryWriter()
+atexit.register(chat_history_writer.close)
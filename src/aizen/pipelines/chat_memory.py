@@ -0,0 +1,226 @@
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import Field
+from sqlalchemy import tuple_
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+from src.aizen.database import SessionLocal
+from src.aizen.models import UserChat, UserChatSummary
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+MEMORY_TOKEN_LIMIT = 1200      # Tokens of verbatim history kept in the prompt
+MAX_CACHED_MEMORIES = 1000     # Conversations kept in-process before LRU eviction
+HISTORY_PAGE_SIZE = 20         # Chats loaded per query while hydrating
+
+
+class SummaryWindowMemory(ConversationSummaryBufferMemory):
+    """
+    Recent turns verbatim within a token budget plus a rolling summary of older ones.
+
+    Tracks the created_at of every buffered message so the point up to which the
+    summary covers the chat log can be persisted alongside it.
+    """
+
+    message_times: List[datetime] = Field(default_factory=list)
+    summarized_until: Optional[datetime] = None
+
+    def add_turn(self, user_query: str, answer: str, created_at: datetime):
+        self.chat_memory.add_user_message(user_query)
+        self.chat_memory.add_ai_message(answer)
+        self.message_times += [created_at, created_at]
+
+    def save_turn(self, user_query: str, answer: str, created_at: datetime):
+        """Append a turn stamped with its user_chats created_at, summarizing what overflows."""
+        self.add_turn(user_query, answer, created_at)
+        self.prune()
+
+    async def asave_turn(self, user_query: str, answer: str, created_at: datetime):
+        self.add_turn(user_query, answer, created_at)
+        await self.aprune()
+
+    def save_context(self, inputs, outputs) -> None:
+        now = datetime.utcnow()
+        self.message_times += [now, now]
+        super().save_context(inputs, outputs)
+
+    def prune(self) -> None:
+        pruned = self._pop_overflow()
+        if pruned:
+            self.moving_summary_buffer = self.predict_new_summary(pruned, self.moving_summary_buffer)
+
+    async def aprune(self) -> None:
+        pruned = self._pop_overflow()
+        if pruned:
+            self.moving_summary_buffer = await self.apredict_new_summary(pruned, self.moving_summary_buffer)
+
+    def _pop_overflow(self):
+        """
+        Remove whole turns, oldest first, until the buffer fits the token limit.
+
+        The newest turn always stays, as in ChatMemoryStore._hydrate; dropping
+        single messages could summarize a question and keep its answer, which
+        rehydration then loses.
+        """
+        buffer = self.chat_memory.messages
+        removed = 0
+        while len(buffer) - removed > 2 and self.llm.get_num_tokens_from_messages(buffer[removed:]) > self.max_token_limit:
+            removed += 2
+        if not removed:
+            return []
+        pruned = buffer[:removed]
+        del buffer[:removed]
+        self.summarized_until = self.message_times[removed - 1]
+        del self.message_times[:removed]
+        return pruned
+
+
+class ChatMemoryStore:
+    """LRU-bounded cache of per-conversation memories, hydrated from user_chats page by page."""
+
+    def __init__(self, llm, max_token_limit=MEMORY_TOKEN_LIMIT, max_entries=MAX_CACHED_MEMORIES, page_size=HISTORY_PAGE_SIZE):
+        self.llm = llm
+        self.max_token_limit = max_token_limit
+        self.max_entries = max_entries
+        self.page_size = page_size
+        self._memories: "OrderedDict[str, SummaryWindowMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, user_id: int, agent_id: int) -> str:
+        return f"{user_id}_{agent_id or 'default'}"
+
+    def get(self, user_id: int, agent_id: int) -> SummaryWindowMemory:
+        memory = self._cached(user_id, agent_id)
+        if memory is None:
+            memory = self._insert(user_id, agent_id, self._hydrate(user_id, agent_id))
+        return memory
+
+    async def aget(self, user_id: int, agent_id: int) -> SummaryWindowMemory:
+        """`get` for the event loop: a cache miss hydrates from the database in a worker thread."""
+        memory = self._cached(user_id, agent_id)
+        if memory is None:
+            memory = self._insert(user_id, agent_id, await asyncio.to_thread(self._hydrate, user_id, agent_id))
+        return memory
+
+    def _cached(self, user_id: int, agent_id: int) -> Optional[SummaryWindowMemory]:
+        key = self._key(user_id, agent_id)
+        with self._lock:
+            memory = self._memories.get(key)
+            if memory is not None:
+                self._memories.move_to_end(key)
+            return memory
+
+    def _insert(self, user_id: int, agent_id: int, memory: SummaryWindowMemory) -> SummaryWindowMemory:
+        key = self._key(user_id, agent_id)
+        with self._lock:
+            # Another request may have hydrated the same conversation meanwhile
+            memory = self._memories.setdefault(key, memory)
+            self._memories.move_to_end(key)
+            while len(self._memories) > self.max_entries:
+                self._memories.popitem(last=False)
+        return memory
+
+    def evict(self, user_id: int, agent_id: int):
+        with self._lock:
+            self._memories.pop(self._key(user_id, agent_id), None)
+
+    def save_turn(self, user_id: int, agent_id: int, memory, user_query: str, answer: str, created_at: datetime):
+        """Append a turn; when it pushes older turns into the summary, persist the new summary."""
+        if not isinstance(memory, SummaryWindowMemory):
+            memory.save_context({"input": user_query}, {"output": answer})
+            return
+
+        before = self._summary_state(memory)
+        memory.save_turn(user_query, answer, created_at)
+        if self._summary_state(memory) != before:
+            self._persist_summary(user_id, agent_id, memory.moving_summary_buffer, memory.summarized_until)
+
+    async def asave_turn(self, user_id: int, agent_id: int, memory, user_query: str, answer: str, created_at: datetime):
+        """`save_turn` for the event loop: the summary is generated with the model's async API."""
+        if not isinstance(memory, SummaryWindowMemory):
+            await memory.asave_context({"input": user_query}, {"output": answer})
+            return
+
+        before = self._summary_state(memory)
+        await memory.asave_turn(user_query, answer, created_at)
+        if self._summary_state(memory) != before:
+            await asyncio.to_thread(
+                self._persist_summary, user_id, agent_id, memory.moving_summary_buffer, memory.summarized_until
+            )
+
+    @staticmethod
+    def _summary_state(memory: SummaryWindowMemory):
+        # The window can move past more turns while the summary text comes out the same
+        return memory.moving_summary_buffer, memory.summarized_until
+
+    def _hydrate(self, user_id: int, agent_id: int) -> SummaryWindowMemory:
+        memory = SummaryWindowMemory(llm=self.llm, max_token_limit=self.max_token_limit, memory_key="chat_history")
+
+        with SessionLocal() as session:
+            summary = (
+                session.query(UserChatSummary)
+                .filter(UserChatSummary.user_id == user_id, UserChatSummary.agent_id == agent_id)
+                .first()
+            )
+            since = None
+            if summary:
+                memory.moving_summary_buffer = summary.summary
+                memory.summarized_until = since = summary.summarized_until
+
+            # Walk backwards from the newest chat until the token budget is spent, counted
+            # like _pop_overflow counts the buffer so a rehydrated window matches the live one
+            turns = []
+            buffer = []
+            for chat in self._iter_recent_chats(session, user_id, agent_id, since):
+                buffer = [HumanMessage(content=chat.user_query), AIMessage(content=chat.answer or "")] + buffer
+                if turns and self.llm.get_num_tokens_from_messages(buffer) > self.max_token_limit:
+                    break
+                turns.append(chat)
+
+        for chat in reversed(turns):
+            memory.add_turn(chat.user_query, chat.answer or "", chat.created_at)
+        return memory
+
+    def _iter_recent_chats(self, session, user_id: int, agent_id: int, since: Optional[datetime]):
+        """Yield chats newest first, one keyset page at a time."""
+        cursor = None
+        while True:
+            query = session.query(
+                UserChat.id,
+                UserChat.user_query,
+                UserChat.response["raw"].as_string().label("answer"),
+                UserChat.created_at
+            ).filter(UserChat.user_id == user_id, UserChat.agent_id == agent_id)
+
+            if since is not None:
+                query = query.filter(UserChat.created_at > since)
+            if cursor is not None:
+                query = query.filter(tuple_(UserChat.created_at, UserChat.id) < cursor)
+
+            rows = query.order_by(UserChat.created_at.desc(), UserChat.id.desc()).limit(self.page_size).all()
+            yield from rows
+
+            if len(rows) < self.page_size:
+                return
+            cursor = (rows[-1].created_at, rows[-1].id)
+
+    def _persist_summary(self, user_id: int, agent_id: int, summary_text: str, summarized_until: Optional[datetime]):
+        try:
+            with SessionLocal() as session:
+                summary = (
+                    session.query(UserChatSummary)
+                    .filter(UserChatSummary.user_id == user_id, UserChatSummary.agent_id == agent_id)
+                    .first()
+                )
+                if summary is None:
+                    summary = UserChatSummary(user_id=user_id, agent_id=agent_id)
+                summary.summary = summary_text
+                summary.summarized_until = summarized_until
+                session.add(summary)
+                session.commit()
+        except Exception as e:
+            logger.error("Failed to persist chat summary for %s/%s: %s", user_id, agent_id, e)
@@ -1,10 +1,11 @@
-from langchain_openai.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.chains.llm import LLMChain
 from langchain.output_parsers import PydanticOutputParser
 from langchain.memory import ConversationBufferMemory
+from langchain_core.output_parsers import StrOutputParser
+from functools import lru_cache
 from src.aizen.schemas.rebalance_decision import RebalanceDecision
-import json, os
+from src.aizen.pipelines.llm import build_llm
+import json
 
 # Indicator reference dictionary
 indicator_reference = {
@@ -35,18 +36,21 @@ indicator_reference = {
     "Price Range": {
         "description": "Price Range is the spread between the high and low prices over a time period. It helps assess how much the asset is fluctuating and supports decisions on how wide a liquidity range should be. A narrow range implies stability; a wide range implies movement.",
         "fields": ["price_range"]
+    },
+    "TWAP": {
+        "description": "TWAP (Time Weighted Average Price) is the pool's own average price over the last 60 seconds, 5 minutes and 30 minutes, read from its on-chain oracle. It is hard to manipulate within a single block, so a spot price far from the TWAPs usually means a short-lived move. When present, prefer the TWAPs over spot_price for judging where the pool is trading.",
+        "fields": ["twap_60s", "twap_300s", "twap_1800s", "spot_price"]
     }
 }
 
 
+INDICATOR_REFERENCE_JSON = json.dumps(indicator_reference, indent=2)
+
+
 class LiquidityRebalancingPipeline:
-    def __init__(self):
+    def __init__(self, llm=None):
         # Initialize LLM and Pydantic parser
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.llm = llm or build_llm()
         self.parser = PydanticOutputParser(pydantic_object=RebalanceDecision)
 
         # Build prompt with format instructions
@@ -82,44 +86,44 @@ class LiquidityRebalancingPipeline:
         Use these inputs to provide an informed market bias (`bias`) in percentage format (e.g., 0.1 for +10%, -0.05 for -5%). 
         Explain briefly _why_ the bias is positive or negative based on the indicators.
         """,
-            input_variables=["config_json", "price_json", "indicator_reference_json"],
+            input_variables=["config_json", "price_json"],
             partial_variables={
-                "format_instructions": self.parser.get_format_instructions()
+                "format_instructions": self.parser.get_format_instructions(),
+                "indicator_reference_json": INDICATOR_REFERENCE_JSON
             }
         )
 
-
+        # Built once; memory is supplied per call instead of being bound to the chain
+        self.chain = self.prompt | self.llm | StrOutputParser()
 
     def rebalance_now(self, config: dict, price_data: dict, memory: ConversationBufferMemory = None) -> RebalanceDecision:
         # Serialize inputs to JSON
-        config_json = json.dumps(config, indent=2)
-        price_json = json.dumps(price_data, indent=2)
-        indicator_json = json.dumps(indicator_reference, indent=2)
-
-        # Build LLMChain each call to include memory and verbose
-        chain = LLMChain(
-            llm=self.llm,
-            prompt=self.prompt,
-            memory=memory,
-            verbose=True
-        )
+        inputs = {
+            "config_json": json.dumps(config, indent=2),
+            "price_json": json.dumps(price_data, indent=2)
+        }
 
         # Run chain
         raw_output = None
         try:
-            raw_output = chain.run(
-                config_json=config_json,
-                price_json=price_json,
-                indicator_reference_json=indicator_json
-            )
+            raw_output = self.chain.invoke(inputs)
         except Exception as e:
             print(f"[LLM Error] {str(e)}")
             return None
 
+        if memory is not None:
+            memory.save_context({"input": inputs["price_json"]}, {"output": raw_output})
+
         try:
             decision = self.parser.parse(raw_output)
             return decision
         except Exception as e:
             print(f"[Parser Error] {str(e)}")
             print(f"[LLM Raw Output] {raw_output}")
-            return None
\ No newline at end of file
+            return None
+
+
+@lru_cache(maxsize=1)
+def get_liquidity_rebalancing_pipeline() -> LiquidityRebalancingPipeline:
+    """Process-wide pipeline instance; the prompt, parser and chain are built once."""
+    return LiquidityRebalancingPipeline()
@@ -0,0 +1,40 @@
+from langchain_openai import ChatOpenAI
+import httpx
+import os
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# One connection pool per process, shared by every pipeline so keep-alive
+# connections to the model provider survive across requests.
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+_http_client = None
+_http_async_client = None
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    global _http_async_client
+    if _http_async_client is None:
+        _http_async_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_async_client
+
+
+def build_llm(model: str = DEFAULT_MODEL, **kwargs) -> ChatOpenAI:
+    """Build a ChatOpenAI client that reuses the process-wide HTTP pool."""
+    return ChatOpenAI(
+        model=model,
+        base_url=OPENROUTER_BASE_URL,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client(),
+        **kwargs
+    )
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from typing import Optional
+from src.aizen.schemas.agent_config import AgentResponse
+import threading
+import logging
+import time
+import uuid
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+CHROMA_PATH = os.getenv("CHROMA_PATH", "db")
+COLLECTION_NAME = "chat_response_cache"
+SIMILARITY_THRESHOLD = 0.92
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+MAX_CACHE_ENTRIES = 5000
+
+# Queries asking for a config of their own, or leaning on earlier turns, are never
+# answered from (or written to) the shared cache.
+CONFIG_INTENT = re.compile(
+    r"\b(create|generate|build|make|set ?up|configure|config|change|update|adjust|modify|tweak|"
+    r"suggest|recommend|deploy|give me|i want|i need|i'd like|my|mine|me)\b",
+    re.IGNORECASE
+)
+CONTEXT_REFERENCE = re.compile(
+    r"\b(it|this|that|these|those|above|previous|earlier|again|more detail|elaborate)\b",
+    re.IGNORECASE
+)
+
+
+def is_cacheable_query(query: str) -> bool:
+    return not CONFIG_INTENT.search(query) and not CONTEXT_REFERENCE.search(query)
+
+
+class SemanticResponseCache:
+    """
+    Chroma-backed cache of generic /chat answers, looked up by embedding similarity.
+
+    Queries are embedded with Chroma's local ONNX MiniLM model. Entries expire
+    after `ttl` seconds and the oldest entries are evicted beyond `max_entries`.
+    If Chroma cannot be opened the cache disables itself and every lookup misses.
+    """
+
+    def __init__(self, path=CHROMA_PATH, threshold=SIMILARITY_THRESHOLD, ttl=CACHE_TTL_SECONDS, max_entries=MAX_CACHE_ENTRIES, enabled=True):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._collection = None
+        self._disabled = not enabled
+        self._entries: "OrderedDict[str, float]" = OrderedDict()   # id -> created_at, oldest first
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "bypassed": 0, "errors": 0, "latency_saved_s": 0.0, "lookup_time_s": 0.0}
+
+    def _get_collection(self):
+        if self._collection is not None or self._disabled:
+            return self._collection
+
+        with self._init_lock:
+            if self._collection is not None or self._disabled:
+                return self._collection
+            try:
+                import chromadb
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                client = chromadb.PersistentClient(path=self.path)
+                collection = client.get_or_create_collection(
+                    COLLECTION_NAME,
+                    embedding_function=DefaultEmbeddingFunction(),
+                    metadata={"hnsw:space": "cosine"}
+                )
+                existing = collection.get(include=["metadatas"])
+                ordered = sorted(zip(existing["ids"], existing["metadatas"]), key=lambda item: item[1]["created_at"])
+                self._entries = OrderedDict((entry_id, meta["created_at"]) for entry_id, meta in ordered)
+                self._collection = collection
+            except Exception as e:
+                logger.warning("Semantic cache disabled: %s", e)
+                self._disabled = True
+        return self._collection
+
+    def lookup(self, query: str) -> Optional[AgentResponse]:
+        if not is_cacheable_query(query):
+            self._record(bypassed=1)
+            return None
+
+        collection = self._get_collection()
+        if collection is None:
+            return None
+
+        start = time.perf_counter()
+        try:
+            result = collection.query(query_texts=[query], n_results=1, include=["metadatas", "distances"])
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            self._record(errors=1)
+            return None
+
+        response = None
+        latency = 0.0
+        if result["ids"] and result["ids"][0]:
+            entry_id = result["ids"][0][0]
+            meta = result["metadatas"][0][0]
+            similarity = 1 - result["distances"][0][0]
+            if time.time() - meta["created_at"] > self.ttl:
+                self._delete([entry_id])
+            elif similarity >= self.threshold:
+                response = AgentResponse.model_validate_json(meta["response"])
+                latency = meta.get("latency", 0.0)
+
+        lookup_time = time.perf_counter() - start
+        if response is None:
+            self._record(misses=1, lookup_time_s=lookup_time)
+        else:
+            self._record(hits=1, latency_saved_s=max(latency - lookup_time, 0.0), lookup_time_s=lookup_time)
+        return response
+
+    def store(self, query: str, response: AgentResponse, latency: float):
+        """Cache a generic answer; responses carrying a config are user-specific and skipped."""
+        if response.config is not None or not is_cacheable_query(query):
+            return
+
+        collection = self._get_collection()
+        if collection is None:
+            return
+
+        entry_id = uuid.uuid4().hex
+        created_at = time.time()
+        try:
+            collection.add(
+                ids=[entry_id],
+                documents=[query],
+                metadatas=[{"response": response.model_dump_json(), "latency": latency, "created_at": created_at}]
+            )
+        except Exception as e:
+            logger.warning("Semantic cache store failed: %s", e)
+            return
+
+        with self._lock:
+            self._entries[entry_id] = created_at
+            overflow = len(self._entries) - self.max_entries
+            evicted = [key for key, _ in zip(self._entries, range(max(overflow, 0)))]
+        if evicted:
+            self._delete(evicted)
+
+    def _delete(self, ids):
+        try:
+            self._collection.delete(ids=ids)
+        except Exception as e:
+            logger.warning("Semantic cache eviction failed: %s", e)
+        with self._lock:
+            for entry_id in ids:
+                self._entries.pop(entry_id, None)
+
+    def _record(self, **deltas):
+        with self._lock:
+            self._stats["lookups"] += 1
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        served = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / served if served else 0.0
+        stats["avg_lookup_ms"] = stats.pop("lookup_time_s") / served * 1000 if served else 0.0
+        stats["enabled"] = not self._disabled
+        return stats
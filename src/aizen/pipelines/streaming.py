@@ -0,0 +1,152 @@
+from pydantic import ValidationError
+from typing import List, Optional, Tuple
+from src.aizen.schemas.agent_config import AgentConfig
+import json
+import re
+
+ANSWER_KEY = re.compile(r'"answer"\s*:\s*"')
+CONFIG_KEY = re.compile(r'"config"\s*:\s*(?=\S)')
+KEY_OVERLAP = 64    # Trailing characters searched again for a key split across chunks
+STRING_DECODER = json.JSONDecoder(strict=False)     # Models put raw newlines in strings
+
+
+class ClosedValueScanner:
+    """
+    Finds the end of the JSON object/null starting at `start` in a growing text.
+
+    Each `scan` resumes where the previous one stopped, so a value streamed in
+    many chunks is read once.
+    """
+
+    def __init__(self, start: int):
+        self.start = start
+        self.pos = start
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def scan(self, text: str) -> Optional[str]:
+        """Return the complete value, or None if it is still streaming."""
+        if text.startswith("null", self.start):
+            return "null"
+        if self.start >= len(text) or text[self.start] != "{":
+            return None
+
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return text[self.start:i + 1]
+        self.pos = len(text)
+        return None
+
+
+class IncrementalResponseParser:
+    """
+    Parses the AgentResponse JSON while the model is still producing it.
+
+    `feed` returns the events that became available with the new chunk:
+    ("answer", <new answer text>) as the answer string grows, and
+    ("config", <dict>) once, as soon as the config object is closed and
+    validates against AgentConfig. Only the new part of the buffer is read
+    on each call. The config is looked for after the answer string closes,
+    so a "config" key quoted inside the answer is never mistaken for it; a
+    config the model writes before the answer arrives with the final parse.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.answer = ""
+        self.config = None
+        self.config_done = False
+        self._search_from = 0           # Where the next key search starts
+        self._answer_pos = None         # Next undecoded character of the answer string
+        self._answer_closed = False
+        self._config_value = None       # ClosedValueScanner once the config key is found
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        self.buffer += chunk
+        events = []
+
+        if not self._answer_closed:
+            delta = self._feed_answer()
+            if delta:
+                self.answer += delta
+                events.append(("answer", delta))
+
+        if self._answer_closed and not self.config_done:
+            self.config_done, config = self._parse_config()
+            if config is not None:
+                self.config = config
+                events.append(("config", config))
+
+        return events
+
+    def _find_key(self, pattern):
+        match = pattern.search(self.buffer, self._search_from)
+        if match is None:
+            self._search_from = max(self._search_from, len(self.buffer) - KEY_OVERLAP)
+        return match
+
+    def _feed_answer(self) -> str:
+        """Decode the answer characters received since the last call."""
+        if self._answer_pos is None:
+            match = self._find_key(ANSWER_KEY)
+            if match is None:
+                return ""
+            self._answer_pos = match.end()
+
+        text = self.buffer
+        start = i = self._answer_pos
+        while i < len(text) and text[i] != '"':
+            if text[i] != "\\":
+                i += 1
+                continue
+            # Decode whole escapes only; a surrogate pair is one character
+            size = 2
+            if text.startswith("\\u", i):
+                size = 12 if text[i + 2:i + 4].upper() in ("D8", "D9", "DA", "DB") else 6
+            if i + size > len(text):
+                break
+            i += size
+
+        self._answer_closed = i < len(text) and text[i] == '"'
+        self._answer_pos = self._search_from = i + 1 if self._answer_closed else i
+        if start == i:
+            return ""
+        try:
+            return STRING_DECODER.decode(f'"{text[start:i]}"')
+        except ValueError:
+            # Malformed escape; stop streaming the answer and let the final parse report it
+            self._answer_closed = True
+            return ""
+
+    def _parse_config(self):
+        """Return (done, config); done is True once the config value has been fully received."""
+        if self._config_value is None:
+            match = self._find_key(CONFIG_KEY)
+            if match is None:
+                return False, None
+            self._config_value = ClosedValueScanner(match.end())
+        raw = self._config_value.scan(self.buffer)
+        if raw is None:
+            return False, None
+        if raw == "null":
+            return True, None
+        try:
+            return True, AgentConfig.model_validate(json.loads(raw)).model_dump()
+        except (ValueError, ValidationError):
+            # Closed but invalid; the final parse reports the error
+            return True, None
@@ -1,20 +1,23 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
-from langchain.chains.llm import LLMChain
-from langchain.memory import ConversationBufferMemory
+from langchain_core.output_parsers import StrOutputParser
+from langchain.memory.chat_memory import BaseChatMemory
 from langchain.output_parsers import PydanticOutputParser
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Tuple
 from pydantic import BaseModel
-import os
+from functools import lru_cache
+from datetime import datetime
 from dotenv import load_dotenv
+import asyncio
 import logging
+import time
 from src.aizen.schemas.agent_config import AgentResponse
-from src.aizen.models import UserChat
-from sqlalchemy.orm import Session
-from src.aizen.database import SessionLocal
+from src.aizen.pipelines.llm import build_llm
+from src.aizen.pipelines.chat_history_writer import chat_history_writer
+from src.aizen.pipelines.streaming import IncrementalResponseParser
+from src.aizen.pipelines.chat_memory import ChatMemoryStore, SummaryWindowMemory
+from src.aizen.pipelines.semantic_cache import SemanticResponseCache
 
 load_dotenv(override=True)
-db: Session = SessionLocal()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -63,15 +66,20 @@ uniswap_tags = [
 ]
 
 
+def chat_record(response: AgentResponse) -> dict:
+    """A turn's user_chats.response: the answer text and the config."""
+    return {
+        "raw": response.answer,
+        "config": response.config.dict() if hasattr(response.config, "dict") else response.config
+    }
+
+
 class UserChatPipeline:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+    def __init__(self, llm=None, response_cache: SemanticResponseCache = None):
+        self.llm = llm or build_llm()
         self.parser = PydanticOutputParser(pydantic_object=AgentResponse)
-        self.memories: Dict[str, ConversationBufferMemory] = {}
+        self.memories = ChatMemoryStore(self.llm)
+        self.response_cache = response_cache or SemanticResponseCache()
 
         self.prompt = PromptTemplate(
             template="""
@@ -132,70 +140,111 @@ class UserChatPipeline:
         - Example: "If price drops by more than 25%, shift to a narrower range" → use `below.by = 2.5`, `lower/higher = 0.04`.
         - If the user doesn't want such dual-trigger logic, omit `rebalance_triggers`.
 
+        ### CONVERSATION HISTORY
+        {chat_history}
+
         ### USER QUERY
         {input}
         """,
-            input_variables=["input"],
+            input_variables=["input", "chat_history"],
             partial_variables={"format_instructions": self.parser.get_format_instructions(), "uniswap_tags": uniswap_tags}
         )
 
-    def _get_memory_key(self, user_id: int, agent_id: int) -> str:
-        return f"{user_id}_{agent_id or 'default'}"
-
-    def _get_memory(self, user_id: int, agent_id: int) -> ConversationBufferMemory:
-        key = self._get_memory_key(user_id, agent_id)
-        if key not in self.memories:
-            history = self._fetch_chat_history(user_id, agent_id)
-            memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-            for entry in history:
-                memory.chat_memory.add_user_message(entry["user_query"])
-                memory.chat_memory.add_ai_message(entry["response"])
-            self.memories[key] = memory
-        return self.memories[key]
-
-    def _fetch_chat_history(self, user_id: int, agent_id: int):
-        chats = (
-            db.query(UserChat)
-            .filter(UserChat.user_id == user_id, UserChat.agent_id == agent_id)
-            .order_by(UserChat.created_at)
-            .all()
-        )
+        # Built once per process; conversation memory is passed in on each call
+        self.chain = self.prompt | self.llm | StrOutputParser()
 
-        chat_history = [
-            {
-                "user_query": chat.user_query,
-                "response": chat.response["raw"]
-            }
-            for chat in chats
-        ]
+    def _get_memory(self, user_id: int, agent_id: int) -> SummaryWindowMemory:
+        return self.memories.get(user_id, agent_id)
 
-        return chat_history
+    async def _aget_memory(self, user_id: int, agent_id: int) -> SummaryWindowMemory:
+        return await self.memories.aget(user_id, agent_id)
 
-    def _save_chat_history(self, user_id: int, agent_id: int, user_query: str, response: dict):
-        new_chat = UserChat(user_id = user_id, agent_id = agent_id, user_query = user_query, response = response)
+    def _save_chat_history(self, user_id: int, agent_id: int, user_query: str, response: dict, created_at: datetime):
+        # Queued for the background writer; the request does not wait for the insert
+        chat_history_writer.submit(user_id, agent_id, user_query, response, created_at)
 
-        db.add(new_chat)
-        db.commit()
-        
+    def _save_turn(self, user_id: int, agent_id: int, memory, user_query: str, response: AgentResponse):
+        # Memory and row share created_at, so a persisted summary's summarized_until
+        # matches exactly the rows it covers when the conversation is rehydrated
+        created_at = datetime.utcnow()
+        self.memories.save_turn(user_id, agent_id, memory, user_query, response.answer, created_at)
+        self._save_chat_history(user_id, agent_id, user_query, chat_record(response), created_at)
 
-    def handle_chat(self, user_id, user_query, agent_id) -> AgentResponse:
-        memory = self._get_memory(user_id, agent_id)
+    async def _asave_turn(self, user_id: int, agent_id: int, memory, user_query: str, response: AgentResponse):
+        created_at = datetime.utcnow()
+        await self.memories.asave_turn(user_id, agent_id, memory, user_query, response.answer, created_at)
+        self._save_chat_history(user_id, agent_id, user_query, chat_record(response), created_at)
 
-        chain = LLMChain(
-            llm=self.llm,
-            prompt=self.prompt,
-            memory=memory,
-            verbose=True
-        )
+    def handle_chat(self, user_id, user_query, agent_id, memory: BaseChatMemory = None) -> AgentResponse:
+        if memory is None:
+            memory = self._get_memory(user_id, agent_id)
+
+        cached = self.response_cache.lookup(user_query)
+        if cached is not None:
+            self._save_turn(user_id, agent_id, memory, user_query, cached)
+            return cached
+
+        start = time.perf_counter()
+        chat_history = memory.load_memory_variables({})[memory.memory_key]
         try:
-            result = chain.run(input=user_query)
+            result = self.chain.invoke({"input": user_query, "chat_history": chat_history})
         except Exception as e:
-            logger.error("Error executing %%%%%%%%%%%%%%%%%%%%%")
-            logger.error(str(e))
+            logger.error("Error executing chat chain: %s", e)
+            raise
 
         try:
             parsed = self.parser.parse(result)
-            print(parsed)
-            return parsed
         except Exception as e:
             raise ValueError(f"Failed to parse LLM output: {e}\nRaw Output:\n{result}")
+
+        self.response_cache.store(user_query, parsed, time.perf_counter() - start)
+
+        # Memory mirrors what _get_memory hydrates from the DB: the answer text only
+        self._save_turn(user_id, agent_id, memory, user_query, parsed)
+        return parsed
+
+    async def astream_chat(self, user_id, user_query, agent_id, memory: BaseChatMemory = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a chat turn as ("answer", text_delta) and ("config", dict) events while
+        the model is generating, followed by a single ("done", AgentResponse).
+        The turn is saved to memory and queued for user_chats before "done".
+        """
+        if memory is None:
+            memory = await self._aget_memory(user_id, agent_id)
+
+        # Embedding the query and querying Chroma block; keep them off the event loop
+        cached = await asyncio.to_thread(self.response_cache.lookup, user_query)
+        if cached is not None:
+            await self._asave_turn(user_id, agent_id, memory, user_query, cached)
+            yield "answer", cached.answer
+            yield "done", cached
+            return
+
+        start = time.perf_counter()
+        chat_history = memory.load_memory_variables({})[memory.memory_key]
+        incremental = IncrementalResponseParser()
+        async for chunk in self.chain.astream({"input": user_query, "chat_history": chat_history}):
+            for event in incremental.feed(chunk):
+                yield event
+
+        result = incremental.buffer
+        try:
+            parsed = self.parser.parse(result)
+        except Exception as e:
+            raise ValueError(f"Failed to parse LLM output: {e}\nRaw Output:\n{result}")
+
+        # The streamed answer can lag the final parse when the model escapes characters
+        if len(parsed.answer) > len(incremental.answer) and parsed.answer.startswith(incremental.answer):
+            yield "answer", parsed.answer[len(incremental.answer):]
+        if parsed.config is not None and incremental.config is None:
+            yield "config", parsed.config.model_dump()
+
+        await asyncio.to_thread(self.response_cache.store, user_query, parsed, time.perf_counter() - start)
+        await self._asave_turn(user_id, agent_id, memory, user_query, parsed)
+        yield "done", parsed
+
+
+@lru_cache(maxsize=1)
+def get_user_chat_pipeline() -> UserChatPipeline:
+    """Process-wide pipeline instance shared by every /chat request."""
+    return UserChatPipeline()
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional
+
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from src.aizen.protocols.uniswapv3 import GOERLI_ENDPOINT, get_pool_address
+
+import logging
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+Q192 = 1 << 192
+
+DEFAULT_WINDOWS = (60, 300, 1800)   # TWAP windows in seconds
+BLOCK_CACHE_SIZE = 8                # Readings kept per oracle, one per block
+QUOTE_TOKENS = {"USDC"}
+
+POOL_ABI = [
+    {"inputs": [{"internalType": "uint32[]", "name": "secondsAgos", "type": "uint32[]"}], "name": "observe", "outputs": [{"internalType": "int56[]", "name": "tickCumulatives", "type": "int56[]"}, {"internalType": "uint160[]", "name": "secondsPerLiquidityCumulativeX128s", "type": "uint160[]"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [], "name": "slot0", "outputs": [{"internalType": "uint160", "name": "sqrtPriceX96", "type": "uint160"}, {"internalType": "int24", "name": "tick", "type": "int24"}, {"internalType": "uint16", "name": "observationIndex", "type": "uint16"}, {"internalType": "uint16", "name": "observationCardinality", "type": "uint16"}, {"internalType": "uint16", "name": "observationCardinalityNext", "type": "uint16"}, {"internalType": "uint8", "name": "feeProtocol", "type": "uint8"}, {"internalType": "bool", "name": "unlocked", "type": "bool"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [], "name": "token0", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [], "name": "token1", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"}
+]
+TOKEN_ABI = [
+    {"constant": True, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "type": "function"},
+    {"constant": True, "inputs": [], "name": "symbol", "outputs": [{"name": "", "type": "string"}], "type": "function"}
+]
+
+# TickMath.getSqrtRatioAtTick: bit i of |tick| multiplies the Q128 ratio by sqrt(1.0001) ** -(2 ** i)
+_TICK_RATIOS = [
+    0xfffcb933bd6fad37aa2d162d1a594001, 0xfff97272373d413259a46990580e213a, 0xfff2e50f5f656932ef12357cf3c7fdcc,
+    0xffe5caca7e10e4e61c3624eaa0941cd0, 0xffcb9843d60f6159c9db58835c926644, 0xff973b41fa98c081472e6896dfb254c0,
+    0xff2ea16466c96a3843ec78b326b52861, 0xfe5dee046a99a2a811c461f1969c3053, 0xfcbe86c7900a88aedcffc83b479aa3a4,
+    0xf987a7253ac413176f2b074cf7815e54, 0xf3392b0822b70005940c7a398e4b70f3, 0xe7159475a2c29b7443b29c7fa6e889d9,
+    0xd097f3bdfd2022b8845ad8f792aa5825, 0xa9f746462d870fdf8a65dc1f90e061e5, 0x70d869a156d2a1b890bb3df62baf32f7,
+    0x31be135f97d08fd981231505542fcfa6, 0x9aa508b5b7a84e1c677de54f3e99bc9, 0x5d6af8dedb81196699c329225ee604,
+    0x2216e584f5fa1ea926041bedfe98, 0x48a170391f7dc42444e8fa2
+]
+
+
+def get_sqrt_ratio_at_tick(tick: int) -> int:
+    """sqrt(1.0001 ** tick) as a Q64.96, bit for bit what TickMath.getSqrtRatioAtTick returns."""
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"Tick {tick} out of range")
+
+    ratio = _TICK_RATIOS[0] if abs_tick & 0x1 else 1 << 128
+    for bit, multiplier in enumerate(_TICK_RATIOS[1:], start=1):
+        if abs_tick & (1 << bit):
+            ratio = (ratio * multiplier) >> 128
+    if tick > 0:
+        ratio = ((1 << 256) - 1) // ratio
+    # Q128.128 -> Q64.96, rounding up
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+def mean_tick(tick_cumulative_start: int, tick_cumulative_end: int, seconds: int) -> int:
+    """Arithmetic mean tick between two observations, rounded towards negative infinity as OracleLibrary.consult does."""
+    return (tick_cumulative_end - tick_cumulative_start) // seconds
+
+
+def price_at_tick(tick: int, decimals0: int, decimals1: int, base_is_token0: bool = True) -> float:
+    """Price of the base token in the other token at `tick`, from the exact sqrt ratio and adjusted for decimals."""
+    sqrt_ratio = get_sqrt_ratio_at_tick(tick)
+    price = Fraction(sqrt_ratio * sqrt_ratio, Q192) * Fraction(10) ** (decimals0 - decimals1)  # token1 per token0
+    return float(price if base_is_token0 else 1 / price)
+
+
+class PoolOracle:
+    """
+    TWAPs read from a Uniswap V3 pool's observations.
+
+    Every window is served by one `observe` call per block, so all TWAPs are
+    consistent with each other and with the spot tick read at the same block.
+    Readings are cached by block number; calling `read()` again before the
+    next block only costs the block number lookup.
+    """
+
+    def __init__(self, pool_details: dict, windows: Iterable[int] = DEFAULT_WINDOWS, w3: Optional[Web3] = None,
+                 endpoint: str = GOERLI_ENDPOINT) -> None:
+        self.w3 = w3 or Web3(Web3.HTTPProvider(endpoint))
+        self.pool_details = pool_details
+        self.windows = sorted(set(int(w) for w in windows))
+        self.contract = self.w3.eth.contract(address=Web3.to_checksum_address(get_pool_address(pool_details)), abi=POOL_ABI)
+        self._tokens = None
+        self._readings: "OrderedDict[int, dict]" = OrderedDict()
+
+    @property
+    def tokens(self):
+        """(decimals0, decimals1, base_is_token0), read once per oracle."""
+        if self._tokens is None:
+            tokens = [self.w3.eth.contract(address=self.contract.functions.token0().call(), abi=TOKEN_ABI),
+                      self.w3.eth.contract(address=self.contract.functions.token1().call(), abi=TOKEN_ABI)]
+            decimals0, decimals1 = (token.functions.decimals().call() for token in tokens)
+            self._tokens = (decimals0, decimals1, tokens[0].functions.symbol().call() not in QUOTE_TOKENS)
+        return self._tokens
+
+    def price(self, tick: int) -> float:
+        decimals0, decimals1, base_is_token0 = self.tokens
+        return price_at_tick(tick, decimals0, decimals1, base_is_token0)
+
+    def observe(self, seconds_agos: List[int], block_identifier="latest") -> List[int]:
+        """Tick cumulatives at each of `seconds_agos`, in one call."""
+        return self.contract.functions.observe(seconds_agos).call(block_identifier=block_identifier)[0]
+
+    def twap_ticks(self, windows: Iterable[int], block_identifier="latest") -> Dict[int, int]:
+        """
+        Mean tick over each window ending at the block.
+
+        A window older than the pool's observation history makes the whole
+        `observe` call revert, so such windows are dropped longest first.
+        """
+        windows = sorted(set(windows))
+        while windows:
+            try:
+                cumulatives = self.observe(windows[::-1] + [0], block_identifier)
+            except ContractLogicError as e:
+                logging.warning(f"observe reverted for {windows[-1]}s window ({e}); dropping it")
+                windows = windows[:-1]
+                continue
+            now = cumulatives[-1]
+            return {w: mean_tick(start, now, w) for w, start in zip(windows, cumulatives[-2::-1])}
+        return {}
+
+    def read(self, block_identifier="latest") -> dict:
+        """Spot and TWAP ticks and prices at a block: {'block', 'timestamp', 'spot', 'twap': {window: {'tick', 'price'}}}."""
+        block = self.w3.eth.get_block(block_identifier)
+        number = block["number"]
+        if number in self._readings:
+            return self._readings[number]
+
+        spot_tick = self.contract.functions.slot0().call(block_identifier=number)[1]
+        ticks = self.twap_ticks(self.windows, number)
+        reading = {
+            "block": number,
+            "timestamp": block["timestamp"],
+            "spot": {"tick": spot_tick, "price": self.price(spot_tick)},
+            "twap": {w: {"tick": t, "price": self.price(t)} for w, t in ticks.items()}
+        }
+
+        self._readings[number] = reading
+        while len(self._readings) > BLOCK_CACHE_SIZE:
+            self._readings.popitem(last=False)
+        return reading
+
+    def price_fields(self, block_identifier="latest") -> dict:
+        """The reading flattened into price map fields: spot_price and twap_<window>s."""
+        reading = self.read(block_identifier)
+        fields = {"spot_price": reading["spot"]["price"]}
+        for window, twap in reading["twap"].items():
+            fields[f"twap_{window}s"] = twap["price"]
+        return fields
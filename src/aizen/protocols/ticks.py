@@ -0,0 +1,81 @@
+"""
+Tick range and rebalance trigger rules used by the live rebalancer and the backtester.
+
+Plain float arithmetic on purpose: for the same tick and widths the backtester
+lands on exactly the ticks the live job would pick. The two apply a fired
+trigger differently; see src.aizen.backtest.engine.
+"""
+import math
+
+# Fee tier (percent) -> tick spacing
+TICK_SPACINGS = {
+    0.01: 1,
+    0.05: 10,
+    0.3: 60,
+    1: 200
+}
+
+
+def tick_spacing(fee_tier: float) -> int:
+    if fee_tier not in TICK_SPACINGS:
+        raise ValueError("Unsupported fee tier")
+    return TICK_SPACINGS[fee_tier]
+
+
+def price_to_tick(price):
+    return math.log(price, 1.0001)
+
+
+def tick_range(current_tick, lower, upper, buffer, spacing):
+    """
+    (lower_tick, upper_tick) around `current_tick`, widened by `lower`/`upper` plus `buffer` in price.
+
+    Ticks are truncated, snapped down to the tick spacing and pushed apart when
+    they coincide.
+    """
+    price = 1.0001 ** current_tick
+    if price <= 0:
+        raise ValueError(f"Invalid price calculated: {price}")
+
+    lower_price = price * (1 - lower - buffer)
+    upper_price = price * (1 + upper + buffer)
+    if lower_price <= 0 or upper_price <= 0:
+        raise ValueError(f"Invalid price range: lower={lower_price}, upper={upper_price}")
+
+    lower_tick = int(price_to_tick(lower_price))
+    upper_tick = int(price_to_tick(upper_price))
+    lower_tick -= lower_tick % spacing
+    upper_tick -= upper_tick % spacing
+
+    if lower_tick == upper_tick:
+        lower_tick -= spacing
+        upper_tick += spacing
+    return lower_tick, upper_tick
+
+
+def range_deviation(current_tick, range_lower, range_upper):
+    """How far an out-of-range tick sits past the nearer edge, in percent of the range's width."""
+    span = range_upper - range_lower
+    if current_tick < range_lower:
+        return (range_lower - current_tick) / span * 100
+    return (current_tick - range_upper) / span * 100
+
+
+def triggered_range(current_tick, range_lower, range_upper, triggers):
+    """
+    The (lower, higher, reason) of the rebalance trigger that fires, or None.
+
+    `triggers` is a config's rebalance_triggers: a 'below' and/or 'above' entry
+    with 'by' (deviation in percent) and 'lower'/'higher' values. What those
+    values mean is up to the caller.
+    """
+    deviation = range_deviation(current_tick, range_lower, range_upper)
+    below = (triggers or {}).get('below')
+    above = (triggers or {}).get('above')
+    if below and all(k in below for k in ('by', 'lower', 'higher')):
+        if current_tick < range_lower and deviation >= below['by']:
+            return below['lower'], below['higher'], "Applied below-trigger"
+    if above and all(k in above for k in ('by', 'lower', 'higher')):
+        if current_tick > range_upper and deviation >= above['by']:
+            return above['lower'], above['higher'], "Applied above-trigger"
+    return None
@@ -7,6 +7,7 @@ from decimal import Decimal
 from src.aizen.models import AgentStat
 from sqlalchemy.orm import Session
 from src.aizen.database import SessionLocal
+from src.aizen.protocols.ticks import tick_range, tick_spacing
 
 import logging
 
@@ -112,51 +113,14 @@ class UniswapV3:
         :param range_config: Dictionary with 'lower', 'upper', and optional 'buffer'.
         :return: Tuple of (lower_tick, upper_tick).
         """
-        lower = range_config["lower"]
-        upper = range_config["upper"]
-        buffer = range_config.get("buffer", 0)
-
-        # Convert tick to price
-        price = 1.0001 ** current_tick
-        logging.info(f"Current Price: {price}")
-
-        if price <= 0:
-            raise ValueError(f"Invalid price calculated: {price}")
-
-        # Expand range by buffer if needed
-        lower_price = price * (1 - lower - buffer)
-        upper_price = price * (1 + upper + buffer)
-
-        logging.info(f"Lower Price: {lower_price}")
-        logging.info(f"Upper Price: {upper_price}")
-
-        if lower_price <= 0 or upper_price <= 0:
-            raise ValueError(f"Invalid price range: lower={lower_price}, upper={upper_price}")
-
-        # Convert prices to ticks
-        lower_tick = int(self.price_to_tick(lower_price))
-        upper_tick = int(self.price_to_tick(upper_price))
-
-        # Adjust to nearest valid tick spacing
-        if self.fee_tier == 0.01:
-            tick_spacing = 1
-        elif self.fee_tier == 0.05:
-            tick_spacing = 10
-        elif self.fee_tier == 0.3:
-            tick_spacing = 60
-        elif self.fee_tier == 1:
-            tick_spacing = 200
-        else:
-            raise ValueError("Unsupported fee tier")
-
-        lower_tick -= lower_tick % tick_spacing
-        upper_tick -= upper_tick % tick_spacing
-
-        # Ensure the ticks are not the same
-        if lower_tick == upper_tick:
-            lower_tick -= tick_spacing
-            upper_tick += tick_spacing
-
+        logging.info(f"Current Price: {1.0001 ** current_tick}")
+        lower_tick, upper_tick = tick_range(
+            current_tick,
+            range_config["lower"],
+            range_config["upper"],
+            range_config.get("buffer", 0),
+            tick_spacing(self.fee_tier)
+        )
         logging.info(f"Final Lower Tick: {lower_tick}, Final Upper Tick: {upper_tick}")
         return lower_tick, upper_tick
 
@@ -0,0 +1,4 @@
+from .agent_history import REASON_TO_TYPE, history_entry, history_page, latest_history, rebalance_counts
+from .marketplace import marketplace_cache, marketplace_response, refresh_marketplace
+from .clones import broadcast_clone_job, clone_job_status, complete_clone_job, create_clone_job, fail_clone_job
+from .chat_history import chat_entry, chat_page
@@ -0,0 +1,108 @@
+"""
+Set-based reads of agent_history for the agent endpoints.
+
+Every function takes a whole list of agent ids and runs a fixed number of
+queries, however many agents or history rows there are. The newest rows per
+agent come from one ROW_NUMBER() window, and the rebalance counts come from one
+GROUP BY. Both use the (agent_id, created_at, id) index. History pages are
+keyed on (created_at, id), so reading page n costs the same as reading page 1.
+"""
+import base64
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import aliased
+
+from src.aizen.models import AgentHistory
+
+HISTORY_LIMIT = 10
+MAX_PAGE_SIZE = 100
+
+REASON_TO_TYPE = {
+    'Position out of range; executed rebalance': 'rebalanced',
+    'No action; position in range': 'in_range',
+    'Skipped; within rebalance timeframe': 'skipped',
+    'Initial liquidity deployment': 'initial',
+    'Applied below-trigger': 'Below Trigger Rebalance',
+    'Applied above-trigger': 'Above Trigger Rebalance',
+    'Applied positive bias to current price': 'Positive Bias',
+    'Applied negative bias to current price': 'Negative Bias'
+}
+
+_NEWEST_FIRST = (AgentHistory.created_at.desc(), AgentHistory.id.desc())
+
+
+def history_entry(history: AgentHistory) -> dict:
+    """An agent_history row as the endpoints return it."""
+    return {
+        "event": history.reason,
+        "type": REASON_TO_TYPE.get(history.reason, "unknown"),
+        "rebalance_bias": history.rebalance_bias,
+        "positive_bias": history.positive_bias,
+        "timestamp": history.created_at.isoformat() if history.created_at else None
+    }
+
+
+def latest_history(db, agent_ids: Iterable[int], limit: int = HISTORY_LIMIT) -> Dict[int, List[AgentHistory]]:
+    """Agent id -> its `limit` newest history rows, newest first, in one query."""
+    agent_ids = list(set(agent_ids))
+    if not agent_ids:
+        return {}
+    position = func.row_number().over(partition_by=AgentHistory.agent_id, order_by=_NEWEST_FIRST).label("position")
+    ranked = db.query(AgentHistory, position).filter(AgentHistory.agent_id.in_(agent_ids)).subquery()
+    history = aliased(AgentHistory, ranked)
+
+    rows = db.query(history).filter(ranked.c.position <= limit).order_by(ranked.c.agent_id, ranked.c.position).all()
+    latest = defaultdict(list)
+    for row in rows:
+        latest[row.agent_id].append(row)
+    return latest
+
+
+def rebalance_counts(db, agent_ids: Iterable[int]) -> Dict[int, int]:
+    """Agent id -> number of history rows that recorded a rebalance, in one query; agents without any are left out."""
+    agent_ids = list(set(agent_ids))
+    if not agent_ids:
+        return {}
+    rows = (
+        db.query(AgentHistory.agent_id, func.count(AgentHistory.id))
+          .filter(AgentHistory.agent_id.in_(agent_ids), AgentHistory.last_rebalanced_at.isnot(None))
+          .group_by(AgentHistory.agent_id)
+          .all()
+    )
+    return dict(rows)
+
+
+def encode_cursor(history: AgentHistory) -> str:
+    return base64.urlsafe_b64encode(f"{history.created_at.isoformat()}|{history.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(created_at, id) of the last row of the previous page; raises ValueError for a malformed cursor."""
+    try:
+        created_at, history_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(history_id)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from e
+
+
+def history_page(db, agent_id: int, cursor: Optional[str] = None, limit: int = HISTORY_LIMIT) -> Tuple[List[AgentHistory], Optional[str]]:
+    """
+    One page of an agent's history, newest first, and the cursor of the next page.
+
+    The next cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = db.query(AgentHistory).filter(AgentHistory.agent_id == agent_id)
+    if cursor:
+        created_at, history_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            AgentHistory.created_at < created_at,
+            and_(AgentHistory.created_at == created_at, AgentHistory.id < history_id)
+        ))
+    rows = query.order_by(*_NEWEST_FIRST).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
@@ -0,0 +1,66 @@
+"""
+Keyset pages of a user's chat history with one agent.
+
+Pages are keyed on (created_at, id) and read through the
+(user_id, agent_id, created_at, id) index in either direction, so any page
+costs the same however long the history is. Cursors have the same format as
+agent history cursors.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import defer
+
+from src.aizen.models import UserChat
+from .agent_history import decode_cursor, encode_cursor
+
+CHAT_PAGE_SIZE = 20
+MAX_CHAT_PAGE_SIZE = 100
+
+
+def chat_entry(chat: UserChat, include_response: bool = True) -> Dict[str, Any]:
+    entry = {"user_query": chat.user_query, "created_at": chat.created_at}
+    if include_response:
+        entry["response"] = chat.response
+    return entry
+
+
+def chat_page(db, user_id: int, agent_id: int, before: Optional[str] = None, after: Optional[str] = None,
+              limit: int = CHAT_PAGE_SIZE, include_response: bool = True) -> Tuple[List[UserChat], Optional[str], Optional[str]]:
+    """
+    One page of chats, newest first, with its (before_cursor, after_cursor).
+
+    Without a cursor the page holds the newest chats. `before` pages towards
+    older chats and `after` towards newer ones. before_cursor is None when
+    there is nothing older. after_cursor names the newest chat shown, so
+    polling with it returns chats written since. Raises ValueError for a
+    malformed cursor or when both cursors are given.
+    """
+    if before and after:
+        raise ValueError("Pass either before or after, not both")
+    limit = max(1, min(limit, MAX_CHAT_PAGE_SIZE))
+
+    query = db.query(UserChat).filter(UserChat.user_id == user_id, UserChat.agent_id == agent_id)
+    if not include_response:
+        query = query.options(defer(UserChat.response))
+
+    if after:
+        created_at, chat_id = decode_cursor(after)
+        rows = query.filter(or_(
+            UserChat.created_at > created_at,
+            and_(UserChat.created_at == created_at, UserChat.id > chat_id)
+        )).order_by(UserChat.created_at.asc(), UserChat.id.asc()).limit(limit).all()
+        rows.reverse()
+        # The cursor's own chat is older than this page, so an older page always exists
+        return rows, encode_cursor(rows[-1]) if rows else after, encode_cursor(rows[0]) if rows else after
+
+    if before:
+        created_at, chat_id = decode_cursor(before)
+        query = query.filter(or_(
+            UserChat.created_at < created_at,
+            and_(UserChat.created_at == created_at, UserChat.id < chat_id)
+        ))
+    rows = query.order_by(UserChat.created_at.desc(), UserChat.id.desc()).limit(limit + 1).all()
+    before_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    return rows, before_cursor, encode_cursor(rows[0]) if rows else None
@@ -0,0 +1,149 @@
+"""
+Clone jobs: /clone_agent broadcasts the clone fee and returns a job; CloneWorker
+confirms the transfer and creates the agent.
+
+Every step is a conditional update on the job's status, so a job is
+completed or failed exactly once even with several API processes polling it.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from src.aizen.formatting import format_amount_eth, format_image
+from src.aizen.models import Agent, CloneJob, User, UserDailyCloneFee
+from .images import agent_image_hash
+
+FINISHED = ("completed", "failed")
+
+
+def clone_name_taken(db, name: str) -> bool:
+    """True if an agent has `name` or an open clone job has reserved it."""
+    return (
+        db.query(Agent.id).filter(Agent.name == name).first() is not None
+        or db.query(CloneJob.id).filter(CloneJob.name == name, CloneJob.status.in_(("pending", "broadcast"))).first() is not None
+    )
+
+
+def create_clone_job(db, user_id: int, agent: Agent, name: str) -> CloneJob:
+    """Write the job, reserving `name`; raises ValueError if the name is taken."""
+    if clone_name_taken(db, name):
+        raise ValueError(f"Agent with name '{name}' already exists")
+    job = CloneJob(user_id=user_id, agent_id=agent.id, receiver_id=agent.user_id, name=name,
+                   fee_amount=agent.clone_fee or Decimal("0"), status="pending")
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request reserved the name between the check and the insert
+        db.rollback()
+        raise ValueError(f"Agent with name '{name}' already exists")
+    return job
+
+
+def _transition(db, job_id: str, statuses: Tuple[str, ...], **values) -> bool:
+    """Apply `values` if the job is still in one of `statuses`; False when another process got there first."""
+    updated = db.query(CloneJob).filter(CloneJob.id == job_id, CloneJob.status.in_(statuses)).update(
+        dict(values, updated_at=datetime.utcnow()), synchronize_session=False
+    )
+    return updated == 1
+
+
+def broadcast_clone_job(db, job_id: str, tx_hash: str, sender: str = None, nonce: int = None, raw_tx: str = None) -> bool:
+    """Record the signed transfer; done before it is sent, so a send that times out still leaves the job to the worker."""
+    updated = _transition(db, job_id, ("pending",), status="broadcast", tx_hash=tx_hash, sender=sender, nonce=nonce, raw_tx=raw_tx)
+    db.commit()
+    return updated
+
+
+def fail_clone_job(db, job_id: str, error: str) -> bool:
+    updated = _transition(db, job_id, ("pending", "broadcast"), status="failed", error=error)
+    db.commit()
+    return updated
+
+
+def complete_clone_job(db, job_id: str) -> Optional[CloneJob]:
+    """Record the fee and create the cloned agent in one transaction; None if the job was already finished."""
+    if not _transition(db, job_id, ("broadcast",), status="completed"):
+        db.rollback()
+        return None
+
+    job = db.get(CloneJob, job_id)
+    # The fee is paid, so the clone is made even if the original was deleted meanwhile
+    agent = db.get(Agent, job.agent_id)
+
+    db.add(UserDailyCloneFee(agent_id=agent.id, user_id=job.receiver_id, sent_by_user_id=job.user_id, fee_amount=job.fee_amount))
+    new_agent = Agent(
+        name=job.name,
+        description=agent.description,
+        category=agent.category,
+        image_hash=agent_image_hash(db, agent),   # Shares the original's blobs
+        thumbnail_hash=agent.thumbnail_hash,
+        user_id=job.user_id,
+        cloned_by=agent.id,
+        is_deployed=False,
+        is_active=True,
+        is_trending=False,
+        performance=agent.performance,
+        config=agent.config,
+        tags=agent.tags,
+        subscription_fee=agent.subscription_fee,
+        clone_fee=agent.clone_fee
+    )
+    db.add(new_agent)
+    db.flush()
+    job.new_agent_id = new_agent.id
+    db.commit()
+    return job
+
+
+def open_clone_jobs(db) -> List[CloneJob]:
+    """Jobs not yet completed or failed, oldest first."""
+    return db.query(CloneJob).filter(CloneJob.status.in_(("pending", "broadcast"))).order_by(CloneJob.created_at).all()
+
+
+def clone_job_wallets(db, job: CloneJob) -> List[str]:
+    return [wallet for (wallet,) in db.query(User.wallet_address).filter(User.id.in_((job.user_id, job.receiver_id))) if wallet]
+
+
+def clone_card(agent: Agent) -> Dict[str, Any]:
+    return {
+        "id": agent.id,
+        "agentName": agent.name,
+        "description": agent.description,
+        "image": format_image(agent.image_hash),
+        "performance": agent.performance or "N/A",
+        "aum": f"${float(agent.aum) / 1_000:.1f}K" if agent.aum and agent.aum.replace(".", "", 1).isdigit() else 0,
+        "il": f"{agent.il}%" if agent.il is not None else "N/A",
+        "weeklyReward": f"{agent.weekly_reward}%" if agent.weekly_reward else "N/A",
+        "tags": agent.tags if agent.tags else [],
+        "created_date": agent.created_date.strftime("%Y-%m-%d") if agent.created_date else "N/A",
+        "duration": "N/A",  # Placeholder
+        "subscription_fee": agent.subscription_fee,
+        "clone_fee": format_amount_eth(str(agent.clone_fee)),
+        "cloned_by": agent.cloned_by,
+        "is_deployed": agent.is_deployed,
+        "is_active": agent.is_active,
+        "is_trending": agent.is_trending,
+        "user_id": agent.user_id,
+        "config": agent.config
+    }
+
+
+def clone_job_status(db, job_id: str) -> Optional[Dict[str, Any]]:
+    """The job's progress, with the new agent once it is completed; None for an unknown job."""
+    job = db.get(CloneJob, job_id)
+    if job is None:
+        return None
+    agent = db.get(Agent, job.new_agent_id) if job.new_agent_id else None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "agent_id": job.agent_id,
+        "tx_hash": job.tx_hash,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "agent": clone_card(agent) if agent else None
+    }
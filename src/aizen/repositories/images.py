@@ -0,0 +1,42 @@
+"""
+Content-addressed image storage.
+
+Images live once in image_blobs under the SHA-256 of their bytes, and agents
+point at them through image_hash. Identical uploads and cloned agents share one
+blob. Since a hash always names the same bytes, /images/{hash} can be cached
+forever and revalidated without reading the blob.
+"""
+import hashlib
+import re
+from typing import Optional
+
+from src.aizen.models import Agent, ImageBlob
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def image_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def store_image(db, data: bytes, content_type: str) -> str:
+    """Add the image to the caller's transaction unless its blob exists; returns its hash."""
+    digest = image_hash(data)
+    if db.get(ImageBlob, digest) is None:
+        db.add(ImageBlob(hash=digest, content_type=content_type, data=data, size=len(data)))
+        db.flush()    # Sessions don't autoflush; make the blob visible to the next lookup
+    return digest
+
+
+def get_image(db, digest: str) -> Optional[ImageBlob]:
+    if not HASH_PATTERN.match(digest):
+        return None
+    return db.get(ImageBlob, digest)
+
+
+def agent_image_hash(db, agent: Agent) -> Optional[str]:
+    """The agent's image hash, first moving an inline image from before image_blobs into a blob."""
+    if agent.image_hash is None and agent.image:
+        agent.image_hash = store_image(db, agent.image, agent.image_content or "application/octet-stream")
+        agent.image = None
+    return agent.image_hash
@@ -0,0 +1,198 @@
+"""
+The /agent_marketplace read model.
+
+marketplace_agents holds one ready-to-serve row per deployed, active agent.
+Each row carries the agent's AUM, summed over its active commissions, and its
+already formatted image. The endpoints that change an agent or a commission
+call `refresh_marketplace` for the agents they touched. The scoring and fee
+jobs rebuild every row. Reads are one page query plus one aggregate over the
+table, and the rendered pages sit in `marketplace_cache` for MARKETPLACE_CACHE_TTL
+seconds. A refresh clears the cache in its own process; other workers see the
+change once their entries expire.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.aizen.cache import TTLCache
+from src.aizen.formatting import format_amount_eth, format_thumbnail, parse_percent
+from src.aizen.models import Agent, MarketplaceAgent, UserCommission
+
+logger = logging.getLogger(__name__)
+
+MARKETPLACE_CACHE_TTL = float(os.getenv("MARKETPLACE_CACHE_TTL", "30"))
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SORT_COLUMNS = {
+    "created_date": MarketplaceAgent.created_date,
+    "performance": MarketplaceAgent.performance_value,
+    "aum": MarketplaceAgent.aum_eth,
+    "weekly_reward": MarketplaceAgent.weekly_reward_value,
+    "name": MarketplaceAgent.name
+}
+
+marketplace_cache = TTLCache(ttl=MARKETPLACE_CACHE_TTL, max_entries=512)
+
+
+def refresh_marketplace(db, agent_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the rows of `agent_ids` (default: every agent) from agents and user_commissions, and commit.
+
+    Rows are upserted on agent_id, so readers never see an agent missing while it
+    is refreshed. Agents that are no longer deployed and active lose their row.
+    Returns the number of rows written.
+    """
+    eligible = db.query(Agent.id).filter(Agent.is_deployed == True, Agent.is_active == True)
+    agents = db.query(Agent).filter(Agent.is_deployed == True, Agent.is_active == True)
+    stale = db.query(MarketplaceAgent).filter(MarketplaceAgent.agent_id.notin_(eligible.scalar_subquery()))
+    aum = (
+        db.query(UserCommission.agent_id, func.sum(UserCommission.amount_eth))
+          .filter(UserCommission.is_commissioned == True, UserCommission.is_active == True)
+    )
+    if agent_ids is not None:
+        agent_ids = list(set(agent_ids))
+        agents = agents.filter(Agent.id.in_(agent_ids))
+        stale = stale.filter(MarketplaceAgent.agent_id.in_(agent_ids))
+        aum = aum.filter(UserCommission.agent_id.in_(agent_ids))
+    aum = dict(aum.group_by(UserCommission.agent_id).all())
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "agent_id": agent.id,
+            "name": agent.name,
+            "description": agent.description,
+            "category": agent.category,
+            "image": format_thumbnail(agent),
+            "performance": agent.performance,
+            "performance_value": parse_percent(agent.performance),
+            "il": agent.il,
+            "weekly_reward": agent.weekly_reward,
+            "weekly_reward_value": parse_percent(agent.weekly_reward),
+            "aum_eth": aum.get(agent.id) or 0,
+            "tags": agent.tags,
+            "is_trending": agent.is_trending,
+            "created_date": agent.created_date,
+            "subscription_fee": agent.subscription_fee,
+            "clone_fee": agent.clone_fee,
+            "cloned_by": agent.cloned_by,
+            "refreshed_at": now
+        }
+        for agent in agents.all()
+    ]
+    stale.delete(synchronize_session=False)
+    if rows:
+        insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(MarketplaceAgent)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["agent_id"],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != "agent_id"}
+        )
+        db.execute(stmt, rows)
+    db.commit()
+    marketplace_cache.clear()
+    logger.info(f"Refreshed {len(rows)} marketplace agents")
+    return len(rows)
+
+
+def marketplace_card(row: MarketplaceAgent) -> dict:
+    return {
+        "id": row.agent_id,
+        "name": row.name,
+        "description": row.description,
+        "image": row.image,
+        "performance": row.performance or "N/A",
+        "aum": format_amount_eth(str(row.aum_eth)) if row.aum_eth else 0,
+        "il": f"{row.il}%" if row.il is not None else "N/A",
+        "weeklyReward": f"{row.weekly_reward}%" if row.weekly_reward else "N/A",
+        "tags": row.tags if row.tags else [],
+        "is_deployed": True,
+        "is_active": True,
+        "is_trending": row.is_trending,
+        "created_date": row.created_date.strftime("%Y-%m-%d") if row.created_date else "N/A",
+        "subscription_fee": row.subscription_fee,
+        "clone_fee": format_amount_eth(str(row.clone_fee)),
+        "cloned_by": row.cloned_by,
+    }
+
+
+def marketplace_stats(db) -> dict:
+    total_agents, total_aum, avg_performance = db.query(
+        func.count(MarketplaceAgent.agent_id),
+        func.sum(MarketplaceAgent.aum_eth),
+        func.avg(MarketplaceAgent.performance_value)
+    ).one()
+    return {
+        "totalAgents": total_agents,
+        "deployedAgents": total_agents,
+        "totalAUM": format_amount_eth(str(total_aum or 0)),
+        "avgPerformance": f"{avg_performance or 0:+.1f}%" if total_agents else "N/A",
+    }
+
+
+def marketplace_page(db, page: int = 1, page_size: int = PAGE_SIZE, sort: str = "created_date", order: str = "desc",
+                     category: Optional[str] = None, trending: Optional[bool] = None, tag: Optional[str] = None,
+                     search: Optional[str] = None) -> Tuple[List[MarketplaceAgent], int]:
+    """One page of marketplace rows and the number of rows matching the filters; raises ValueError for an unknown sort."""
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort '{sort}'; use one of {', '.join(SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+
+    query = db.query(MarketplaceAgent)
+    if category:
+        query = query.filter(MarketplaceAgent.category == category)
+    if trending is not None:
+        query = query.filter(MarketplaceAgent.is_trending == trending)
+    if tag:
+        query = query.filter(MarketplaceAgent.tags.any(tag))
+    if search:
+        query = query.filter(MarketplaceAgent.name.ilike(f"%{search}%"))
+
+    column = SORT_COLUMNS[sort]
+    ordering = column.asc() if order == "asc" else column.desc()
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    rows = (
+        query.order_by(ordering.nulls_last(), MarketplaceAgent.agent_id.desc())
+             .offset((page - 1) * page_size)
+             .limit(page_size)
+             .all()
+    )
+    return rows, query.count()
+
+
+def marketplace_response(db, page: int = 1, page_size: int = PAGE_SIZE, **params) -> Tuple[str, dict]:
+    """
+    (etag, body) of a marketplace page, from `marketplace_cache` when fresh.
+
+    An empty table is built on the spot, e.g. on the first read after a deploy.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    key = (page, page_size) + tuple(sorted(params.items()))
+    cached = marketplace_cache.get(key)
+    if cached is not None:
+        return cached
+
+    stats = marketplace_stats(db)
+    if not stats["totalAgents"] and refresh_marketplace(db):
+        stats = marketplace_stats(db)
+
+    rows, total = marketplace_page(db, page, page_size, **params)
+    body = {
+        "status": "success",
+        "response": {
+            "stats": stats,
+            "agents": [marketplace_card(row) for row in rows],
+            "pagination": {"page": page, "page_size": page_size, "total": total}
+        }
+    }
+    etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()[:32] + '"'
+    marketplace_cache.set(key, (etag, body))
+    return etag, body
@@ -1,7 +1,7 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from src.aizen.jobs import fetch_and_store_crypto_data, liquidity_pool_rebalancing, process_marketplace_fees
+from src.aizen.jobs import fetch_and_store_crypto_data, liquidity_pool_rebalancing, process_marketplace_fees, maintain_crypto_prices, score_agents
 import time
 import logging
 
@@ -11,6 +11,18 @@ def start_scheduler():
     logging.info("Scheduler starting...")
     scheduler = BackgroundScheduler()
     scheduler.add_job(fetch_and_store_crypto_data, IntervalTrigger(minutes=5))
+    scheduler.add_job(
+        maintain_crypto_prices,
+        CronTrigger(hour=0, minute=15),
+        id="crypto_price_partitions",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        score_agents,
+        CronTrigger(hour=1, minute=0),
+        id="score_agents",
+        replace_existing=True
+    )
     # scheduler.add_job(liquidity_pool_rebalancing, IntervalTrigger(minutes=5))
     # scheduler.add_job(
     #     process_marketplace_fees, 
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+from datetime import date
+
+class OptimizeConfigRequest(BaseModel):
+    config: Optional[Dict[str, Any]] = Field(None, description="Agent config to search around; defaults to DEFAULT_CONFIG")
+    start_date: date = Field(..., description="First day of candles; the range is limited to OPTIMIZE_MAX_DAYS (default 90)")
+    end_date: Optional[date] = None
+    interval: Literal["1m", "5m", "1h"] = "5m"
+    method: Literal["grid", "random"] = "random"
+    budget: int = Field(1000, ge=10, le=5000, description="Candidates scored by the random search, and the most the grid search may score")
+    steps: int = Field(5, ge=2, le=8, description="Values per continuous field for the grid search")
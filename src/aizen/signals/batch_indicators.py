@@ -0,0 +1,52 @@
+import numpy as np
+from src.aizen.signals import kernels
+
+PANEL_LEVELS = ["ticker", "interval", "date"]
+
+# Timeframe label -> pandas resample rule
+TIMEFRAMES = {
+    "1m": "1min",
+    "5m": "5min",
+    "1h": "1h",
+    "1d": "1D"
+}
+
+
+class BatchIndicators:
+    """
+    TechnicalIndicators over a panel of many tickers and timeframes in one pass.
+
+    The panel is indexed by (ticker, interval, date) with the same price, High,
+    Low and Volume columns as TechnicalIndicators. Rows are grouped once; every
+    indicator then runs over the flat arrays with windows restarting at each
+    (ticker, interval) series, so adding a series adds rows, not iterations.
+    """
+
+    def __init__(self, panel, precise=False):
+        # Level codes are enough to make each series contiguous and date ordered,
+        # and much cheaper than comparing the index tuples
+        tickers, intervals = (np.asarray(codes, dtype=np.int64) for codes in panel.index.codes[:2])
+        dates = panel.index.get_level_values("date").values
+        order = np.lexsort((dates, intervals, tickers))
+        sorted_already = bool((order[1:] > order[:-1]).all())
+
+        self.df = (panel if sorted_already else panel.iloc[order]).copy()
+        self.precise = precise
+        series = tickers * len(panel.index.levels[1]) + intervals
+        self.layout = kernels.SeriesLayout(len(self.df), series if sorted_already else series[order])
+
+    def _column(self, name):
+        return self.df[name].to_numpy(dtype=np.float64)
+
+    def calculate_technical_indicators(self):
+        price, high, low, volume = (self._column(c) for c in ("price", "High", "Low", "Volume"))
+        layout, precise = self.layout, self.precise
+
+        self.df["RSI"] = kernels.rsi(price, precise=precise, layout=layout)
+        self.df["BB_upper"], self.df["BB_middle"], self.df["BB_lower"] = kernels.bollinger_bands(price, precise=precise, layout=layout)
+        self.df["Volatility"] = kernels.volatility(price, precise=precise, layout=layout)
+        self.df["MACD"], self.df["MACD_signal"], self.df["MACD_histogram"] = kernels.macd(price, layout=layout)
+        self.df["ATR"] = kernels.atr(high, low, price, precise=precise, layout=layout)
+        self.df["Price_Range"] = kernels.price_range(high, low)
+        self.df["VWAP"] = kernels.vwap(high, low, price, volume, precise=precise, layout=layout)
+        return self.df
@@ -0,0 +1,199 @@
+"""
+Array kernels behind TechnicalIndicators and BatchIndicators.
+
+Every kernel takes 1-D arrays and returns float64 arrays of the same length,
+with the same values (and NaN/fill behaviour) as the original pandas/Decimal
+implementation. With `precise=True` sums are carried in np.longdouble; VWAP
+then stays within 1e-15 relative of the Decimal results (float64: 1e-12).
+
+Passing a `layout` computes many series stored back to back in one pass:
+windows, diffs, EMAs and cumulative sums restart at every series boundary.
+"""
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1 << 16    # Windows reduced per step, bounds the temporary to CHUNK_ROWS x periods
+
+
+class SeriesLayout:
+    """Where each series starts in a flat array; `groups` holds one sortable key per row, contiguous per series."""
+
+    def __init__(self, n, groups=None):
+        index = np.arange(n)
+        if groups is None or n == 0:
+            self.starts = index == 0
+        else:
+            groups = np.asarray(groups)
+            self.starts = np.r_[True, groups[1:] != groups[:-1]]
+        self.ids = np.cumsum(self.starts) - 1                      # Dense series id per row
+        self.start_index = np.flatnonzero(self.starts)[self.ids]   # First row of the row's series
+        self.position = index - self.start_index                   # Row number within its series
+        self.count = int(self.starts.sum())
+
+
+def _dtype(precise):
+    return np.longdouble if precise else np.float64
+
+
+def _layout(n, layout):
+    return layout if layout is not None else SeriesLayout(n)
+
+
+def _rolling(values, periods, reduce, layout, min_periods=None):
+    """
+    Apply `reduce(windows) -> 1-D` over trailing windows within each series.
+
+    Rows with fewer than min_periods values in their series are NaN; rows with
+    at least min_periods but fewer than `periods` reduce a shorter window.
+    """
+    min_periods = periods if min_periods is None else min_periods
+    n = len(values)
+    out = np.full(n, np.nan, dtype=values.dtype)
+
+    if n >= periods:
+        windows = sliding_window_view(values, periods)
+        for start in range(0, len(windows), CHUNK_ROWS):
+            chunk = windows[start:start + CHUNK_ROWS]
+            out[periods - 1 + start:periods - 1 + start + len(chunk)] = reduce(chunk)
+        # Windows reaching back into the previous series
+        out[layout.position < periods - 1] = np.nan
+
+    # Short windows at the head of each series, one vectorized step per length
+    for k in range(min_periods - 1, periods - 1):
+        rows = np.flatnonzero(layout.position == k)
+        if len(rows):
+            out[rows] = reduce(sliding_window_view(values, k + 1)[rows - k])
+    return out
+
+
+def _mean(windows):
+    return windows.mean(axis=1)
+
+
+def _sum(windows):
+    return windows.sum(axis=1)
+
+
+def _std(windows):
+    return windows.std(axis=1, ddof=1)
+
+
+def _cumsum(values, layout):
+    """Cumulative sum restarting at every series."""
+    if layout.count == 1:
+        return np.cumsum(values)
+    if values.dtype == np.float64:
+        return pd.Series(values).groupby(layout.ids).cumsum().to_numpy()
+    # pandas has no long double groupby. Subtracting a flat cumsum's offset would
+    # cancel against the totals of every earlier series, so sum each one on its own
+    out = np.empty_like(values)
+    bounds = np.r_[np.flatnonzero(layout.starts), len(values)]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        np.cumsum(values[start:stop], out=out[start:stop])
+    return out
+
+
+def rsi(close, periods=14, precise=False, layout=None):
+    close = np.asarray(close, dtype=_dtype(precise))
+    layout = _layout(len(close), layout)
+    delta = np.zeros_like(close)
+    delta[1:] = np.diff(close)
+    delta[layout.starts] = 0
+    gain = np.where(delta > 0, delta, 0)
+    loss = np.where(delta < 0, -delta, 0)
+
+    avg_gain = _rolling(gain, periods, _mean, layout, min_periods=1)
+    avg_loss = _rolling(loss, periods, _mean, layout, min_periods=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return (100 - (100 / (1 + rs))).astype(np.float64)
+
+
+def bollinger_bands(close, periods=20, precise=False, layout=None):
+    """Return (upper, middle, lower); rows before the first full window take the price."""
+    close = np.asarray(close, dtype=_dtype(precise))
+    layout = _layout(len(close), layout)
+    sma = _rolling(close, periods, _mean, layout)
+    std = _rolling(close, periods, _std, layout)
+
+    upper, middle, lower = sma + std * 2, sma, sma - std * 2
+    missing = np.isnan(sma)
+    for band in (upper, middle, lower):
+        band[missing] = close[missing]
+    return upper.astype(np.float64), middle.astype(np.float64), lower.astype(np.float64)
+
+
+def volatility(close, periods=20, precise=False, layout=None):
+    close = np.asarray(close, dtype=_dtype(precise))
+    std = _rolling(close, periods, _std, _layout(len(close), layout))
+    return np.nan_to_num(std, nan=0.0).astype(np.float64)
+
+
+def ema(values, span, layout=None):
+    """
+    EMA with adjust=False; the recursion is sequential, so it runs in pandas' compiled ewm.
+
+    Many series are run as one flat EMA. Past a series start the flat result
+    differs from the restarted one by a gap that decays by (1 - alpha) per row,
+    so subtracting that gap gives every series its own EMA.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    flat = pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    if layout is None or layout.count == 1:
+        return flat
+
+    decay = 1 - 2 / (span + 1)
+    gap = (flat - values)[layout.start_index]
+    return flat - gap * decay ** layout.position
+
+
+def macd(close, fast=12, slow=26, signal=9, layout=None):
+    """Return (macd, signal, histogram)."""
+    line = ema(close, fast, layout) - ema(close, slow, layout)
+    signal_line = ema(line, signal, layout)
+    return line, signal_line, line - signal_line
+
+
+def atr(high, low, close, periods=14, precise=False, layout=None):
+    """Rolling mean true range; rows before the first full window take their series' mean High-Low range."""
+    dtype = _dtype(precise)
+    high, low, close = (np.asarray(a, dtype=dtype) for a in (high, low, close))
+    layout = _layout(len(close), layout)
+    high_low = high - low
+    tr = high_low.copy()
+    if len(close) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum.reduce([high_low[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)])
+        tr[layout.starts] = high_low[layout.starts]
+
+    out = _rolling(tr, periods, _mean, layout)
+    missing = np.isnan(out)
+    if missing.any():
+        sums = np.zeros(layout.count, dtype=dtype)
+        np.add.at(sums, layout.ids, high_low)
+        mean_range = sums / np.bincount(layout.ids, minlength=layout.count)
+        out[missing] = mean_range[layout.ids[missing]]
+    return out.astype(np.float64)
+
+
+def price_range(high, low):
+    return np.asarray(high, dtype=np.float64) - np.asarray(low, dtype=np.float64)
+
+
+def vwap(high, low, close, volume, periods=26, precise=False, layout=None):
+    """VWAP over the last `periods` candles (fewer at the head of a series); periods=None accumulates the whole series."""
+    dtype = _dtype(precise)
+    high, low, close, volume = (np.asarray(a, dtype=dtype) for a in (high, low, close, volume))
+    layout = _layout(len(close), layout)
+    typical_price = (high + low + close) / 3
+
+    if periods is None:
+        vp = _cumsum(typical_price * volume, layout)
+        total_volume = _cumsum(volume, layout)
+    else:
+        vp = _rolling(typical_price * volume, periods, _sum, layout, min_periods=1)
+        total_volume = _rolling(volume, periods, _sum, layout, min_periods=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(total_volume > 0, vp / total_volume, np.nan)
+    return out.astype(np.float64)
@@ -0,0 +1,296 @@
+from collections import deque
+from decimal import Decimal
+import math
+
+import numpy as np
+
+from src.aizen.signals import kernels
+
+RESYNC_EVERY = 1024     # Pushes between exact recomputations of a window's running sums
+STATE_VERSION = 2       # Bumped when to_state changes shape; older states are replayed from the table
+
+
+class RollingWindow:
+    """
+    Fixed-size window with a running sum and sum of squares.
+
+    Sums are kept around a shift (a recent mean) to avoid cancellation in the
+    variance, and recomputed exactly every RESYNC_EVERY pushes so rounding
+    errors cannot accumulate. A window holding one repeated value reports that
+    value exactly, as pandas does.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.shift = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.same_run = 0
+        self.pushes = 0
+
+    def push(self, x: float):
+        if not self.pushes:
+            self.shift = x
+        if self.values and x == self.values[-1]:
+            self.same_run += 1
+        else:
+            self.same_run = 1
+
+        if len(self.values) == self.size:
+            old = self.values[0] - self.shift
+            self.sum -= old
+            self.sumsq -= old * old
+        self.values.append(x)
+
+        self.pushes += 1
+        if self.pushes % RESYNC_EVERY == 0:
+            self._resync()
+        else:
+            d = x - self.shift
+            self.sum += d
+            self.sumsq += d * d
+
+    def _resync(self):
+        n = len(self.values)
+        self.shift = math.fsum(self.values) / n
+        self.sum = math.fsum(x - self.shift for x in self.values)
+        self.sumsq = math.fsum((x - self.shift) ** 2 for x in self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    @property
+    def constant(self) -> bool:
+        return self.same_run >= len(self.values)
+
+    def mean(self) -> float:
+        if self.constant:
+            return self.values[-1]
+        return self.shift + self.sum / len(self.values)
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1)."""
+        n = len(self.values)
+        if n < 2:
+            return math.nan
+        if self.constant:
+            return 0.0
+        var = (self.sumsq - self.sum * self.sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_state(self) -> dict:
+        return {
+            "values": list(self.values),
+            "shift": self.shift,
+            "sum": self.sum,
+            "sumsq": self.sumsq,
+            "same_run": self.same_run,
+            "pushes": self.pushes
+        }
+
+    @classmethod
+    def from_state(cls, size: int, state: dict) -> "RollingWindow":
+        window = cls(size)
+        window.values.extend(state["values"])
+        window.shift = state["shift"]
+        window.sum = state["sum"]
+        window.sumsq = state["sumsq"]
+        window.same_run = state["same_run"]
+        window.pushes = state["pushes"]
+        return window
+
+
+class StreamingIndicators:
+    """
+    Constant-time per-candle version of TechnicalIndicators.
+
+    `update` takes one candle and returns the same values as the last row of
+    TechnicalIndicators(df).calculate_technical_indicators() over every candle
+    seen so far, keyed by the same column names. The running state round-trips
+    through `to_state`/`from_state` as plain JSON.
+
+    VWAP covers the last `vwap_periods` candles, the 26 rows the job used to
+    load per candle. The MACD EMAs are not windowed: they run from the first
+    candle folded in, where the job restarted them 26 rows back each time, so
+    MACD and its signal now follow the textbook values over the full history
+    rather than a 26-candle approximation of them.
+    """
+
+    def __init__(self, rsi_periods=14, bb_periods=20, fast=12, slow=26, signal=9, atr_periods=14, vwap_periods=26):
+        self.rsi_periods = rsi_periods
+        self.bb_periods = bb_periods
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.atr_periods = atr_periods
+        self.vwap_periods = vwap_periods
+
+        self.count = 0
+        self.prev_close = None
+        self.gains = RollingWindow(rsi_periods)
+        self.losses = RollingWindow(rsi_periods)
+        self.prices = RollingWindow(bb_periods)           # Bollinger Bands and Volatility
+        self.true_ranges = RollingWindow(atr_periods)
+        self.range_sum = 0.0                              # ATR fill value before the window is full
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_signal = None
+        self.vp = deque(maxlen=vwap_periods)
+        self.volumes = deque(maxlen=vwap_periods)
+
+    def update(self, high: float, low: float, close: float, volume: float) -> dict:
+        high, low, close = float(high), float(low), float(close)
+        price_range = high - low
+
+        # RSI: simple rolling mean of gains/losses, first delta counts as zero
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        avg_gain = self.gains.mean()
+        avg_loss = self.losses.mean()
+        if avg_loss == 0:
+            rsi = 100.0 if avg_gain > 0 else math.nan
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        # Bollinger Bands and Volatility
+        self.prices.push(close)
+        if self.prices.full:
+            sma = self.prices.mean()
+            std = self.prices.std()
+            bb_upper, bb_middle, bb_lower = sma + std * 2, sma, sma - std * 2
+            volatility = std
+        else:
+            bb_upper = bb_middle = bb_lower = close
+            volatility = 0.0
+
+        # MACD
+        self.ema_fast = self._ema(self.ema_fast, close, self.fast)
+        self.ema_slow = self._ema(self.ema_slow, close, self.slow)
+        macd = self.ema_fast - self.ema_slow
+        self.ema_signal = self._ema(self.ema_signal, macd, self.signal)
+
+        # ATR
+        if self.prev_close is None:
+            true_range = price_range
+        else:
+            true_range = max(price_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.true_ranges.push(true_range)
+        self.range_sum += price_range
+        self.count += 1
+        atr = self.true_ranges.mean() if self.true_ranges.full else self.range_sum / self.count
+
+        # VWAP, the window summed afresh in Decimal each candle so nothing drifts
+        typical_price = (Decimal(high) + Decimal(low) + Decimal(close)) / Decimal(3)
+        self.vp.append(typical_price * Decimal(volume))
+        self.volumes.append(Decimal(volume))
+        total_volume = sum(self.volumes)
+        vwap = sum(self.vp) / total_volume if total_volume > 0 else Decimal("NaN")
+
+        self.prev_close = close
+
+        return {
+            "RSI": rsi,
+            "BB_upper": bb_upper,
+            "BB_middle": bb_middle,
+            "BB_lower": bb_lower,
+            "Volatility": volatility,
+            "MACD": macd,
+            "MACD_signal": self.ema_signal,
+            "MACD_histogram": macd - self.ema_signal,
+            "ATR": atr,
+            "Price_Range": price_range,
+            "VWAP": float(vwap)
+        }
+
+    @staticmethod
+    def _ema(previous, value, span):
+        if previous is None:
+            return value
+        alpha = 2 / (span + 1)
+        return alpha * value + (1 - alpha) * previous
+
+    def to_state(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "params": [self.rsi_periods, self.bb_periods, self.fast, self.slow, self.signal, self.atr_periods, self.vwap_periods],
+            "count": self.count,
+            "prev_close": self.prev_close,
+            "gains": self.gains.to_state(),
+            "losses": self.losses.to_state(),
+            "prices": self.prices.to_state(),
+            "true_ranges": self.true_ranges.to_state(),
+            "range_sum": self.range_sum,
+            "ema_fast": self.ema_fast,
+            "ema_slow": self.ema_slow,
+            "ema_signal": self.ema_signal,
+            "vp": [str(value) for value in self.vp],
+            "volumes": [str(value) for value in self.volumes]
+        }
+
+    @classmethod
+    def from_history(cls, high, low, close, volume, **params) -> "StreamingIndicators":
+        """
+        The state `update` would reach after every candle of these arrays.
+
+        Built from array reductions and the last window of candles instead of one
+        update per candle. Later results match the updated state's to rounding
+        (~1e-12 relative); the VWAP window is the same.
+        """
+        indicators = cls(**params)
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        n = len(close)
+        if n == 0:
+            return indicators
+
+        delta = np.diff(close, prepend=close[0])
+        prev_close = np.r_[close[0], close[:-1]]
+        price_range = high - low
+        true_range = np.maximum.reduce([price_range, np.abs(high - prev_close), np.abs(low - prev_close)])
+        true_range[0] = price_range[0]
+
+        for value in delta[-indicators.rsi_periods:]:
+            indicators.gains.push(value if value > 0 else 0.0)
+            indicators.losses.push(-value if value < 0 else 0.0)
+        for value in close[-indicators.bb_periods:]:
+            indicators.prices.push(float(value))
+        for value in true_range[-indicators.atr_periods:]:
+            indicators.true_ranges.push(float(value))
+
+        indicators.count = n
+        indicators.prev_close = float(close[-1])
+        indicators.range_sum = sum(price_range.tolist())      # Sequential, in update's order
+        fast = kernels.ema(close, indicators.fast)
+        slow = kernels.ema(close, indicators.slow)
+        indicators.ema_fast, indicators.ema_slow = float(fast[-1]), float(slow[-1])
+        indicators.ema_signal = float(kernels.ema(fast - slow, indicators.signal)[-1])
+
+        three = Decimal(3)
+        tail = slice(-indicators.vwap_periods, None)
+        for h, l, c, v in zip(high[tail].tolist(), low[tail].tolist(), close[tail].tolist(), list(volume)[tail]):
+            v = Decimal(v)
+            indicators.vp.append((Decimal(h) + Decimal(l) + Decimal(c)) / three * v)
+            indicators.volumes.append(v)
+        return indicators
+
+    @classmethod
+    def from_state(cls, state: dict) -> "StreamingIndicators":
+        """Raises ValueError for a state written by an older version; rebuild it from the candles instead."""
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Indicator state version {state.get('version')} is not {STATE_VERSION}")
+        indicators = cls(*state["params"])
+        indicators.count = state["count"]
+        indicators.prev_close = state["prev_close"]
+        indicators.gains = RollingWindow.from_state(indicators.rsi_periods, state["gains"])
+        indicators.losses = RollingWindow.from_state(indicators.rsi_periods, state["losses"])
+        indicators.prices = RollingWindow.from_state(indicators.bb_periods, state["prices"])
+        indicators.true_ranges = RollingWindow.from_state(indicators.atr_periods, state["true_ranges"])
+        indicators.range_sum = state["range_sum"]
+        indicators.ema_fast = state["ema_fast"]
+        indicators.ema_slow = state["ema_slow"]
+        indicators.ema_signal = state["ema_signal"]
+        indicators.vp.extend(Decimal(value) for value in state["vp"])
+        indicators.volumes.extend(Decimal(value) for value in state["volumes"])
+        return indicators
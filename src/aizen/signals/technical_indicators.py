@@ -1,10 +1,10 @@
-import pandas as pd
 import numpy as np
-from decimal import Decimal
+from src.aizen.signals import kernels
 
 class TechnicalIndicators:
-    def __init__(self, df):
+    def __init__(self, df, precise=False):
         self.df = df
+        self.precise = precise      # Carry sums in long double, see kernels
 
     def calculate_technical_indicators(self):
         self.calculate_rsi()
@@ -17,88 +17,56 @@ class TechnicalIndicators:
 
         return self.df
 
+    def _column(self, name):
+        # Columns loaded from the DB hold Decimal objects; kernels work on float64
+        return self.df[name].to_numpy(dtype=np.float64)
+
     def calculate_rsi(self, periods=14, price_col='price'):
         """Calculate Relative Strength Index"""
-        delta = self.df[price_col].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-
-        avg_gain = gain.rolling(window=periods, min_periods=1).mean()
-        avg_loss = loss.rolling(window=periods, min_periods=1).mean()
-
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-
-        self.df['RSI'] = rsi
+        self.df['RSI'] = kernels.rsi(self._column(price_col), periods, precise=self.precise)
         return self.df
 
     def calculate_bollinger_bands(self, periods=20, price_col='price'):
         """Calculate Bollinger Bands"""
+        upper, middle, lower = kernels.bollinger_bands(self._column(price_col), periods, precise=self.precise)
 
-        sma = self.df[price_col].rolling(window=periods).mean()
-        std = self.df[price_col].rolling(window=periods).std()
-
-        self.df['BB_upper'] = sma + (std * 2)
-        self.df['BB_middle'] = sma
-        self.df['BB_lower'] = sma - (std * 2)
-
-        self.df["BB_upper"] = self.df["BB_upper"].fillna(self.df[price_col].squeeze())
-        self.df["BB_middle"] = self.df["BB_middle"].fillna(self.df[price_col].squeeze())
-        self.df["BB_lower"] = self.df["BB_lower"].fillna(self.df[price_col].squeeze())
-
+        self.df['BB_upper'] = upper
+        self.df['BB_middle'] = middle
+        self.df['BB_lower'] = lower
         return self.df
 
     def calculate_volatility(self, periods=20, price_col='price'):
         """Calculate Volatility"""
-        self.df['Volatility'] = self.df[price_col].rolling(window=periods).std()
-        self.df["Volatility"] = self.df["Volatility"].fillna(0)
+        self.df['Volatility'] = kernels.volatility(self._column(price_col), periods, precise=self.precise)
         return self.df
 
     def calculate_macd(self, fast=12, slow=26, signal=9, price_col='price'):
         """Calculate MACD"""
-        ema_fast = self.df[price_col].ewm(span=fast, adjust=False).mean()
-        ema_slow = self.df[price_col].ewm(span=slow, adjust=False).mean()
+        macd, macd_signal, macd_histogram = kernels.macd(self._column(price_col), fast, slow, signal)
 
-        self.df['MACD'] = ema_fast - ema_slow
-        self.df['MACD_signal'] = self.df['MACD'].ewm(span=signal, adjust=False).mean()
-        self.df['MACD_histogram'] = self.df['MACD'] - self.df['MACD_signal']
+        self.df['MACD'] = macd
+        self.df['MACD_signal'] = macd_signal
+        self.df['MACD_histogram'] = macd_histogram
         return self.df
 
     def calculate_atr(self, periods=14):
         """Calculate Average True Range"""
-        high_low = self.df['High'] - self.df['Low']
-        high_close = np.abs(self.df['High'] - self.df['price'].shift())
-        low_close = np.abs(self.df['Low'] - self.df['price'].shift())
-
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        self.df['ATR'] = tr.rolling(window=periods).mean()
-
-        mean_range = (self.df['High'] - self.df['Low']).mean().item()
-        self.df["ATR"] = self.df["ATR"].fillna(mean_range)
+        self.df['ATR'] = kernels.atr(self._column('High'), self._column('Low'), self._column('price'), periods, precise=self.precise)
         return self.df
 
     def calculate_price_range(self):
         """Calculate Daily Price Range"""
-        self.df['Price_Range'] = self.df['High'] - self.df['Low']
+        self.df['Price_Range'] = kernels.price_range(self._column('High'), self._column('Low'))
         return self.df
 
-    def calculate_vwap(self):
-        """Calculate Volume Weighted Average Price (VWAP) using Decimal for precision"""
-        
-        # Convert all numeric values to Decimal for precision
-        self.df['High'] = self.df['High'].apply(Decimal)
-        self.df['Low'] = self.df['Low'].apply(Decimal)
-        self.df['price'] = self.df['price'].apply(Decimal)
-        self.df['Volume'] = self.df['Volume'].apply(Decimal)
-
-        # Calculate Typical Price
-        self.df['Typical_Price'] = (self.df['High'] + self.df['Low'] + self.df['price']) / Decimal(3)
-
-        # Compute Cumulative Volume Price and Cumulative Volume
-        self.df['Cumulative_VP'] = (self.df['Typical_Price'] * self.df['Volume']).cumsum()
-        self.df['Cumulative_Volume'] = self.df['Volume'].cumsum()
-
-        # Compute VWAP safely, avoiding division by zero
-        self.df['VWAP'] = self.df.apply(lambda row: row['Cumulative_VP'] / row['Cumulative_Volume'] if row['Cumulative_Volume'] > 0 else Decimal('NaN'), axis=1)
-
-        return self.df[['VWAP']]
\ No newline at end of file
+    def calculate_vwap(self, periods=26):
+        """Calculate Volume Weighted Average Price (VWAP) over the last `periods` rows"""
+        self.df['VWAP'] = kernels.vwap(
+            self._column('High'),
+            self._column('Low'),
+            self._column('price'),
+            self._column('Volume'),
+            periods,
+            precise=self.precise
+        )
+        return self.df[['VWAP']]
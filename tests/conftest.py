@@ -0,0 +1,15 @@
+import os
+
+from sqlalchemy import ARRAY
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+# src.aizen.database builds its engine on import; tests bind their own sessions
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+# agents and marketplace_agents use Postgres column types; SQLite stores them as JSON
+@compiles(JSONB, "sqlite")
+@compiles(ARRAY, "sqlite")
+def _as_json(type_, compiler, **kw):
+    return "JSON"
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.aizen.backtest.engine import backtest_configs, shutdown_backtest_pool, simulate
+from src.aizen.backtest.optimizer import DEFAULT_SPACE, grid_size, optimize_config
+from src.aizen.protocols.ticks import price_to_tick, tick_range, triggered_range
+
+TRIGGERS = {
+    "below": {"by": 50, "lower": 0.2, "higher": 0.1},
+    "above": {"by": 50, "lower": 0.1, "higher": 0.2},
+}
+
+
+def test_tick_range_snaps_down_to_the_spacing():
+    current = int(price_to_tick(2000))
+    lower, upper = tick_range(current, 0.05, 0.05, 0.01, 60)
+
+    assert lower % 60 == 0 and upper % 60 == 0
+    assert lower < current < upper
+    assert 1.0001 ** lower == pytest.approx(2000 * 0.94, rel=0.01)
+    assert 1.0001 ** upper == pytest.approx(2000 * 1.06, rel=0.01)
+
+
+def test_tick_range_pushes_coinciding_ticks_apart():
+    # The tick of 1.0001 ** 120 truncates to 119, snapped down to 60 at both ends
+    assert tick_range(120, 0, 0, 0, 60) == (0, 120)
+
+
+def test_tick_range_rejects_a_range_below_zero():
+    with pytest.raises(ValueError):
+        tick_range(0, 1.5, 0.1, 0, 60)
+
+
+@pytest.mark.parametrize("tick, expected", [
+    (1000, None),                                       # In range
+    (-60, None),                                        # Below by 6% of the width
+    (-600, (0.2, 0.1, "Applied below-trigger")),        # Below by 60%
+    (1500, (0.1, 0.2, "Applied above-trigger")),        # Above by 50%
+])
+def test_triggered_range_fires_past_its_deviation(tick, expected):
+    assert triggered_range(tick, 0, 1000, TRIGGERS) == expected
+
+
+def test_incomplete_trigger_never_fires():
+    assert triggered_range(-5000, 0, 1000, {"below": {"by": 10}}) is None
+
+
+def params(**overrides):
+    return dict({"lower": 0.05, "upper": 0.05, "buffer": 0.0, "spacing": 60, "fee_rate": 0.003,
+                 "timeframe": 60.0, "triggers": {}}, **overrides)
+
+
+def test_position_in_range_earns_fees_without_rebalancing():
+    minutes = np.arange(120, dtype=np.float64)
+    price = np.full(120, 2000.0)
+    volume = np.full(120, 1_000_000.0)
+
+    result = simulate(minutes, price, volume, [params()]).iloc[0]
+
+    assert result["daily_rebalance"] == 0
+    assert result["time_in_range"] == 100
+    assert result["fees"] > 0
+    assert result["il"] == pytest.approx(0, abs=1e-9)
+
+
+def test_out_of_range_position_rebalances_with_the_trigger_widths():
+    minutes = np.arange(180, dtype=np.float64)
+    price = np.r_[np.full(30, 2000.0), np.full(90, 2600.0), np.full(60, 2400.0)]
+    volume = np.full(180, 1_000_000.0)
+    days = 179 / 1440
+
+    wide, plain, triggered = simulate(
+        minutes, price, volume, [params(lower=0.5, upper=0.5), params(), params(triggers=TRIGGERS)]
+    ).itertuples()
+
+    assert wide.daily_rebalance == 0                        # Both moves stay inside ±50%
+    # Out of range from minute 30, rebalanced at 60 (the first check) to ±5% around 2600,
+    # then out again at 2400 and rebalanced at 120
+    assert plain.daily_rebalance * days == pytest.approx(2)
+    # The above-trigger opens -10%/+20% around 2600, which still holds 2400
+    assert triggered.daily_rebalance * days == pytest.approx(1)
+    assert triggered.time_in_range == pytest.approx((29 + 119) / 179 * 100)
+    assert math.isfinite(triggered.final_value)
+
+
+def test_batches_split_across_the_process_pool_match_one_process():
+    dates = pd.date_range("2025-01-01", periods=240, freq="1min")
+    price = 2000 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.002, 240)))
+    candles = pd.DataFrame({"price": price, "volume": 1_000_000.0}, index=dates)
+    base = {"liquidity_range": {"lower": 0.02, "higher": 0.02}, "pool_details": {"fee_tier": 0.3}, "rebalance_timeframe": 15}
+    configs = [dict(base, buffer=i / 1000) for i in range(10)]
+
+    try:
+        pooled = backtest_configs(candles, configs, workers=2, chunk_size=3)
+    finally:
+        shutdown_backtest_pool()
+    inline = backtest_configs(candles, configs, workers=1)
+
+    pd.testing.assert_frame_equal(pooled, inline)
+
+
+def test_grid_larger_than_the_budget_is_refused():
+    assert grid_size(DEFAULT_SPACE, steps=5) == 5 ** 3 * 5
+
+    with pytest.raises(ValueError, match="exceeds the budget"):
+        optimize_config(pd.DataFrame(), {}, space=DEFAULT_SPACE, method="grid", budget=600, steps=5)
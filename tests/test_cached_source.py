@@ -0,0 +1,118 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.aizen.data.market import CachedSource, FallbackSource, MarketDataSource
+
+START = datetime(2025, 1, 1)
+END = START + timedelta(minutes=3)
+
+
+class ScriptedSource(MarketDataSource):
+    """Serves `candles` once `published` is set, nothing before; counts requests."""
+
+    name = "scripted"
+
+    def __init__(self, candles, name="scripted"):
+        super().__init__(retries=0)
+        self.name = name
+        self.candles = candles
+        self.published = False
+        self.calls = 0
+
+    def _fetch_candles(self, tickers, start, end, interval):
+        self.calls += 1
+        if not self.published:
+            return self.empty_frame()
+        return self.candles[self.candles.index.get_level_values("ticker").isin(tickers)]
+
+
+def candles(periods=3):
+    dates = pd.date_range(START, periods=periods, freq="1min")
+    index = pd.MultiIndex.from_product([["BTC-USD"], dates], names=["ticker", "date"])
+    return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 10}, index=index)
+
+
+def test_closed_range_is_served_from_cache(tmp_path):
+    source = ScriptedSource(candles())
+    source.published = True
+    cached = CachedSource(source, cache_dir=str(tmp_path))
+
+    first = cached.fetch_candles(["BTC-USD"], START, END)
+    second = cached.fetch_candles(["BTC-USD"], START, END)
+
+    assert source.calls == 1
+    assert len(first) == len(second) == 3
+
+
+def test_empty_result_expires(tmp_path):
+    source = ScriptedSource(candles())
+    cached = CachedSource(source, cache_dir=str(tmp_path), partial_ttl=60)
+
+    assert cached.fetch_candles(["BTC-USD"], START, END).empty
+    assert cached.fetch_candles(["BTC-USD"], START, END).empty
+    assert source.calls == 1
+
+    # Upstream publishes the range later; once the empty entry is older than the TTL it is refetched
+    source.published = True
+    expire_partial(cached, END)
+
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert source.calls == 2
+    assert not os.path.exists(cached._path("BTC-USD", START, END, "1m", partial=True))
+
+
+def expire_partial(cached, end):
+    path = cached._path("BTC-USD", START, end, "1m", partial=True)
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+
+
+def test_short_result_expires(tmp_path):
+    source = ScriptedSource(candles())
+    source.published = True
+    cached = CachedSource(source, cache_dir=str(tmp_path), partial_ttl=60)
+    end = START + timedelta(minutes=5)      # Two candles not published yet
+
+    assert len(cached.fetch_candles(["BTC-USD"], START, end)) == 3
+    assert len(cached.fetch_candles(["BTC-USD"], START, end)) == 3
+    assert source.calls == 1
+
+    source.candles = candles(periods=5)
+    expire_partial(cached, end)
+
+    assert len(cached.fetch_candles(["BTC-USD"], START, end)) == 5
+    assert source.calls == 2
+
+
+def test_fallback_result_expires(tmp_path):
+    primary = ScriptedSource(candles(), name="primary")
+    secondary = ScriptedSource(candles(), name="secondary")
+    secondary.published = True
+    cached = CachedSource(FallbackSource([primary, secondary]), cache_dir=str(tmp_path), partial_ttl=60)
+
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+    primary.published = True
+    expire_partial(cached, END)
+
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert len(cached.fetch_candles(["BTC-USD"], START, END)) == 3
+    assert (primary.calls, secondary.calls) == (2, 1)
+
+
+def test_range_ending_within_the_publishing_lag_is_not_cached(tmp_path):
+    source = ScriptedSource(candles())
+    source.published = True
+    cached = CachedSource(source, cache_dir=str(tmp_path), publish_lag=300)
+    end = datetime.utcnow() - timedelta(minutes=2)
+
+    cached.fetch_candles(["BTC-USD"], START, end)
+    cached.fetch_candles(["BTC-USD"], START, end)
+
+    assert source.calls == 2
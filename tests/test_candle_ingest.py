@@ -0,0 +1,146 @@
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.aizen.data.market import CANDLE_COLUMNS, CandleIngestor, FileReplaySource, HotCandleCache
+from src.aizen.models import CryptoPrice, IndicatorState
+from src.aizen.signals.streaming_indicators import StreamingIndicators
+
+TICKERS = ["BTC-USD", "ETH-USD"]
+START = datetime(2025, 1, 1)
+
+
+def minutes(n):
+    return START + timedelta(minutes=n)
+
+
+def synthetic_candles(rows, seed=0):
+    frames = []
+    rng = np.random.default_rng(seed)
+    for ticker in TICKERS:
+        close = rng.uniform(100, 60000) + np.cumsum(rng.normal(0, 5, rows))
+        frames.append(pd.DataFrame({
+            "ticker": ticker,
+            "date": pd.date_range(START, periods=rows, freq="1min"),
+            "Open": close + rng.normal(0, 1, rows),
+            "High": close + rng.uniform(0, 8, rows),
+            "Low": close - rng.uniform(0, 8, rows),
+            "Close": close,
+            "Volume": rng.integers(0, 1000, rows)
+        }))
+    return pd.concat(frames).set_index(["ticker", "date"])
+
+
+def replay_source(path, candles):
+    FileReplaySource.record(candles, str(path))
+    return FileReplaySource(str(path))
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}")
+    CryptoPrice.__table__.create(engine)
+    IndicatorState.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def ingestor(session_factory, tmp_path):
+    return CandleIngestor(session_factory, HotCandleCache(str(tmp_path / "hot")))
+
+
+def stored(session_factory):
+    with session_factory() as session:
+        rows = session.query(CryptoPrice).order_by(CryptoPrice.ticker, CryptoPrice.date).all()
+        return [
+            {column: getattr(row, column) for column in ("ticker", "date", "close_price", "volume", "rsi", "macd", "atr", "vwap")}
+            for row in rows
+        ]
+
+
+def streamed(candles):
+    """Indicators of `candles` folded one at a time, per ticker, as {(ticker, date): values}."""
+    values = {}
+    for ticker, frame in candles.groupby(level="ticker"):
+        indicators = StreamingIndicators()
+        for date, candle in frame.droplevel("ticker").iterrows():
+            values[ticker, date.to_pydatetime()] = indicators.update(candle["High"], candle["Low"], candle["Close"], int(candle["Volume"]))
+    return values
+
+
+def assert_indicators(rows, expected):
+    assert len(rows) == len(expected)
+    for row in rows:
+        values = expected[row["ticker"], row["date"]]
+        for column, key in (("rsi", "RSI"), ("macd", "MACD"), ("atr", "ATR"), ("vwap", "VWAP")):
+            value = math.nan if row[column] is None else row[column]     # SQLite stores NaN as NULL
+            assert value == pytest.approx(values[key], rel=1e-9, nan_ok=True), (row["date"], column)
+
+
+def test_reingesting_a_window_is_idempotent(ingestor, session_factory, tmp_path):
+    source = replay_source(tmp_path / "candles.csv", synthetic_candles(120))
+    window = source.fetch_candles(TICKERS, minutes(0), minutes(120))
+
+    assert ingestor.ingest(window) == 240
+    first = stored(session_factory)
+    assert ingestor.ingest(window) == 0
+    assert ingestor.ingest(source.fetch_candles(TICKERS, minutes(60), minutes(120))) == 0
+    assert stored(session_factory) == first
+    assert_indicators(first, streamed(window))
+
+
+def test_rebackfilling_a_window_is_idempotent(ingestor, session_factory, tmp_path):
+    source = replay_source(tmp_path / "candles.parquet", synthetic_candles(120))
+
+    assert ingestor.backfill(source, TICKERS, minutes(0), minutes(120), chunk=timedelta(minutes=50)) == 240
+    first = stored(session_factory)
+    assert ingestor.backfill(source, TICKERS, minutes(0), minutes(120), chunk=timedelta(minutes=50)) == 240
+    assert stored(session_factory) == first
+    assert_indicators(first, streamed(source.fetch_candles(TICKERS, minutes(0), minutes(120))))
+
+
+def test_overlapping_backfill_updates_existing_rows(ingestor, session_factory, tmp_path):
+    live = synthetic_candles(200)
+    ingestor.ingest(replay_source(tmp_path / "live.csv", live).fetch_candles(TICKERS, minutes(0), minutes(150)))
+
+    # A revised recording: every candle from minute 100 on closes differently
+    revised = live.copy()
+    revised.loc[revised.index.get_level_values("date") >= minutes(100), CANDLE_COLUMNS] += 3
+    source = replay_source(tmp_path / "revised.csv", revised)
+    assert ingestor.backfill(source, TICKERS, minutes(100), minutes(200), chunk=timedelta(minutes=30)) == 200
+
+    rows = stored(session_factory)
+    assert len(rows) == 400
+    assert len({(row["ticker"], row["date"]) for row in rows}) == 400
+    closes = revised["Close"].round(8)
+    for row in rows:
+        assert float(row["close_price"]) == pytest.approx(closes[row["ticker"], row["date"]])
+
+    # Rows from the backfill restart their indicators at its start, and later
+    # ingests continue from the state it left behind
+    assert ingestor.ingest(source.fetch_candles(TICKERS, minutes(100), minutes(200))) == 0
+    extended = synthetic_candles(260)
+    extended.loc[extended.index.get_level_values("date") < minutes(200)] = revised
+    more = replay_source(tmp_path / "more.csv", extended)
+    assert ingestor.ingest(more.fetch_candles(TICKERS, minutes(200), minutes(260))) == 120
+
+    recomputed = more.fetch_candles(TICKERS, minutes(100), minutes(260))
+    assert_indicators([row for row in stored(session_factory) if row["date"] >= minutes(100)], streamed(recomputed))
+
+
+def test_state_of_an_older_version_is_replayed_from_the_table(ingestor, session_factory, tmp_path):
+    source = replay_source(tmp_path / "candles.csv", synthetic_candles(120))
+    ingestor.ingest(source.fetch_candles(TICKERS, minutes(0), minutes(60)))
+    with session_factory() as session:
+        for state in session.query(IndicatorState).all():
+            state.state = {key: value for key, value in state.state.items() if key != "version"}
+        session.commit()
+
+    assert ingestor.ingest(source.fetch_candles(TICKERS, minutes(0), minutes(120))) == 120
+    assert_indicators(stored(session_factory), streamed(source.fetch_candles(TICKERS, minutes(0), minutes(120))))
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.aizen.models import UserChat
+from src.aizen.pipelines import chat_history_writer as writer_module
+from src.aizen.pipelines.chat_history_writer import ChatHistoryWriter
+
+
+class FlakySessions:
+    """Session factory whose first `failures` sessions lose the connection on execute."""
+
+    def __init__(self, factory, failures):
+        self.factory = factory
+        self.failures = failures
+
+    def __call__(self):
+        session = self.factory()
+        if self.failures:
+            self.failures -= 1
+
+            def execute(*args, **kwargs):
+                raise OperationalError("INSERT INTO user_chats", {}, Exception("server closed the connection"))
+            session.execute = execute
+        return session
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chats.db'}")
+    UserChat.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(writer_module, "SessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+
+def write(writer, chats):
+    for user_query in chats:
+        writer.submit(1, 2, user_query, {"text": "hi"})
+    writer.flush()
+    writer.close()
+
+
+def stored_queries(sessions):
+    with sessions() as session:
+        return [chat.user_query for chat in session.query(UserChat).order_by(UserChat.id)]
+
+
+def test_batch_is_retried_after_connection_errors(sessions, monkeypatch):
+    monkeypatch.setattr(writer_module, "SessionLocal", FlakySessions(sessions, failures=2))
+    writer = ChatHistoryWriter(flush_interval=0.05, backoff=0)
+
+    write(writer, ["a", "b", "c"])
+
+    assert stored_queries(sessions) == ["a", "b", "c"]
+    assert writer.stats() == dict(written=3, batches=1, retries=2, row_fallbacks=0, dropped=0, queued=0)
+
+
+def test_rejected_batch_falls_back_to_rows(sessions):
+    writer = ChatHistoryWriter(flush_interval=0.05, backoff=0)
+
+    write(writer, ["a", None, "c"])     # user_query is NOT NULL
+
+    assert stored_queries(sessions) == ["a", "c"]
+    assert writer.stats() == dict(written=2, batches=0, retries=0, row_fallbacks=1, dropped=1, queued=0)
+
+
+def test_rows_are_dropped_and_counted_once_retries_run_out(sessions, monkeypatch):
+    monkeypatch.setattr(writer_module, "SessionLocal", FlakySessions(sessions, failures=100))
+    writer = ChatHistoryWriter(flush_interval=0.05, retries=2, backoff=0)
+
+    write(writer, ["a", "b"])
+
+    assert stored_queries(sessions) == []
+    assert writer.stats() == dict(written=0, batches=0, retries=2, row_fallbacks=1, dropped=2, queued=0)
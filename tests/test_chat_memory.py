@@ -0,0 +1,132 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.aizen.models import UserChat, UserChatSummary
+from src.aizen.pipelines import chat_history_writer as writer_module
+from src.aizen.pipelines import chat_memory
+from src.aizen.pipelines.chat_history_writer import chat_history_writer
+from src.aizen.pipelines.chat_memory import ChatMemoryStore, SummaryWindowMemory
+from src.aizen.pipelines.semantic_cache import SemanticResponseCache
+from src.aizen.pipelines.user_chat_pipeline import UserChatPipeline
+
+USER_ID, AGENT_ID = 1, 2
+
+
+class WordCountModel(FakeListChatModel):
+    """Fake model that counts words as tokens, so no tokenizer is needed."""
+
+    def get_num_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def get_num_tokens_from_messages(self, messages, tools=None) -> int:
+        return sum(self.get_num_tokens(message.content) for message in messages)
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chats.db'}")
+    UserChat.__table__.create(engine)
+    UserChatSummary.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(chat_memory, "SessionLocal", factory)
+    monkeypatch.setattr(writer_module, "SessionLocal", factory)
+    yield factory
+    chat_history_writer.flush()
+    engine.dispose()
+
+
+@pytest.fixture
+def pipeline(sessions):
+    answer = json.dumps({"answer": "RSI compares average gains with average losses over a window", "config": None})
+    llm = WordCountModel(responses=[answer])
+    pipeline = UserChatPipeline(llm=llm, response_cache=SemanticResponseCache(enabled=False))
+    pipeline.memories = ChatMemoryStore(llm, max_token_limit=60)
+    return pipeline
+
+
+def messages(memory):
+    return [message.content for message in memory.chat_memory.messages]
+
+
+def assert_rehydrates_to(pipeline, memory):
+    chat_history_writer.flush()
+    pipeline.memories.evict(USER_ID, AGENT_ID)
+    hydrated = pipeline.memories.get(USER_ID, AGENT_ID)
+
+    assert hydrated.moving_summary_buffer == memory.moving_summary_buffer
+    assert hydrated.summarized_until == memory.summarized_until
+    assert messages(hydrated) == messages(memory)
+    assert hydrated.message_times == memory.message_times
+
+
+def test_summarized_turns_are_not_rehydrated(pipeline):
+    for turn in range(6):
+        pipeline.handle_chat(USER_ID, f"what does RSI mean, question {turn}?", AGENT_ID)
+    memory = pipeline.memories.get(USER_ID, AGENT_ID)
+    assert memory.moving_summary_buffer
+
+    assert_rehydrates_to(pipeline, memory)
+
+
+async def test_streaming_summarizes_without_blocking_calls(pipeline, monkeypatch):
+    def blocking(*args, **kwargs):
+        raise AssertionError("summary generated with a blocking call")
+    monkeypatch.setattr(SummaryWindowMemory, "predict_new_summary", blocking)
+
+    for turn in range(6):
+        events = [event async for event, _ in pipeline.astream_chat(USER_ID, f"explain MACD, question {turn}", AGENT_ID)]
+        assert events[-1] == "done"
+    memory = pipeline.memories.get(USER_ID, AGENT_ID)
+    assert memory.moving_summary_buffer
+
+    assert_rehydrates_to(pipeline, memory)
+
+
+async def test_streaming_hydrates_off_the_event_loop(pipeline, monkeypatch):
+    pipeline.handle_chat(USER_ID, "what does RSI mean?", AGENT_ID)
+    chat_history_writer.flush()
+    pipeline.memories.evict(USER_ID, AGENT_ID)
+
+    hydrate = ChatMemoryStore._hydrate
+    threads = []
+    def recording(self, *args):
+        threads.append(threading.current_thread())
+        return hydrate(self, *args)
+    monkeypatch.setattr(ChatMemoryStore, "_hydrate", recording)
+
+    events = [event async for event, _ in pipeline.astream_chat(USER_ID, "and MACD?", AGENT_ID)]
+    assert events[-1] == "done"
+    assert threads and threads[0] is not threading.main_thread()
+    assert messages(pipeline.memories.get(USER_ID, AGENT_ID))[0] == "what does RSI mean?"
+
+
+class MessageOverheadModel(WordCountModel):
+    """Charges a few tokens per message on top of its words, like chat model tokenizers do."""
+
+    def get_num_tokens_from_messages(self, messages, tools=None) -> int:
+        return super().get_num_tokens_from_messages(messages) + 4 * len(messages)
+
+
+def test_hydrated_window_fits_the_message_token_count(sessions):
+    llm = MessageOverheadModel(responses=["unused"])
+    store = ChatMemoryStore(llm, max_token_limit=60)
+    with sessions() as session:
+        for turn in range(6):
+            session.add(UserChat(
+                user_id=USER_ID, agent_id=AGENT_ID, user_query=f"what is MACD, question {turn}?",
+                response={"raw": "MACD is the gap between two EMAs"}, created_at=datetime(2024, 1, 1, 0, turn)
+            ))
+        session.commit()
+
+    memory = store.get(USER_ID, AGENT_ID)
+
+    # Nothing for pruning to push out: the window is exactly what the live memory would keep
+    assert llm.get_num_tokens_from_messages(memory.chat_memory.messages) <= 60
+    assert memory._pop_overflow() == []
+    assert messages(memory)[-2] == "what is MACD, question 5?"
@@ -0,0 +1,223 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.aizen.chains import clone_worker as worker_module
+from src.aizen.chains.clone_worker import CloneWorker
+from src.aizen.chains.service import ChainRejected
+from src.aizen.models import Agent, CloneJob, User, UserDailyCloneFee
+from src.aizen.repositories.clones import (
+    broadcast_clone_job, complete_clone_job, create_clone_job, fail_clone_job, open_clone_jobs
+)
+
+
+class FakeChain:
+    """Receipts, nonce counts and the mempool for the worker, keyed by tx hash and sender."""
+
+    def __init__(self):
+        self.receipts = {}
+        self.mined_nonces = {}
+        self.mempool = set()
+        self.sent = []
+        self.reject = None
+
+    async def get_receipt(self, tx_hash):
+        return self.receipts.get(tx_hash)
+
+    async def get_transaction_count(self, address):
+        return self.mined_nonces.get(address, 0)
+
+    async def knows_transaction(self, tx_hash):
+        return tx_hash in self.mempool or tx_hash in self.receipts
+
+    async def broadcast(self, raw_tx):
+        if self.reject:
+            raise ChainRejected(self.reject)
+        self.sent.append(raw_tx)
+        return raw_tx
+
+
+class FakeCache:
+    def invalidate(self, *keys):
+        pass
+
+    async def ainvalidate(self, *keys):
+        pass
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    path = tmp_path / "clones.db"
+    engine = create_engine(f"sqlite:///{path}")
+    for model in (Agent, User, CloneJob, UserDailyCloneFee):
+        model.__table__.create(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)    # No connection outlives a test's loop
+    async_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    monkeypatch.setattr(worker_module, "get_async_sessionmaker", lambda: async_factory)
+    monkeypatch.setattr(worker_module, "get_balance_service", FakeCache)
+    monkeypatch.setattr(worker_module, "get_response_cache", FakeCache)
+
+    with factory() as db:
+        db.add_all([
+            User(id=1, public_key="p1", wallet_address="0xcloner", auth_wallet_address="a1"),
+            User(id=2, public_key="p2", wallet_address="0xowner", auth_wallet_address="a2"),
+            Agent(id=10, name="original", user_id=2, description="d", category="c", config={}, clone_fee=Decimal("0.01")),
+        ])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def new_job(sessions, name="clone", nonce=0, tx_hash="0xaa"):
+    with sessions() as db:
+        job = create_clone_job(db, 1, db.get(Agent, 10), name)
+        if tx_hash:
+            assert broadcast_clone_job(db, job.id, tx_hash, "0xcloner", nonce, "0xraw" + tx_hash[2:])
+        return job.id
+
+
+def job_row(sessions, job_id):
+    with sessions() as db:
+        return db.get(CloneJob, job_id)
+
+
+def agent_names(sessions):
+    with sessions() as db:
+        return sorted(name for (name,) in db.query(Agent.name))
+
+
+async def test_mined_transfer_completes_the_job_and_creates_the_agent(sessions):
+    job_id = new_job(sessions)
+    chain = FakeChain()
+    chain.receipts["0xaa"] = SimpleNamespace(status=1)
+    worker = CloneWorker(chain)
+
+    await worker.poll()
+
+    job = job_row(sessions, job_id)
+    assert job.status == "completed" and job.new_agent_id is not None
+    assert agent_names(sessions) == ["clone", "original"]
+    with sessions() as db:
+        assert db.query(UserDailyCloneFee).count() == 1
+    assert worker.stats()["completed"] == 1
+
+
+async def test_reverted_transfer_fails_the_job(sessions):
+    job_id = new_job(sessions)
+    chain = FakeChain()
+    chain.receipts["0xaa"] = SimpleNamespace(status=0)
+
+    await CloneWorker(chain).poll()
+
+    job = job_row(sessions, job_id)
+    assert (job.status, job.error) == ("failed", "Transaction failed on chain")
+    assert agent_names(sessions) == ["original"]
+
+
+async def test_unmined_transfer_waits_past_the_timeout_and_is_resent_when_lost(sessions):
+    job_id = new_job(sessions)
+    with sessions() as db:
+        db.query(CloneJob).update({"updated_at": datetime.utcnow() - timedelta(hours=1)})
+        db.commit()
+    chain = FakeChain()
+    worker = CloneWorker(chain, confirm_timeout=1)
+
+    await worker.poll()
+
+    assert job_row(sessions, job_id).status == "broadcast"
+    assert chain.sent == ["0xraw" + "aa"]
+    assert worker.stats()["rebroadcast"] == 1
+
+    chain.mempool.add("0xaa")
+    await worker.poll()
+    assert len(chain.sent) == 1
+
+
+async def test_job_fails_once_another_transaction_takes_its_nonce(sessions):
+    job_id = new_job(sessions, nonce=4)
+    chain = FakeChain()
+    chain.mined_nonces["0xcloner"] = 4
+    chain.reject = "nonce too low"
+    worker = CloneWorker(chain)
+
+    await worker.poll()
+    assert job_row(sessions, job_id).status == "broadcast"
+
+    chain.mined_nonces["0xcloner"] = 5
+    await worker.poll()
+
+    job = job_row(sessions, job_id)
+    assert (job.status, job.error) == ("failed", "Transaction was replaced by another with the same nonce")
+
+
+async def test_job_never_signed_expires(sessions):
+    job_id = new_job(sessions, tx_hash=None)
+    with sessions() as db:
+        db.query(CloneJob).update({"updated_at": datetime.utcnow() - timedelta(hours=1)})
+        db.commit()
+    worker = CloneWorker(FakeChain(), confirm_timeout=1)
+
+    await worker.poll()
+
+    job = job_row(sessions, job_id)
+    assert (job.status, job.error) == ("failed", "Transaction was never broadcast")
+    assert worker.stats()["expired"] == 1
+
+
+def test_open_job_reserves_its_name_until_it_fails(sessions):
+    job_id = new_job(sessions)
+    with sessions() as db:
+        with pytest.raises(ValueError):
+            create_clone_job(db, 1, db.get(Agent, 10), "clone")
+        with pytest.raises(ValueError):
+            create_clone_job(db, 1, db.get(Agent, 10), "original")
+        assert fail_clone_job(db, job_id, "no")
+
+    new_job(sessions, tx_hash="0xbb")
+    with sessions() as db:
+        assert [job.tx_hash for job in open_clone_jobs(db)] == ["0xbb"]
+
+
+def test_duplicate_name_is_refused_by_the_index_when_the_check_races(sessions, monkeypatch):
+    from src.aizen.repositories import clones
+    new_job(sessions)
+    monkeypatch.setattr(clones, "clone_name_taken", lambda db, name: False)
+
+    with sessions() as db:
+        with pytest.raises(ValueError):
+            create_clone_job(db, 1, db.get(Agent, 10), "clone")
+
+
+def test_job_is_completed_once_by_two_pollers(sessions):
+    job_id = new_job(sessions)
+
+    with sessions() as first, sessions() as second:
+        assert complete_clone_job(first, job_id) is not None
+        assert complete_clone_job(second, job_id) is None
+        assert not fail_clone_job(second, job_id, "late")
+
+    assert job_row(sessions, job_id).status == "completed"
+    assert agent_names(sessions) == ["clone", "original"]
+
+
+async def test_two_workers_polling_together_create_one_agent(sessions):
+    new_job(sessions)
+    chain = FakeChain()
+    chain.receipts["0xaa"] = SimpleNamespace(status=1)
+    first, second = CloneWorker(chain), CloneWorker(chain)
+
+    await asyncio.gather(first.poll(), second.poll())
+
+    assert agent_names(sessions) == ["clone", "original"]
+    assert first.stats()["completed"] + second.stats()["completed"] == 1
+    with sessions() as db:
+        assert db.query(UserDailyCloneFee).count() == 1
@@ -0,0 +1,85 @@
+import importlib
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from web3 import Web3
+
+from src.aizen.models import Agent, MarketplaceAgent, User, UserCommission, UserDailyEarnedFee
+
+# src.aizen.jobs re-exports the function under the module's name
+fee_job = importlib.import_module("src.aizen.jobs.marketplace_fee")
+
+WALLET = "0x" + "ab" * 20
+
+
+class Sunday(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2024, 6, 2, 12)
+
+
+class FakeEth:
+    def __init__(self):
+        self.balance_calls = []
+
+    def get_balance(self, address):
+        self.balance_calls.append(address)
+        return 0
+
+
+class FakeWeb3:
+    from_wei = staticmethod(Web3.from_wei)
+
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+class FakeCache:
+    def invalidate(self, *tags):
+        pass
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fees.db'}")
+    for model in (User, Agent, UserCommission, UserDailyEarnedFee, MarketplaceAgent):
+        model.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(fee_job, "SessionLocal", factory)
+    monkeypatch.setattr(fee_job, "datetime", Sunday)
+    monkeypatch.setattr(fee_job, "get_response_cache", FakeCache)
+
+    with factory() as db:
+        db.add_all([
+            User(id=1, public_key="p1", wallet_address=WALLET, auth_wallet_address="a1"),
+            User(id=2, public_key="p2", wallet_address="not-an-address", auth_wallet_address="a2"),
+            User(id=3, public_key="p3", wallet_address="0x" + "cd" * 20, auth_wallet_address="a3"),
+            Agent(id=10, name="a", user_id=3, description="d", category="c", config={}, subscription_fee=5,
+                  is_deployed=True, is_active=True),
+            UserCommission(id=1, user_id=1, agent_id=10, amount_eth=1, is_active=True, is_commissioned=True),
+            UserCommission(id=2, user_id=2, agent_id=10, amount_eth=1, is_active=True, is_commissioned=True),
+        ])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_balances_fall_back_to_single_lookups_and_bad_addresses_are_skipped(sessions, monkeypatch):
+    w3 = FakeWeb3()
+    batched = []
+    def failing_batch(w3, addresses):
+        batched.append(addresses)
+        raise ValueError("batch requests are not supported")
+    monkeypatch.setattr(fee_job, "w3", w3)
+    monkeypatch.setattr(fee_job, "batch_balances", failing_batch)
+
+    fee_job.process_marketplace_fees()
+
+    assert batched == [[Web3.to_checksum_address(WALLET)]]
+    assert w3.eth.balance_calls == [Web3.to_checksum_address(WALLET)]
+    with sessions() as db:
+        # The funded check ran for the valid sender; the invalid one only failed its own commission
+        assert db.get(UserCommission, 1).is_active is False
+        assert db.get(UserCommission, 2).is_active is True
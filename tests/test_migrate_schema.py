@@ -0,0 +1,62 @@
+import importlib
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+# src.aizen.jobs re-exports the function under the module's name
+migration = importlib.import_module("src.aizen.jobs.migrate_schema")
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # agents as it was before image_blobs
+        conn.execute(text(
+            "CREATE TABLE agents (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, user_id INTEGER NOT NULL, "
+            "description VARCHAR NOT NULL, category TEXT NOT NULL, config JSON NOT NULL, image BLOB)"
+        ))
+        conn.execute(text("INSERT INTO agents (id, name, user_id, description, category, config) VALUES (1, 'a', 1, 'd', 'c', '{}')"))
+    monkeypatch.setattr(migration, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_existing_database_gets_the_new_schema_and_reruns_are_harmless(engine):
+    migration.migrate_schema()
+    migration.migrate_schema()
+
+    schema = inspect(engine)
+    agent_columns = {column["name"] for column in schema.get_columns("agents")}
+    for model, columns in migration.NEW_COLUMNS.items():
+        assert set(columns) <= {column["name"] for column in schema.get_columns(model.__tablename__)}
+    for model in migration.NEW_TABLES:
+        assert set(model.__table__.c.keys()) <= {column["name"] for column in schema.get_columns(model.__tablename__)}
+        assert {index.name for index in model.__table__.indexes} <= {index["name"] for index in schema.get_indexes(model.__tablename__)}
+    for model, names in migration.NEW_INDEXES.items():
+        assert set(names) <= {index["name"] for index in schema.get_indexes(model.__tablename__)}
+
+    assert "image" in agent_columns
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name, image_hash FROM agents")).all() == [("a", None)]
+
+
+def test_crypto_price_duplicates_are_removed_before_the_constraint(tmp_path, monkeypatch):
+    constraint = importlib.import_module("src.aizen.jobs.add_crypto_price_constraint")
+    engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}")
+    monkeypatch.setattr(constraint, "engine", engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE crypto_prices (id INTEGER PRIMARY KEY, ticker VARCHAR(10) NOT NULL, date DATETIME NOT NULL, close_price NUMERIC)"))
+        conn.execute(text(
+            "INSERT INTO crypto_prices (id, ticker, date, close_price) VALUES "
+            "(1, 'BTC-USD', '2025-01-01 00:00:00', 1), (2, 'BTC-USD', '2025-01-01 00:00:00', 2), "
+            "(3, 'BTC-USD', '2025-01-01 00:01:00', 3), (4, 'ETH-USD', '2025-01-01 00:00:00', 4)"
+        ))
+
+    assert constraint.add_crypto_price_constraint() == 1
+    assert constraint.add_crypto_price_constraint() == 0
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM crypto_prices ORDER BY id")).scalars().all() == [2, 3, 4]
+        assert constraint.has_constraint(conn)
+    engine.dispose()
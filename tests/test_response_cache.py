@@ -0,0 +1,59 @@
+import threading
+
+from src.aizen.cache.response import ALL_TAG, MemoryBackend, ResponseCache
+
+
+class ThreadRecordingBackend(MemoryBackend):
+    """Memory backend that claims to block, like Redis, and records the threads it is called on."""
+
+    blocking = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.current_thread())
+        return super().get(key)
+
+    def set(self, key, value, ttl):
+        self.threads.append(threading.current_thread())
+        super().set(key, value, ttl)
+
+    def versions(self, tags):
+        self.threads.append(threading.current_thread())
+        return super().versions(tags)
+
+    def bump(self, tags):
+        self.threads.append(threading.current_thread())
+        super().bump(tags)
+
+
+async def test_blocking_backend_is_called_off_the_event_loop():
+    backend = ThreadRecordingBackend()
+    cache = ResponseCache(backend)
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        return {"value": len(computed)}
+
+    assert await cache.aget_or_set("route", {"id": 1}, ["user:1"], compute) == {"value": 1}
+    assert await cache.aget_or_set("route", {"id": 1}, ["user:1"], compute) == {"value": 1}
+    await cache.ainvalidate("user:1")
+    assert await cache.aget_or_set("route", {"id": 1}, ["user:1"], compute) == {"value": 2}
+
+    assert backend.threads
+    assert all(thread is not threading.main_thread() for thread in backend.threads)
+
+
+async def test_memory_backend_is_called_inline():
+    backend = ThreadRecordingBackend()
+    backend.blocking = False
+    cache = ResponseCache(backend)
+
+    async def compute():
+        return [1, 2]
+
+    assert await cache.aget_or_set("route", {}, [ALL_TAG], compute) == [1, 2]
+    assert backend.threads and all(thread is threading.main_thread() for thread in backend.threads)
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from src.aizen.pipelines.semantic_cache import SemanticResponseCache, is_cacheable_query
+from src.aizen.schemas.agent_config import AgentResponse
+
+
+class FakeCollection:
+    """Stands in for the Chroma collection; similarity is 1 for the same words, `other_similarity` otherwise."""
+
+    def __init__(self, other_similarity=0.0):
+        self.other_similarity = other_similarity
+        self.entries = {}       # id -> (document, metadata)
+
+    def add(self, ids, documents, metadatas):
+        for entry_id, document, metadata in zip(ids, documents, metadatas):
+            self.entries[entry_id] = (document, metadata)
+
+    def delete(self, ids):
+        for entry_id in ids:
+            self.entries.pop(entry_id, None)
+
+    def query(self, query_texts, n_results, include):
+        def similarity(document):
+            return 1.0 if set(document.lower().split()) == set(query_texts[0].lower().split()) else self.other_similarity
+        ranked = sorted(self.entries.items(), key=lambda item: -similarity(item[1][0]))[:n_results]
+        return {
+            "ids": [[entry_id for entry_id, _ in ranked]],
+            "metadatas": [[metadata for _, (_, metadata) in ranked]],
+            "distances": [[1 - similarity(document) for _, (document, _) in ranked]]
+        }
+
+
+def cache_with(collection, **kwargs):
+    cache = SemanticResponseCache(**kwargs)
+    cache._collection = collection
+    return cache
+
+
+def answer(text):
+    return AgentResponse(answer=text)
+
+
+@pytest.mark.parametrize("query, cacheable", [
+    ("What is impermanent loss?", True),
+    ("How does the RSI indicator work", True),
+    ("Create a config for ETH/USDC", False),
+    ("Recommend a range for my pool", False),
+    ("Can you explain that again?", False),
+    ("Elaborate on the previous answer", False),
+])
+def test_is_cacheable_query(query, cacheable):
+    assert is_cacheable_query(query) is cacheable
+
+
+def test_answers_are_served_above_the_threshold_only():
+    collection = FakeCollection(other_similarity=0.9)
+    cache = cache_with(collection, threshold=0.92)
+    cache.store("what is impermanent loss", answer("IL is ..."), latency=2.0)
+
+    assert cache.lookup("What is impermanent loss").answer == "IL is ..."
+    assert cache.lookup("what is a liquidity pool") is None     # 0.9 similar
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_user_specific_queries_bypass_the_cache():
+    collection = FakeCollection()
+    cache = cache_with(collection)
+
+    cache.store("give me a config", answer("..."), latency=1.0)
+    assert collection.entries == {}
+    assert cache.lookup("give me a config") is None
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_expired_entries_miss_and_are_deleted():
+    collection = FakeCollection()
+    cache = cache_with(collection, ttl=60)
+    cache.store("what is impermanent loss", answer("IL is ..."), latency=2.0)
+    for _, metadata in collection.entries.values():
+        metadata["created_at"] = time.time() - 120
+
+    assert cache.lookup("what is impermanent loss") is None
+    assert collection.entries == {}
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_entries_are_evicted_past_max_entries():
+    collection = FakeCollection()
+    cache = cache_with(collection, max_entries=2)
+    for question in ("what is rsi", "what is macd", "what is vwap"):
+        cache.store(question, answer(question.upper()), latency=1.0)
+
+    assert sorted(document for document, _ in collection.entries.values()) == ["what is macd", "what is vwap"]
+    assert cache.lookup("what is rsi") is None
+    assert cache.lookup("what is vwap").answer == "WHAT IS VWAP"
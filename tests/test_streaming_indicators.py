@@ -0,0 +1,100 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.aizen.signals.streaming_indicators import RESYNC_EVERY, StreamingIndicators
+from src.aizen.signals.technical_indicators import TechnicalIndicators
+
+COLUMNS = ["RSI", "BB_upper", "BB_middle", "BB_lower", "Volatility", "MACD", "MACD_signal", "MACD_histogram", "ATR", "Price_Range", "VWAP"]
+
+
+def synthetic_candles(rows, seed=0):
+    """Random walk with a flat stretch (zero gains and losses) and volume-less first candles."""
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 30, rows))
+    close[40:70] = close[40]
+    volume = rng.integers(0, 1000, rows).astype(float)
+    volume[:3] = 0
+    return pd.DataFrame({
+        "price": close,
+        "High": close + rng.uniform(0, 40, rows),
+        "Low": close - rng.uniform(0, 40, rows),
+        "Volume": volume
+    })
+
+
+def stream(indicators, candles):
+    return [
+        indicators.update(high, low, close, volume)
+        for close, high, low, volume in candles[["price", "High", "Low", "Volume"]].itertuples(index=False)
+    ]
+
+
+def assert_matches(values, expected, rel=1e-9):
+    for column in COLUMNS:
+        assert values[column] == pytest.approx(expected[column], rel=rel, abs=1e-9, nan_ok=True), column
+
+
+def test_update_matches_last_row_of_technical_indicators():
+    candles = synthetic_candles(120)
+    for i, values in enumerate(stream(StreamingIndicators(), candles)):
+        expected = TechnicalIndicators(candles.iloc[:i + 1].copy()).calculate_technical_indicators().iloc[-1]
+        assert_matches(values, expected)
+
+
+def test_update_stays_accurate_past_window_resyncs():
+    candles = synthetic_candles(3 * RESYNC_EVERY + 100, seed=1)
+    expected = TechnicalIndicators(candles.copy()).calculate_technical_indicators()
+    # Before the first full ATR window the full frame fills ATR with the mean
+    # range of every row, not of the rows so far; the test above covers those
+    for i, values in enumerate(stream(StreamingIndicators(), candles)):
+        if i >= 13:
+            assert_matches(values, expected.iloc[i])
+
+
+@pytest.mark.parametrize("split", [1, 10, 60, RESYNC_EVERY - 1, RESYNC_EVERY + 5])
+def test_state_round_trip_continues_series_exactly(split):
+    candles = synthetic_candles(RESYNC_EVERY + 200, seed=2)
+    expected = stream(StreamingIndicators(), candles)
+
+    indicators = StreamingIndicators()
+    stream(indicators, candles.iloc[:split])
+    state = json.loads(json.dumps(indicators.to_state()))
+    resumed = stream(StreamingIndicators.from_state(state), candles.iloc[split:])
+
+    for values, reference in zip(resumed, expected[split:]):
+        for column in COLUMNS:
+            if math.isnan(reference[column]):
+                assert math.isnan(values[column]), column
+            else:
+                assert values[column] == reference[column], column
+
+
+def test_vwap_covers_the_last_26_candles_like_the_old_job():
+    candles = synthetic_candles(200, seed=3)
+    values = stream(StreamingIndicators(), candles)
+    for i in (5, 25, 26, 120, 199):
+        # The job used to load the 26 rows ending at the candle and take VWAP over them
+        window = candles.iloc[max(i - 25, 0):i + 1]
+        typical_price = (window["High"] + window["Low"] + window["price"]) / 3
+        expected = (typical_price * window["Volume"]).sum() / window["Volume"].sum()
+        assert values[i]["VWAP"] == pytest.approx(expected, rel=1e-12)
+
+
+def test_from_history_matches_streaming_state():
+    candles = synthetic_candles(300, seed=4)
+    streamed = StreamingIndicators()
+    stream(streamed, candles)
+    built = StreamingIndicators.from_history(candles["High"], candles["Low"], candles["price"], candles["Volume"].tolist())
+    assert list(built.vp) == list(streamed.vp)
+    assert list(built.volumes) == list(streamed.volumes)
+
+
+def test_states_of_older_versions_are_rejected():
+    state = StreamingIndicators().to_state()
+    del state["version"]
+    with pytest.raises(ValueError):
+        StreamingIndicators.from_state(state)
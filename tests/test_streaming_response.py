@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from src.aizen.pipelines.streaming import IncrementalResponseParser
+
+CONFIG = {
+    "pool_details": {"chain": "sepolia", "fee_tier": 0.3, "token_pair": "ETH/USDC"},
+    "liquidity_range": {"lower": 0.1, "higher": 0.1},
+    "buffer": 0.05,
+    "max_slippage": 0.5,
+    "rebalance_timeframe": 15,
+    "time_buffer": 30,
+    "tags": ["eth"],
+    "rebalance_strategies": ["Rsi"]
+}
+
+
+def feed_all(text, size):
+    parser = IncrementalResponseParser()
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i:i + size])
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_answer_and_config_stream_in_any_chunking(size):
+    answer = 'Use a "tight" range:\n10% either side, café \U0001F680 \\ done'
+    text = "```json\n" + json.dumps({"answer": answer, "config": CONFIG}) + "\n```"
+    parser, events = feed_all(text, size)
+
+    assert "".join(delta for event, delta in events if event == "answer") == answer
+    assert parser.answer == answer
+    configs = [value for event, value in events if event == "config"]
+    assert len(configs) == 1
+    assert configs[0]["pool_details"]["token_pair"] == "ETH/USDC"
+
+
+def test_config_quoted_in_the_answer_is_not_the_config():
+    answer = 'Reply with "config": {"buffer": 1} to change it'
+    parser, events = feed_all(json.dumps({"answer": answer, "config": None}), 2)
+
+    assert [event for event, _ in events if event == "config"] == []
+    assert parser.config is None
+    assert parser.config_done
+    assert parser.answer == answer
+
+
+def test_answer_is_emitted_while_it_streams():
+    parser = IncrementalResponseParser()
+    assert parser.feed('{"answer": "RSI is') == [("answer", "RSI is")]
+    assert parser.feed(" high\\") == [("answer", " high")]
+    assert parser.feed('n", "config": nu') == [("answer", "\n")]
+    assert not parser.config_done
+    assert parser.feed("ll}") == []
+    assert parser.config_done